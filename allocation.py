@@ -0,0 +1,273 @@
+"""
+Assistant auto-allocation for the allotment dashboard.
+
+`auto_allocate_day` fills FIRST/SECOND/Third for every open appointment of the
+day in one call. Rows are swept in In Time order while each assistant's
+"busy until" minute is carried forward, so every availability probe is a dict
+lookup plus a bisect into the assignments that were already on the schedule,
+instead of a full availability rebuild per row.
+
+`AllocationTables` compiles the nested `allocation_rules` of DEPARTMENTS into
+flat preference lists once per roster, so choosing an assistant for a role is
+one dict lookup plus an availability filter.
+"""
+
+import bisect
+import hashlib
+import json
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from schedule_index import ASSISTANT_ROLES, INACTIVE_STATUS_PATTERN, build_schedule_index
+from staff_registry import norm_staff_key
+from time_utils import day_minutes
+
+_BLANK_TOKENS = {"", "nan", "none", "nat", "<na>"}
+
+
+def _is_blank(value: Any) -> bool:
+    """Same rule as the dashboard's _is_blank_cell (empty/NaN/'nan'/'none')."""
+    try:
+        if value is None or pd.isna(value):
+            return True
+    except Exception:
+        pass
+    return str(value).strip().lower() in _BLANK_TOKENS
+
+
+class AllocationTables:
+    """`allocation_rules` of every department compiled into flat preference lists.
+
+    Each (department, role, doctor key, time bucket, first-assistant) key maps
+    to the ordered candidate names (upper-case) that the rule walk would try:
+    the default list, then the doctor-specific list, then `when_first_is`
+    (SECOND) and the `time_override` names already in effect (FIRST). The
+    allocator picks the first candidate that is free and not already on the
+    row, which is the same choice the nested walk makes.
+    """
+
+    def __init__(self, departments: dict[str, dict]):
+        self.fingerprint = rules_fingerprint(departments)
+        self._tables: dict[tuple[str, str, str, int, str], tuple[str, ...]] = {}
+        # (department, role) -> (doctor keys, sorted override hours, first-assistant keys)
+        self._shape: dict[tuple[str, str], tuple[frozenset, list[float], frozenset]] = {}
+        errors: list[str] = []
+
+        for dept, config in departments.items():
+            roster = {str(a).strip().upper() for a in config.get("assistants", [])}
+            doctors = {norm_staff_key(d) for d in config.get("doctors", [])}
+
+            def _names(names: Any, where: str) -> list[str]:
+                out = []
+                for name in names if isinstance(names, (list, tuple)) else []:
+                    key = str(name).strip().upper()
+                    if key not in roster:
+                        errors.append(f"{dept} {where}: unknown assistant {name!r}")
+                        continue
+                    out.append(key)
+                return out
+
+            for role, rule in config.get("allocation_rules", {}).items():
+                default = _names(rule.get("default", []), f"{role}.default")
+                per_doctor: dict[str, list[str]] = {}
+                for doc, names in rule.items():
+                    if doc in ("default", "when_first_is", "time_override"):
+                        continue
+                    if norm_staff_key(doc) not in doctors:
+                        errors.append(f"{dept} {role}: unknown doctor {doc!r}")
+                        continue
+                    per_doctor[norm_staff_key(doc)] = _names(names, f"{role}.{doc}")
+
+                per_first: dict[str, list[str]] = {}
+                if role == "SECOND":
+                    for first, names in rule.get("when_first_is", {}).items():
+                        first_key = str(first).strip().upper()
+                        if first_key not in roster:
+                            errors.append(f"{dept} {role}.when_first_is: unknown assistant {first!r}")
+                        per_first[first_key] = _names(names, f"{role}.when_first_is.{first}")
+
+                overrides: list[tuple[float, str]] = []
+                if role == "FIRST" and isinstance(rule.get("time_override"), list):
+                    for item in rule["time_override"]:
+                        if isinstance(item, tuple):
+                            hour, name = item
+                            for key in _names([name], f"{role}.time_override"):
+                                overrides.append((float(hour), key))
+                hours = sorted({h for h, _ in overrides})
+
+                self._shape[(dept, role)] = (frozenset(per_doctor), hours, frozenset(per_first))
+                for doc_key in [""] + list(per_doctor):
+                    for bucket in range(len(hours) + 1):
+                        in_effect = [name for h, name in overrides if bucket and h <= hours[bucket - 1]]
+                        for first_key in [""] + list(per_first):
+                            ordered = default + per_doctor.get(doc_key, []) + per_first.get(first_key, []) + in_effect
+                            self._tables[(dept, role, doc_key, bucket, first_key)] = tuple(dict.fromkeys(ordered))
+
+        if errors:
+            raise ValueError("Invalid allocation_rules: " + "; ".join(errors))
+
+    def candidates(self, department: str, role: str, doctor: str, appt_hour: float, first_assigned: str = "") -> tuple[str, ...]:
+        """Ordered candidate names for one role of one appointment (empty if no rule)."""
+        shape = self._shape.get((department, role))
+        if shape is None:
+            return ()
+        doctor_keys, hours, first_keys = shape
+        doc_key = norm_staff_key(doctor)
+        first_key = str(first_assigned or "").strip().upper()
+        return self._tables[(
+            department,
+            role,
+            doc_key if doc_key in doctor_keys else "",
+            bisect.bisect_right(hours, appt_hour),
+            first_key if first_key in first_keys else "",
+        )]
+
+    def pick(self, department: str, role: str, doctor: str, appt_hour: float, first_assigned: str,
+             free: dict[str, str], already: set[str]) -> str:
+        """First free candidate not already on the row ("" when the rule has none)."""
+        for key in self.candidates(department, role, doctor, appt_hour, first_assigned):
+            if key in free and key not in already:
+                return free[key]
+        return ""
+
+
+def rules_fingerprint(departments: dict[str, dict]) -> str:
+    """Stable hash of the roster and rules; changes whenever either is edited."""
+    return hashlib.md5(json.dumps(departments, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+_COMPILED: dict[str, AllocationTables] = {}
+
+
+def get_allocation_tables(departments: dict[str, dict]) -> AllocationTables:
+    """Compiled tables for this roster, recompiled only when the roster/rules change."""
+    fingerprint = rules_fingerprint(departments)
+    tables = _COMPILED.get(fingerprint)
+    if tables is None:
+        tables = AllocationTables(departments)
+        _COMPILED.clear()
+        _COMPILED[fingerprint] = tables
+    return tables
+
+
+def auto_allocate_day(
+    df_schedule: pd.DataFrame,
+    departments: dict[str, dict],
+    department_for_doctor: Callable[[str], str],
+    only_fill_empty: bool = True,
+    is_unavailable: Callable[[str, int, int], bool] | None = None,
+) -> dict[Any, dict[str, str]]:
+    """Allocate assistants for every open appointment of the day.
+
+    Rows are processed in In Time order. For each row the department's
+    compiled `allocation_rules` (see AllocationTables) pick each role,
+    falling back to any free department assistant. An assistant is free
+    when `is_unavailable(name, in_min, out_min)` is False (weekly off, time
+    blocks) and they have no overlapping appointment, counting assignments made
+    earlier in the same sweep.
+
+    Rows without a doctor, with unparseable times, or whose STATUS is
+    cancelled/done/shifted are left alone. Returns {row index label: {role:
+    assistant}} for the cells that should change; the frame is not modified.
+    """
+    if df_schedule is None or df_schedule.empty or "DR." not in df_schedule.columns:
+        return {}
+
+    tables = get_allocation_tables(departments)
+    n = len(df_schedule)
+    in_arr, out_arr = day_minutes(df_schedule)
+    timed = ~np.isnan(in_arr) & ~np.isnan(out_arr)
+    if "STATUS" in df_schedule.columns:
+        status = df_schedule["STATUS"].astype(str).str.strip().str.upper()
+        active = ~status.str.contains(INACTIVE_STATUS_PATTERN, regex=True).to_numpy()
+    else:
+        active = np.ones(n, dtype=bool)
+
+    roles_present = [r for r in ASSISTANT_ROLES if r in df_schedule.columns]
+    current = {
+        role: [None if _is_blank(v) else str(v).strip() for v in df_schedule[role].tolist()]
+        for role in roles_present
+    }
+    doctors = df_schedule["DR."].tolist()
+    labels = df_schedule.index.tolist()
+
+    # Assignments already on the schedule; only rows the sweep has not reached yet
+    # are consulted here (reached rows live in busy_until).
+    fixed = build_schedule_index(df_schedule.assign(In_min=in_arr, Out_min=out_arr))
+    processed = np.zeros(n, dtype=bool)
+    busy_until: dict[str, float] = {}
+
+    def _register(pos: int, names: list[str]) -> None:
+        for name in names:
+            key = name.upper()
+            if busy_until.get(key, -np.inf) < out_arr[pos]:
+                busy_until[key] = out_arr[pos]
+
+    def _booked_later(key: str, pos: int, start: int, end: int) -> bool:
+        iv = fixed.intervals(key)
+        for j in iv.starting_in(start, end):
+            other = int(iv.row_pos[j])
+            if other != pos and not processed[other] and iv.out_min[j] > start:
+                return True
+        return False
+
+    allocations: dict[Any, dict[str, str]] = {}
+    order = np.flatnonzero(timed & active)
+    order = order[np.argsort(in_arr[order], kind="stable")]
+
+    for pos in order:
+        pos = int(pos)
+        start, end = int(in_arr[pos]), int(out_arr[pos])
+        row_names = {role: current[role][pos] for role in roles_present}
+        processed[pos] = True
+
+        doctor = "" if _is_blank(doctors[pos]) else str(doctors[pos]).strip()
+        department = department_for_doctor(doctor) if doctor else ""
+        open_roles = [r for r in roles_present if not (only_fill_empty and row_names[r])]
+        if not department or not open_roles:
+            _register(pos, [v for v in row_names.values() if v])
+            continue
+
+        dept_config = departments.get(department, {})
+        free: dict[str, str] = {}
+        for name in dept_config.get("assistants", []):
+            key = str(name).strip().upper()
+            if busy_until.get(key, -np.inf) > start:
+                continue
+            if is_unavailable is not None and is_unavailable(key, start, end):
+                continue
+            if _booked_later(key, pos, start, end):
+                continue
+            free[key] = name
+
+        already = {v.upper() for v in row_names.values() if v}
+        appt_hour = (start % 1440) / 60.0
+        changes: dict[str, str] = {}
+        for role in open_roles:
+            first_assigned = str(changes.get("FIRST", row_names.get("FIRST") or "")).strip()
+            chosen = tables.pick(department, role, doctor, appt_hour, first_assigned, free, already)
+            if not chosen:
+                chosen = next((v for v in free.values() if v.upper() not in already), "")
+            if chosen:
+                changes[role] = chosen
+                already.add(chosen.upper())
+
+        row_names.update(changes)
+        _register(pos, [v for v in row_names.values() if v])
+        if changes:
+            allocations[labels[pos]] = changes
+
+    return allocations
+
+
+def apply_allocations(df_schedule: pd.DataFrame, allocations: dict[Any, dict[str, str]]) -> int:
+    """Write auto_allocate_day() results into the frame. Returns cells changed."""
+    changed = 0
+    for label, roles in allocations.items():
+        for role, name in roles.items():
+            if role in df_schedule.columns:
+                df_schedule.at[label, role] = name
+                changed += 1
+    return changed
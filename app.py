@@ -4,8 +4,7 @@ import pandas as pd # pyright: ignore[reportMissingModuleSource]
 from datetime import datetime, time as time_type, timezone, timedelta
 from typing import Any
 import os
-import time as time_module  # for retry delays
-import zipfile  # for BadZipFile exception handling
+import time as time_module
 # Add missing import
 import hashlib
 import re  # for creating safe keys for buttons
@@ -27,6 +26,62 @@ from auth_clerk import (
     logout_user,
     auth
 )
+from schedule_index import (
+    ScheduleIndex,
+    TimeBlockIndex,
+    build_schedule_index,
+    build_time_block_index,
+    schedule_data_version,
+    time_blocks_signature,
+)
+from time_utils import coerce_to_time_obj as _coerce_to_time_obj, parse_time_series, minutes_to_time_objs
+from allocation import auto_allocate_day, apply_allocations, get_allocation_tables
+from staff_registry import StaffRegistry, norm_staff_key as _norm_staff_key
+from occupancy import DayOccupancy, build_day_occupancy, find_free_windows
+from conflicts import find_double_bookings
+from change_feed import NOTIFY_TRIGGER_SQL, LocalChangeFeed, PostgresNotifyListener
+from column_profiles import LAZY_COLUMNS, display_columns, normalize_load_profile, omitted_columns
+from reminder_store import (
+    DEFAULT_REMINDER_TABLE,
+    REMINDER_TABLE_SQL,
+    GSheetsReminderStore,
+    JsonFileReminderStore,
+    ReminderState,
+    SupabaseReminderStore,
+)
+from save_queue import WriteBehindQueue
+from status_events import (
+    DEFAULT_STATUS_EVENTS_TABLE,
+    STATUS_EVENTS_TABLE_SQL,
+    GSheetsStatusEventStore,
+    JsonLinesStatusEventStore,
+    SupabaseStatusEventStore,
+    legacy_events,
+    row_statuses,
+    stamp_status_changes,
+)
+from excel_store import read_workbook, write_workbook
+from payload_codec import normalize_payload_format
+from schedule_diff import Changeset, Snapshot, cell_updates, diff_frame, take_snapshot
+from sheets_quota import RETRY_STATUSES, MeteredSpreadsheet, SheetsQuota, status_code
+from sheets_reader import META_WORKSHEET, SheetHandles, open_handles, read_schedule
+from sheets_writer import write_changes
+from schedule_window import day_mask, live_window_mask, row_dates, stamp_dates
+from supabase_store import (
+    DEFAULT_ROWS_TABLE,
+    PAYLOAD_PATCH_SQL,
+    ROWS_TABLE_SQL,
+    load_payload_frame,
+    load_rows_frame,
+    SupabaseClientPool,
+    load_lazy_fields,
+    load_schedule_range,
+    normalize_storage_mode,
+    probe_version,
+    save_lazy_fields,
+    save_payload_frame,
+    save_rows_frame,
+)
 
 try:
     # Altair was previously used for a status dashboard chart.
@@ -1223,90 +1278,8 @@ now_epoch = int(time_module.time())
 
 # ================ TIME UTILITY FUNCTIONS ================
 # Define time conversion functions early so they can be used throughout the code
-
-def _coerce_to_time_obj(time_value: Any) -> time_type | None:
-    """Best-effort coercion of many time representations into a datetime.time.
-
-    Supports:
-    - datetime.time, datetime
-    - strings: HH:MM, HH:MM:SS, HH.MM, and 12-hour formats like '09:30 AM'
-    - numbers: 9.30 (meaning 09:30), or Excel serial time 0-1
-    """
-    if time_value is None or pd.isna(time_value) or time_value == "":
-        return None
-    if isinstance(time_value, time_type):
-        return time_value
-
-    # Strings
-    if isinstance(time_value, str):
-        s = " ".join(time_value.strip().split())
-        if s == "" or s.upper() in {"N/A", "NAT", "NONE"}:
-            return None
-
-        # 12-hour formats (e.g., 09:30 AM, 9:30PM, 09:30:00 PM)
-        if re.search(r"\b(AM|PM)\b", s, flags=re.IGNORECASE) or re.search(r"(AM|PM)$", s, flags=re.IGNORECASE):
-            s_norm = re.sub(r"\s*(AM|PM)\s*$", r" \1", s, flags=re.IGNORECASE).upper()
-            for fmt in ("%I:%M %p", "%I:%M:%S %p"):
-                try:
-                    dt = datetime.strptime(s_norm, fmt)
-                    return time_type(dt.hour, dt.minute)
-                except ValueError:
-                    pass
-
-        # HH:MM or HH:MM:SS
-        if ":" in s:
-            parts = s.split(":")
-            if len(parts) >= 2:
-                try:
-                    h = int(parts[0])
-                    m_part = re.sub(r"\D.*$", "", parts[1])
-                    m = int(m_part)
-                    if 0 <= h < 24 and 0 <= m < 60:
-                        return time_type(h, m)
-                except (ValueError, TypeError):
-                    pass
-
-        # HH.MM
-        if "." in s:
-            parts = s.split(".")
-            if len(parts) == 2:
-                try:
-                    h = int(parts[0])
-                    m = int(parts[1])
-                    if 0 <= h < 24 and 0 <= m < 60:
-                        return time_type(h, m)
-                except (ValueError, TypeError):
-                    pass
-
-        return None
-
-    # Numeric formats
-    try:
-        num_val = float(time_value)
-    except (ValueError, TypeError):
-        return None
-
-    # Excel serial time format (0.625 = 15:00)
-    if 0 <= num_val <= 1:
-        total_minutes = round(num_val * 1440)
-        hours = (total_minutes // 60) % 24
-        minutes = total_minutes % 60
-        return time_type(hours, minutes)
-
-    # 9.30 meaning 09:30 (decimal part is minutes directly)
-    if 0 <= num_val < 24:
-        hours = int(num_val)
-        decimal_part = num_val - hours
-        minutes = round(decimal_part * 100)
-        if minutes > 59:
-            minutes = round(decimal_part * 60)
-        if minutes >= 60:
-            hours = (hours + 1) % 24
-            minutes = 0
-        if 0 <= hours < 24 and 0 <= minutes < 60:
-            return time_type(hours, minutes)
-
-    return None
+# (the parsers themselves live in time_utils.py: `_coerce_to_time_obj` per cell,
+# `parse_time_series` for whole columns)
 
 def dec_to_time(time_value: Any) -> str:
     """Convert various time formats to HH:MM string"""
@@ -1367,15 +1340,6 @@ def _unique_preserve_order(items: list[str]) -> list[str]:
     return out
 
 
-def _norm_staff_key(value: str) -> str:
-    """Normalize names like 'DR. HUSSAIN' vs 'DR.HUSSAIN' to a stable key."""
-    try:
-        s = str(value or "").strip().upper()
-        return re.sub(r"[^A-Z0-9]+", "", s)
-    except Exception:
-        return ""
-
-
 def _is_blank_cell(value: Any) -> bool:
     """True if value is empty/NaN/'nan'/'none'."""
     try:
@@ -1467,21 +1431,24 @@ DEPARTMENTS = {
 ALL_DOCTORS = _unique_preserve_order(DEPARTMENTS["PROSTHO"]["doctors"] + DEPARTMENTS["ENDO"]["doctors"])
 ALL_ASSISTANTS = _unique_preserve_order(DEPARTMENTS["PROSTHO"]["assistants"] + DEPARTMENTS["ENDO"]["assistants"])
 
+# Legacy spellings that refer to the same person (same staff ID)
+STAFF_ALIASES = {"DR.HUSAIN": "DR.HUSSAIN"}
+STAFF_REGISTRY = StaffRegistry(DEPARTMENTS, aliases=STAFF_ALIASES)
+
+# Compile allocation_rules up front so a typo in a name fails here, not silently at allocation time.
+# get_allocation_tables() recompiles automatically if DEPARTMENTS is edited later.
+get_allocation_tables(DEPARTMENTS)
+
+def _canonical_doctor_name(name: str) -> str:
+    """The registry's spelling of a doctor (unknown names unchanged)."""
+    staff_id = STAFF_REGISTRY.doctor_id(name)
+    return STAFF_REGISTRY.name(staff_id) if staff_id is not None else name
+
 def get_department_for_doctor(doctor_name: str) -> str:
     """Get the department a doctor belongs to"""
     if not doctor_name:
         return ""
-    doc_key = _norm_staff_key(doctor_name)
-    if not doc_key:
-        return ""
-    for dept, config in DEPARTMENTS.items():
-        for d in config["doctors"]:
-            d_key = _norm_staff_key(d)
-            if not d_key:
-                continue
-            if doc_key == d_key or doc_key.endswith(d_key) or d_key.endswith(doc_key):
-                return dept
-    return ""
+    return STAFF_REGISTRY.department_for_doctor(doctor_name)
 
 def get_assistants_for_department(department: str) -> list[str]:
     """Get list of assistants for a specific department"""
@@ -1491,21 +1458,10 @@ def get_assistants_for_department(department: str) -> list[str]:
     return ALL_ASSISTANTS
 
 def get_department_for_assistant(assistant_name: str) -> str:
-    """Get the department an assistant belongs to"""
+    """Get the department an assistant belongs to (unknown names are SHARED)"""
     if not assistant_name:
         return ""
-    assist_key = _norm_staff_key(assistant_name)
-    if not assist_key:
-        return ""
-    for dept, config in DEPARTMENTS.items():
-        for a in config["assistants"]:
-            a_key = _norm_staff_key(a)
-            if not a_key:
-                continue
-            if assist_key == a_key or assist_key.endswith(a_key) or a_key.endswith(assist_key):
-                return dept
-    # ANSHIKA is shared between departments
-    return "SHARED"
+    return STAFF_REGISTRY.department_for_assistant(assistant_name)
 
 # ================ TIME BLOCKING SYSTEM ================
 # Initialize time blocks in session state
@@ -1532,27 +1488,29 @@ def remove_time_block(index: int):
         return True
     return False
 
+def _get_time_block_index() -> TimeBlockIndex:
+    """Date/assistant interval index over session time blocks, rebuilt only when the blocks change.
+
+    Blocks are edited in place (append/pop, dict edits), so the content
+    signature is compared on every call; it is cheap next to a rebuild.
+    """
+    blocks = st.session_state.get("time_blocks", [])
+    index = st.session_state.get("_time_block_index_cache")
+    if isinstance(index, TimeBlockIndex) and index.signature == time_blocks_signature(blocks):
+        return index
+    index = build_time_block_index(blocks, time_to_minutes)
+    st.session_state["_time_block_index_cache"] = index
+    return index
+
 def is_assistant_blocked(assistant: str, check_time: Any) -> tuple[bool, str]:
     """Check if an assistant is blocked at a specific time. Returns (is_blocked, reason)"""
     if not assistant or not check_time:
         return False, ""
     
-    assist_upper = str(assistant).strip().upper()
-    today_str = now.strftime("%Y-%m-%d")
     check_minutes = check_time.hour * 60 + check_time.minute
-    
-    for block in st.session_state.time_blocks:
-        if block["date"] != today_str:
-            continue
-        if block["assistant"].upper() != assist_upper:
-            continue
-        
-        start_min = block["start_time"].hour * 60 + block["start_time"].minute
-        end_min = block["end_time"].hour * 60 + block["end_time"].minute
-        
-        if start_min <= check_minutes <= end_min:
-            return True, block.get("reason", "Blocked")
-    
+    reason = _get_time_block_index().blocked_at(now.strftime("%Y-%m-%d"), assistant, check_minutes)
+    if reason is not None:
+        return True, reason
     return False, ""
 
 
@@ -1663,37 +1621,81 @@ def _apply_time_blocks_to_meta(meta: dict) -> dict:
     return out
 
 # ================ ASSISTANT AVAILABILITY TRACKING ================
+# id(frame) -> (frame, its data version) for this rerun (the script re-runs top to bottom,
+# so this starts empty each time); the frame is kept so its id cannot be reused
+_data_versions: dict[int, tuple[pd.DataFrame, str]] = {}
+
+
+def _data_version(df_schedule: pd.DataFrame | None) -> str:
+    """schedule_data_version, hashed once per frame and rerun.
+
+    Frames edited in place are forgotten when they are saved or queued as
+    unsaved changes (save_data, _queue_unsaved_df).
+    """
+    if df_schedule is None:
+        return schedule_data_version(df_schedule)
+    cached = _data_versions.get(id(df_schedule))
+    if cached is not None and cached[0] is df_schedule:
+        return cached[1]
+    version = schedule_data_version(df_schedule)
+    _data_versions[id(df_schedule)] = (df_schedule, version)
+    return version
+
+
+def _today_version(df_schedule: pd.DataFrame | None) -> str:
+    """Cache key of today's part of a schedule (the data version includes DATE)."""
+    return f"{_data_version(df_schedule)}@{now.strftime('%Y-%m-%d')}"
+
+
+def _today_rows(df_schedule: pd.DataFrame | None) -> pd.DataFrame | None:
+    """Today's (and undated) rows: what availability, occupancy and double bookings consider."""
+    if df_schedule is None or df_schedule.empty:
+        return df_schedule
+    return df_schedule[day_mask(df_schedule, now.strftime("%Y-%m-%d"))]
+
+
+def _get_schedule_index(df_schedule: pd.DataFrame) -> ScheduleIndex:
+    """Return the assistant interval index for today's rows, rebuilt only when the data changes."""
+    version = _today_version(df_schedule)
+    cached = st.session_state.get("_schedule_index_cache")
+    if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == version:
+        return cached[1]
+    index = build_schedule_index(_today_rows(df_schedule), to_minutes=time_to_minutes, version=version)
+    st.session_state["_schedule_index_cache"] = (version, index)
+    return index
+
+
+def _get_day_occupancy(df_schedule: pd.DataFrame | None) -> DayOccupancy:
+    """Today's resource x 5-minute occupancy matrix, synced row-by-row when the schedule changes."""
+    cached = st.session_state.get("_day_occupancy_cache")
+    if isinstance(cached, dict) and isinstance(cached.get("occupancy"), DayOccupancy):
+        occupancy = cached["occupancy"]
+    else:
+        occupancy = DayOccupancy(
+            assistants=ALL_ASSISTANTS, doctors=ALL_DOCTORS, normalizers={"doctor": _canonical_doctor_name}
+        )
+        cached = {"occupancy": occupancy, "version": None, "unavailable_key": None}
+        st.session_state["_day_occupancy_cache"] = cached
+
+    version = _today_version(df_schedule)
+    if cached["version"] != version:
+        occupancy.sync(_today_rows(df_schedule))
+        cached["version"] = version
+
+    today_str = now.strftime("%Y-%m-%d")
+    block_index = _get_time_block_index()
+    unavailable_key = (today_str, now.weekday(), block_index.signature)
+    if cached["unavailable_key"] != unavailable_key:
+        occupancy.set_unavailable(WEEKLY_OFF.get(now.weekday(), []), block_index.blocks_on(today_str))
+        cached["unavailable_key"] = unavailable_key
+    return occupancy
+
+
 def get_assistant_schedule(assistant_name: str, df_schedule: pd.DataFrame) -> list[dict[str, Any]]:
     """Get all appointments where this assistant is assigned"""
     if not assistant_name or df_schedule.empty:
         return []
-    
-    assist_upper = str(assistant_name).strip().upper()
-    appointments = []
-    
-    for idx, row in df_schedule.iterrows():
-        # Check FIRST, SECOND, Third columns
-        for col in ["FIRST", "SECOND", "Third"]:
-            if col in row.index:
-                val = str(row.get(col, "")).strip().upper()
-                if val == assist_upper:
-                    # Skip cancelled/done/completed/shifted appointments
-                    status = str(row.get("STATUS", "")).strip().upper()
-                    if any(s in status for s in ["CANCELLED", "DONE", "COMPLETED", "SHIFTED"]):
-                        continue
-                    
-                    appointments.append({
-                        "row_id": row.get("REMINDER_ROW_ID", ""),
-                        "patient": row.get("Patient Name", "Unknown"),
-                        "in_time": row.get("In Time"),
-                        "out_time": row.get("Out Time"),
-                        "doctor": row.get("DR.", ""),
-                        "op": row.get("OP", ""),
-                        "role": col,
-                        "status": status
-                    })
-    
-    return appointments
+    return _get_schedule_index(df_schedule).schedule_for(assistant_name)
 
 def is_assistant_available(
     assistant_name: str,
@@ -1734,53 +1736,32 @@ def is_assistant_available(
     
     # Check time blocks first (overlap against the whole appointment window)
     try:
-        today_str = now.strftime("%Y-%m-%d")
-        for block in st.session_state.get("time_blocks", []):
-            if str(block.get("date", "")).strip() != today_str:
-                continue
-            if str(block.get("assistant", "")).strip().upper() != assist_upper:
-                continue
-
-            start_t = _coerce_to_time_obj(block.get("start_time"))
-            end_t = _coerce_to_time_obj(block.get("end_time"))
-            if start_t is None or end_t is None:
-                continue
-
-            start_min = start_t.hour * 60 + start_t.minute
-            end_min = end_t.hour * 60 + end_t.minute
-            if end_min < start_min:
-                end_min += 1440
-
-            if not (check_out_min <= start_min or check_in_min >= end_min):
-                return False, f"Blocked: {block.get('reason', 'Blocked')}"
+        block_reason = _get_time_block_index().first_overlap(now.strftime("%Y-%m-%d"), assist_upper, check_in_min, check_out_min)
+        if block_reason is not None:
+            return False, f"Blocked: {block_reason}"
     except Exception:
         pass
     
     # Check existing appointments
-    schedule = get_assistant_schedule(assist_upper, df_schedule)
-    
-    for appt in schedule:
-        # Skip if it's the same row we're editing
-        if exclude_row_id and str(appt.get("row_id", "")).strip() == str(exclude_row_id).strip():
-            continue
-        
-        appt_in = _coerce_to_time_obj(appt.get("in_time"))
-        appt_out = _coerce_to_time_obj(appt.get("out_time"))
-        
-        if appt_in is None or appt_out is None:
-            continue
-        
-        appt_in_min = appt_in.hour * 60 + appt_in.minute
-        appt_out_min = appt_out.hour * 60 + appt_out.minute
-        if appt_out_min < appt_in_min:
-            appt_out_min += 1440
-        
-        # Check for overlap
-        if not (check_out_min <= appt_in_min or check_in_min >= appt_out_min):
-            return False, f"With {appt.get('patient', 'patient')} ({appt_in.strftime('%H:%M')}-{appt_out.strftime('%H:%M')})"
+    if df_schedule is None or df_schedule.empty:
+        return True, ""
+    conflict = _get_schedule_index(df_schedule).first_conflict(assist_upper, check_in_min, check_out_min, exclude_row_id)
+    if conflict is not None:
+        appt_in = _coerce_to_time_obj(conflict.get("in_time"))
+        appt_out = _coerce_to_time_obj(conflict.get("out_time"))
+        if appt_in is not None and appt_out is not None:
+            return False, f"With {conflict.get('patient', 'patient')} ({appt_in.strftime('%H:%M')}-{appt_out.strftime('%H:%M')})"
+        return False, f"With {conflict.get('patient', 'patient')}"
     
     return True, ""
 
+def _is_assistant_off_or_blocked(assistant_name: str, in_min: int, out_min: int) -> bool:
+    """Weekly off / time block check used by the day-wide allocator (minutes in, no schedule scan)."""
+    check_in = time_type((in_min // 60) % 24, in_min % 60)
+    check_out = time_type((out_min // 60) % 24, out_min % 60)
+    is_avail, _ = is_assistant_available(assistant_name, check_in, check_out, None)
+    return not is_avail
+
 def get_available_assistants(
     department: str,
     check_in_time: Any,
@@ -1794,9 +1775,23 @@ def get_available_assistants(
     """
     assistants = get_assistants_for_department(department)
     available = []
-    
-    for assistant in assistants:
-        is_avail, reason = is_assistant_available(assistant, check_in_time, check_out_time, df_schedule, exclude_row_id)
+
+    # Occupancy matrix slice: an untouched window is free for certain; only touched
+    # assistants go through the exact check (which also produces the reason).
+    check_in_min = time_to_minutes(check_in_time)
+    check_out_min = time_to_minutes(check_out_time)
+    if check_in_min is not None and check_out_min is not None:
+        if check_out_min < check_in_min:
+            check_out_min += 1440
+        maybe_busy = _get_day_occupancy(df_schedule).busy_in_window("assistant", assistants, check_in_min, check_out_min)
+    else:
+        maybe_busy = [True] * len(assistants)
+
+    for assistant, needs_check in zip(assistants, maybe_busy):
+        if needs_check:
+            is_avail, reason = is_assistant_available(assistant, check_in_time, check_out_time, df_schedule, exclude_row_id)
+        else:
+            is_avail, reason = True, ""
         available.append({
             "name": assistant,
             "available": is_avail,
@@ -1880,75 +1875,27 @@ def _auto_fill_assistants_for_row(df_schedule: pd.DataFrame, row_index: int, onl
         free_assistants = {a["name"].upper(): a["name"] for a in avail if a.get("available")}
 
         changed = False
-        
-        # Get allocation rules for this department
-        dept_config = DEPARTMENTS.get(department, {})
-        allocation_rules = dept_config.get("allocation_rules", {})
+        tables = get_allocation_tables(DEPARTMENTS)
 
         roles = [("FIRST", current_first), ("SECOND", current_second), ("Third", current_third)]
         for role, current_val in roles:
             if only_fill_empty and (not _is_blank_cell(current_val)):
                 continue
-            
-            # Get preferred assistants for this role based on doctor, time, and other roles
-            preferred_assistants = []
-            
-            if role in allocation_rules:
-                rule = allocation_rules[role]
-                
-                # Try default rules first (unless there are conditional rules for SECOND)
-                default_list = rule.get("default", [])
-                for assistant_name in default_list:
-                    if assistant_name.upper() not in already and assistant_name.upper() in free_assistants:
-                        preferred_assistants.append(free_assistants[assistant_name.upper()])
-                
-                # If we found from default, use them
-                if preferred_assistants:
-                    pass  # We have preferred assistants from default rules
-                else:
-                    # Only use doctor-specific rules if we're short of assistants (fallback)
-                    doctor_assistant_list = rule.get(doctor, [])
-                    for assistant_name in doctor_assistant_list:
-                        if assistant_name.upper() not in already and assistant_name.upper() in free_assistants:
-                            preferred_assistants.append(free_assistants[assistant_name.upper()])
-                    
-                    # If still no preferred assistants and conditional rules exist, try those
-                    if not preferred_assistants and "when_first_is" in rule and role == "SECOND":
-                        first_assistant = df_schedule.iloc[row_index, df_schedule.columns.get_loc("FIRST")] if "FIRST" in df_schedule.columns else ""
-                        first_assistant = str(first_assistant).strip()
-                        if first_assistant and first_assistant in rule["when_first_is"]:
-                            conditional_list = rule["when_first_is"][first_assistant]
-                            for assistant_name in conditional_list:
-                                if assistant_name.upper() not in already and assistant_name.upper() in free_assistants:
-                                    preferred_assistants.append(free_assistants[assistant_name.upper()])
-                    
-                    # Last resort: check time overrides (for FIRST role)
-                    if not preferred_assistants and role == "FIRST" and "time_override" in rule:
-                        time_overrides = rule["time_override"]
-                        if isinstance(time_overrides, list):
-                            for item in time_overrides:
-                                if isinstance(item, tuple):
-                                    start_hour, assistant_name = item
-                                    if appt_hour >= start_hour:
-                                        if assistant_name.upper() not in already and assistant_name.upper() in free_assistants:
-                                            preferred_assistants.append(free_assistants[assistant_name.upper()])
 
-            # If we have preferred assistants from rules, use the first available
-            if preferred_assistants:
-                chosen = preferred_assistants[0]
+            # Single lookup in the compiled rule table, filtered by availability
+            first_assistant = df_schedule.iloc[row_index, df_schedule.columns.get_loc("FIRST")] if "FIRST" in df_schedule.columns else ""
+            first_assistant = "" if _is_blank_cell(first_assistant) else str(first_assistant).strip()
+            chosen = tables.pick(department, role, doctor, appt_hour, first_assistant, free_assistants, already)
+
+            # Fallback: use any free assistant not already assigned
+            if not chosen:
+                chosen = next((n for n in free_assistants.values() if n.upper() not in already), "")
+
+            if chosen:
                 if role in df_schedule.columns:
                     df_schedule.iloc[row_index, df_schedule.columns.get_loc(role)] = chosen
                 already.add(chosen.upper())
                 changed = True
-            else:
-                # Fallback: use any free assistant not already assigned
-                for free_name in free_assistants.values():
-                    if free_name.upper() not in already:
-                        if role in df_schedule.columns:
-                            df_schedule.iloc[row_index, df_schedule.columns.get_loc(role)] = free_name
-                        already.add(free_name.upper())
-                        changed = True
-                        break
 
         return changed
     except Exception:
@@ -1958,10 +1905,38 @@ def get_current_assistant_status(df_schedule: pd.DataFrame) -> dict[str, dict[st
     """
     Get real-time status of all assistants.
     Returns dict with assistant name -> status info
+
+    The map only changes when an appointment or block starts/ends, or when the
+    schedule/blocks change, so it is cached until the next such minute.
     """
-    status = {}
-    current_time = time_type(now.hour, now.minute)
     current_min = now.hour * 60 + now.minute
+    today_str = now.strftime("%Y-%m-%d")
+    schedule_index = _get_schedule_index(df_schedule)
+    block_index = _get_time_block_index()
+    cache_key = (schedule_index.version, block_index.signature, today_str, tuple(ALL_ASSISTANTS))
+    cached = st.session_state.get("_assistant_status_cache")
+    if isinstance(cached, tuple) and len(cached) == 3 and cached[0] == cache_key:
+        valid_until, cached_status = cached[1], cached[2]
+        if valid_until is None or current_min < valid_until:
+            return cached_status
+
+    status = _compute_assistant_status(schedule_index, current_min)
+    assistant_keys = [a.upper() for a in ALL_ASSISTANTS]
+    bounds = [
+        b for b in (
+            schedule_index.next_transition(assistant_keys, current_min),
+            block_index.next_transition(today_str, assistant_keys, current_min),
+        )
+        if b is not None
+    ]
+    st.session_state["_assistant_status_cache"] = (cache_key, min(bounds) if bounds else None, status)
+    return status
+
+
+def _compute_assistant_status(schedule_index: ScheduleIndex, current_min: int) -> dict[str, dict[str, str]]:
+    """FREE/BUSY/BLOCKED for every assistant at `current_min` (see get_current_assistant_status)."""
+    status = {}
+    current_time = time_type(current_min // 60, current_min % 60)
     today_weekday = now.weekday()
     weekday_name_list = globals().get("weekday_names", [])
     weekday_label = (
@@ -1974,7 +1949,7 @@ def get_current_assistant_status(df_schedule: pd.DataFrame) -> dict[str, dict[st
         for name in WEEKLY_OFF.get(today_weekday, [])
         if str(name).strip()
     }
-    
+
     for assistant in ALL_ASSISTANTS:
         assist_upper = assistant.upper()
 
@@ -1998,35 +1973,7 @@ def get_current_assistant_status(df_schedule: pd.DataFrame) -> dict[str, dict[st
             continue
         
         # Check current appointments
-        schedule = get_assistant_schedule(assist_upper, df_schedule)
-        current_appt = None
-        
-        for appt in schedule:
-            status_text = str(appt.get("status", "")).upper()
-            appt_in = _coerce_to_time_obj(appt.get("in_time"))
-            appt_out = _coerce_to_time_obj(appt.get("out_time"))
-
-            # If status explicitly says ON GOING, treat as busy regardless of time parsing.
-            if "ON GOING" in status_text or "ONGOING" in status_text:
-                current_appt = appt
-                break
-
-            # If timing is missing but status shows ARRIVED, treat as busy to avoid zero-count glitch.
-            if (appt_in is None or appt_out is None) and "ARRIVED" in status_text:
-                current_appt = appt
-                break
-            
-            if appt_in is None or appt_out is None:
-                continue
-            
-            appt_in_min = appt_in.hour * 60 + appt_in.minute
-            appt_out_min = appt_out.hour * 60 + appt_out.minute
-            if appt_out_min < appt_in_min:
-                appt_out_min += 1440
-            
-            if appt_in_min <= current_min <= appt_out_min:
-                current_appt = appt
-                break
+        current_appt = schedule_index.current_appointment(assist_upper, current_min)
         
         if current_appt:
             status[assist_upper] = {
@@ -2197,6 +2144,7 @@ supabase_row_id = "main"
 
 gsheet_client = None
 gsheet_worksheet = None
+gsheet_handles = None
 
 
 def _safe_secret_get(key: str, default=None):
@@ -2386,14 +2334,78 @@ def _get_supabase_config_from_secrets_or_env():
     return url, effective_key, table, row_id
 
 
+def _get_supabase_storage_config():
+    """Return (storage_mode, rows_table): "payload" (single jsonb row) or "rows" (row per appointment)."""
+    mode = _safe_secret_get("supabase_storage_mode") or os.getenv("SUPABASE_STORAGE_MODE", "")
+    rows_table = _safe_secret_get("supabase_rows_table") or os.getenv("SUPABASE_ROWS_TABLE", "")
+    return normalize_storage_mode(mode), str(rows_table or "").strip() or DEFAULT_ROWS_TABLE
+
+
+def _get_load_profile() -> str:
+    """Column profile for loading the schedule: "live" (default) skips the lazy columns, "full" loads all."""
+    return normalize_load_profile(_safe_secret_get("schedule_load_profile") or os.getenv("SCHEDULE_LOAD_PROFILE", ""))
+
+
+def _get_supabase_payload_format() -> str:
+    """Payload-mode write format: "columnar" (default) or "rows" (row dicts, for older app versions)."""
+    return normalize_payload_format(_safe_secret_get("supabase_payload_format") or os.getenv("SUPABASE_PAYLOAD_FORMAT", ""))
+
+
+def _new_supabase_client(url: str, key: str):
+    """Build a Supabase client with keep-alive connections and explicit timeouts."""
+    try:
+        timeout = float(_safe_secret_get("supabase_timeout_seconds") or os.getenv("SUPABASE_TIMEOUT_SECONDS", "") or 10)
+    except (TypeError, ValueError):
+        timeout = 10.0
+    try:
+        import httpx
+        from supabase import ClientOptions  # type: ignore
+
+        http = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+        )
+        return create_client(url, key, options=ClientOptions(postgrest_client_timeout=timeout, httpx_client=http))
+    except (ImportError, TypeError):
+        # Older supabase-py without a shared httpx client option
+        return create_client(url, key)
+
+
+@st.cache_resource
+def _get_supabase_pool() -> SupabaseClientPool:
+    """Process-wide pool: one client per (url, key) shared by every session."""
+    return SupabaseClientPool(_new_supabase_client)
+
+
+def _supabase_client(url: str, key: str):
+    return _get_supabase_pool().get(url, key)
+
+
+@st.cache_resource
+def _get_change_feed() -> LocalChangeFeed:
+    """Process-wide schedule change feed.
+
+    Saves in this process publish to it directly; with `supabase_db_url` set,
+    a background LISTEN also relays saves made by other servers.
+    """
+    feed = LocalChangeFeed()
+    dsn = str(_safe_secret_get("supabase_db_url") or os.getenv("SUPABASE_DB_URL", "") or "").strip()
+    if dsn:
+        PostgresNotifyListener(dsn, feed).start()
+    return feed
+
+
 def _get_expected_columns():
     return [
         "Patient ID", "Patient Name", "In Time", "Out Time", "Procedure", "DR.",
         "FIRST", "SECOND", "Third", "CASE PAPER", "OP",
         "SUCTION", "CLEANING", "STATUS", "REMINDER_ROW_ID",
         "REMINDER_SNOOZE_UNTIL", "REMINDER_DISMISSED",
-        # Time tracking / status audit (stored in the same allotment table)
-        "STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT", "STATUS_LOG",
+        # Day of the appointment, stamped by save_data (see schedule_window)
+        "DATE",
+        # Latest status times; the full history is in the status event log
+        # (see status_events), older STATUS_LOG cells are still read
+        "STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT",
     ]
 
 
@@ -2417,26 +2429,6 @@ def _now_ist_str() -> str:
     return datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def _append_status_log(existing_value, event: dict) -> str:
-    """Append a status change event to a JSON list stored in a cell."""
-    items: list[dict] = []
-    try:
-        if isinstance(existing_value, list):
-            items = [x for x in existing_value if isinstance(x, dict)]
-        elif isinstance(existing_value, str) and existing_value.strip():
-            parsed = json.loads(existing_value)
-            if isinstance(parsed, list):
-                items = [x for x in parsed if isinstance(x, dict)]
-    except Exception:
-        items = []
-
-    items.append(dict(event))
-    try:
-        return json.dumps(items, ensure_ascii=False)
-    except Exception:
-        return ""
-
-
 def _get_patients_config_from_secrets_or_env():
     """Return (patients_table, id_col, name_col)."""
     patients_table = "patients"
@@ -2469,7 +2461,7 @@ def search_patients_from_supabase(
 ):
     """Search patients (id + name) from a Supabase table."""
     q = (_query or "").strip()
-    client = create_client(_url, _key)
+    client = _supabase_client(_url, _key)
 
     def _is_simple_ident(name: str) -> bool:
         return bool(re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", str(name or "")))
@@ -2602,82 +2594,122 @@ def search_patients_from_supabase(
     return out
 
 
-@st.cache_data(ttl=30)
-def load_data_from_supabase(_url: str, _key: str, _table: str, _row_id: str):
-    """Load dataframe payload from Supabase.
+def _supabase_data_version(_url: str, _key: str, _table: str, _row_id: str) -> str:
+    """Cheap probe of the state row's updated_at, used as the load cache key.
 
-    Storage model: a single row with `id` and `payload` (jsonb).
-    payload = {"columns": [...], "rows": [ {col: val, ...}, ... ]}
+    Falls back to a 30-second bucket when the probe fails, so the cache then
+    behaves like the old 30s TTL.
     """
     try:
-        client = create_client(_url, _key)
-        resp = client.table(_table).select("payload").eq("id", _row_id).execute()
-
-        data = getattr(resp, "data", None)
-        if not data:
-            return pd.DataFrame(columns=_get_expected_columns())
-        payload = data[0].get("payload") if isinstance(data, list) else None
-        if not payload:
-            return pd.DataFrame(columns=_get_expected_columns())
+        return probe_version(_supabase_client(_url, _key), _table, _row_id)
+    except Exception:
+        _get_supabase_pool().discard(_url, _key)
+        return f"ttl-{int(time_module.time() // 30)}"
 
-        columns = payload.get("columns") or _get_expected_columns()
-        # Ensure new expected columns are added for older saved payloads.
-        try:
-            expected = _get_expected_columns()
-            for col in expected:
-                if col not in columns:
-                    columns.append(col)
-        except Exception:
-            pass
-        rows = payload.get("rows") or []
-        df = pd.DataFrame(rows)
-        # Ensure expected columns are present and ordered
-        for col in columns:
-            if col not in df.columns:
-                df[col] = ""
-        df = df[columns]
 
-        # Optional metadata (e.g., assistant time blocks)
-        try:
-            meta = payload.get("meta")
-            if isinstance(meta, dict):
-                df.attrs["meta"] = dict(meta)
-        except Exception:
-            pass
-        return df
+@st.cache_data(max_entries=8)
+def load_data_from_supabase(
+    _url: str,
+    _key: str,
+    _table: str,
+    _row_id: str,
+    storage_mode: str = "payload",
+    rows_table: str = DEFAULT_ROWS_TABLE,
+    data_version: str = "",
+    profile: str = "full",
+    today: str | None = None,
+):
+    """Load the schedule from Supabase.
+
+    storage_mode "payload": a single row with `id` and `payload` (jsonb),
+    column-encoded or legacy row dicts (see payload_codec).
+    storage_mode "rows": one row per appointment in `rows_table`
+    (see supabase_store); columns/meta stay on the payload row.
+    The result is cached per `data_version` (see _supabase_data_version), so
+    the full download only happens after someone saved. The "live" profile
+    leaves out the lazy columns (see column_profiles and _lazy_fields), and
+    given `today` appointments dated earlier stay in storage (see
+    schedule_window).
+    """
+    try:
+        client = _supabase_client(_url, _key)
+        omit = omitted_columns(profile)
+        if normalize_storage_mode(storage_mode) == "rows":
+            return load_rows_frame(client, _table, _row_id, rows_table, _get_expected_columns(), omit, since=today)
+        return load_payload_frame(client, _table, _row_id, _get_expected_columns(), omit, today=today)
     except Exception as e:
+        _get_supabase_pool().discard(_url, _key)
         st.error(f"Error loading from Supabase: {e}")
         return None
 
 
-def save_data_to_supabase(_url: str, _key: str, _table: str, _row_id: str, df: pd.DataFrame) -> bool:
-    """Save dataframe payload to Supabase (upsert)."""
+@st.cache_data(ttl=300)
+def load_day_from_supabase(
+    _url: str,
+    _key: str,
+    _table: str,
+    _row_id: str,
+    storage_mode: str,
+    rows_table: str,
+    day: str,
+    data_version: str = "",
+):
+    """One day's appointments, including days archived out of the live load (see load_schedule_range)."""
     try:
-        client = create_client(_url, _key)
+        client = _supabase_client(_url, _key)
+        return load_schedule_range(client, _table, _row_id, storage_mode, rows_table, day, day, _get_expected_columns())
+    except Exception as e:
+        _get_supabase_pool().discard(_url, _key)
+        st.error(f"Error loading {day} from Supabase: {e}")
+        return None
 
-        df_clean = df.copy().fillna("")
-        # Convert to JSON-serializable primitives; avoid pandas NA
-        for col in df_clean.columns:
-            df_clean[col] = df_clean[col].astype(object)
-
-        payload = {
-            "columns": df_clean.columns.tolist(),
-            "rows": df_clean.to_dict(orient="records"),
-        }
 
+def save_data_to_supabase(
+    _url: str,
+    _key: str,
+    _table: str,
+    _row_id: str,
+    df: pd.DataFrame,
+    storage_mode: str = "payload",
+    rows_table: str = DEFAULT_ROWS_TABLE,
+    changes: Changeset | None = None,
+) -> bool:
+    """Save the schedule to Supabase, shipping only `changes` when given (see schedule_diff).
+
+    Raises on failure: this runs on the write-behind thread, so the caller
+    reports the error.
+    """
+    try:
         # Optional metadata (stored alongside rows/columns)
+        meta = None
         try:
             meta = _get_meta_from_df(df)
-            meta = _apply_time_blocks_to_meta(meta)
-            payload["meta"] = meta
         except Exception:
             pass
-        client.table(_table).upsert({"id": _row_id, "payload": payload}).execute()
+        if changes is None:
+            changes, _ = diff_frame(None, df, meta)
+        if changes.is_empty:
+            return True
+
+        client = _supabase_client(_url, _key)
+        today = datetime.now(IST).strftime("%Y-%m-%d")
+        if normalize_storage_mode(storage_mode) == "rows":
+            save_rows_frame(
+                client, _table, _row_id, rows_table, changes, meta,
+                now_iso=datetime.now(IST).isoformat(), since=today,
+            )
+        else:
+            save_payload_frame(
+                client, _table, _row_id, changes, meta, project=_url,
+                now_iso=datetime.now(IST).isoformat(), payload_format=_get_supabase_payload_format(),
+                lazy_columns=tuple(df.attrs.get("lazy_columns") or ()), today=today,
+            )
         load_data_from_supabase.clear()
+        _get_change_feed().publish(_row_id)
         return True
     except Exception as e:
-        st.error(f"Error saving to Supabase: {e}")
-        return False
+        _get_supabase_pool().discard(_url, _key)
+        raise RuntimeError(f"Error saving to Supabase: {e}") from e
 
 
 def _validate_service_account_info(info: dict) -> list[str]:
@@ -2695,13 +2727,19 @@ if SUPABASE_AVAILABLE:
     try:
         sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
         if sup_url and sup_key:
-            supabase_client = create_client(sup_url, sup_key)
+            supabase_pool = _get_supabase_pool()
+            supabase_client = supabase_pool.get(sup_url, sup_key)
             supabase_table_name = sup_table
             supabase_row_id = sup_row
-            # Quick connectivity check (will also validate credentials)
-            _ = supabase_client.table(supabase_table_name).select("id").limit(1).execute()
+            # Connectivity check (validates credentials); repeated at most once a minute per process
+            supabase_pool.check_health(
+                sup_url, sup_key,
+                lambda c: c.table(supabase_table_name).select("id").limit(1).execute(),
+            )
             USE_SUPABASE = True
             st.sidebar.success("🗄️ Connected to Supabase")
+            _pool_stats = supabase_pool.stats()
+            st.sidebar.caption(f"Supabase clients: {_pool_stats['opened']} opened · {_pool_stats['reused']} reused")
         else:
             # Not configured; show a quick setup helper.
             with st.sidebar.expander("✅ Quick setup (Supabase)", expanded=False):
@@ -2719,6 +2757,31 @@ if SUPABASE_AVAILABLE:
                     ");\n",
                     language="sql",
                 )
+                st.markdown(
+                    "Optional: set `supabase_storage_mode = \"rows\"` to store one row per appointment "
+                    "(saves then send only changed rows). It also needs this table:"
+                )
+                st.code(ROWS_TABLE_SQL, language="sql")
+                st.markdown(
+                    "Optional: this function lets payload-mode saves send only the edited cells "
+                    "(without it every save rewrites the whole payload):"
+                )
+                st.code(PAYLOAD_PATCH_SQL, language="sql")
+                st.markdown(
+                    "Optional: to push edits to dashboards running on other servers, add this trigger "
+                    "and set `supabase_db_url` (direct Postgres connection string; needs `psycopg`):"
+                )
+                st.code(NOTIFY_TRIGGER_SQL, language="sql")
+                st.markdown(
+                    "Optional: reminder snoozes are kept in their own table (`supabase_reminder_table`), "
+                    "so a snooze writes one small row instead of the whole schedule:"
+                )
+                st.code(REMINDER_TABLE_SQL, language="sql")
+                st.markdown(
+                    "Optional: status changes are appended to their own table "
+                    "(`supabase_status_events_table`) instead of a log cell on every row:"
+                )
+                st.code(STATUS_EVENTS_TABLE_SQL, language="sql")
                 st.markdown(
                     "If you use the **anon key**, you may need to adjust Row Level Security (RLS). "
                     "Recommended: enable RLS and add policies allowing the single state row (id = 'main'):"
@@ -2755,6 +2818,37 @@ if SUPABASE_AVAILABLE:
         )
         USE_SUPABASE = False
 
+@st.cache_resource
+def _get_sheets_quota() -> SheetsQuota:
+    """Process-wide Google Sheets request budget (every session draws from the same quota)."""
+    def per_minute(key: str) -> int:
+        raw = _safe_secret_get(key) or os.getenv(key.upper(), "")
+        try:
+            return int(raw) if str(raw).strip() else 60
+        except (TypeError, ValueError):
+            return 60
+
+    return SheetsQuota(per_minute("gsheets_reads_per_minute"), per_minute("gsheets_writes_per_minute"))
+
+
+@st.cache_resource
+def _gsheets_handles(spreadsheet_ref: str, client_email: str, _service_account_info: dict) -> SheetHandles:
+    """Authorized client, spreadsheet and worksheets, opened once per process.
+
+    Every call made through the handles is metered by _get_sheets_quota().
+    """
+    credentials = Credentials.from_service_account_info(
+        _service_account_info,
+        scopes=[
+            "https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive"
+        ]
+    )
+    quota = _get_sheets_quota()
+    spreadsheet = quota.call("read", _open_spreadsheet, gspread.authorize(credentials), spreadsheet_ref)
+    return open_handles(MeteredSpreadsheet(spreadsheet, quota))
+
+
 # Try to connect to Google Sheets if credentials are available (fallback)
 if (not USE_SUPABASE) and GSHEETS_AVAILABLE:
     try:
@@ -2807,21 +2901,20 @@ if (not USE_SUPABASE) and GSHEETS_AVAILABLE:
                     "In Streamlit secrets, paste it as a TOML multiline string using triple quotes (\"\"\")."
                 )
 
-            credentials = Credentials.from_service_account_info(
-                service_account_info,
-                scopes=[
-                    "https://www.googleapis.com/auth/spreadsheets",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-            )
-            gsheet_client = gspread.authorize(credentials)
-            
-            # Open spreadsheet by URL or ID
+            # Open spreadsheet by URL or ID (once per process, see _gsheets_handles)
             if spreadsheet_ref:
-                spreadsheet = _open_spreadsheet(gsheet_client, spreadsheet_ref)
-                gsheet_worksheet = spreadsheet.sheet1
+                gsheet_handles = _gsheets_handles(
+                    spreadsheet_ref, str(service_account_info.get("client_email", "")), service_account_info
+                )
+                gsheet_client = gsheet_handles.spreadsheet.client
+                gsheet_worksheet = gsheet_handles.worksheet
                 USE_GOOGLE_SHEETS = True
                 st.sidebar.success("☁️ Connected to Google Sheets")
+                _quota_stats = _get_sheets_quota().stats()
+                st.sidebar.caption(
+                    f"Sheets API: {_quota_stats['calls']} calls · {_quota_stats['retries']} retries · "
+                    f"{_quota_stats['throttled_waits']} throttled waits"
+                )
     except Exception as e:
         # Show a more actionable hint for the most common failure mode.
         msg = str(e)
@@ -2972,16 +3065,10 @@ if (not USE_SUPABASE) and GSHEETS_AVAILABLE:
 
 # Helper functions for Google Sheets
 @st.cache_data(ttl=30)  # Cache for 30 seconds to reduce API calls
-def load_data_from_gsheets(_worksheet):
-    """Load data from Google Sheets worksheet"""
+def load_data_from_gsheets(_handles: SheetHandles):
+    """Load the schedule and Meta sheets in one batched read (see sheets_reader)."""
     try:
-        meta: dict = {}
-        try:
-            meta = load_meta_from_gsheets(_worksheet)
-        except Exception:
-            meta = {}
-
-        data = _worksheet.get_all_records()
+        data, meta = read_schedule(_handles)
         if not data:
             # Return empty dataframe with expected columns
             df_empty = pd.DataFrame(columns=[
@@ -2996,90 +3083,58 @@ def load_data_from_gsheets(_worksheet):
         df.attrs["meta"] = meta
         return df
     except Exception as e:
+        if status_code(e) not in RETRY_STATUSES:
+            _gsheets_handles.clear()
         st.error(f"Error loading from Google Sheets: {e}")
         return None
 
 
-def _get_or_create_gsheets_meta_worksheet(_worksheet):
-    """Return the 'Meta' worksheet for the same spreadsheet, creating it if needed."""
-    # gspread worksheet has .spreadsheet
-    ss = getattr(_worksheet, "spreadsheet", None)
-    if ss is None:
-        raise RuntimeError("Unable to access spreadsheet from worksheet")
-    try:
-        return ss.worksheet("Meta")
-    except Exception:
+def _get_or_create_gsheets_meta_worksheet(handles: SheetHandles):
+    """Return the 'Meta' worksheet, creating it on first use (write path only)."""
+    if handles.meta_worksheet is None:
+        ss = handles.spreadsheet
         try:
-            return ss.add_worksheet(title="Meta", rows=50, cols=2)
+            handles.meta_worksheet = ss.worksheet(META_WORKSHEET)
         except Exception:
-            # Some environments disallow sheet creation; treat as non-fatal.
-            return None
-
-
-@st.cache_data(ttl=30)
-def load_meta_from_gsheets(_worksheet) -> dict:
-    """Load metadata from a 'Meta' worksheet (2 columns: key, value)."""
-    ws = _get_or_create_gsheets_meta_worksheet(_worksheet)
-    if ws is None:
-        return {}
-    values = ws.get_all_values()
-    if not values:
-        return {}
+            try:
+                handles.meta_worksheet = ss.add_worksheet(title=META_WORKSHEET, rows=50, cols=2)
+            except Exception:
+                # Some environments disallow sheet creation; treat as non-fatal.
+                return None
+    return handles.meta_worksheet
 
-    # Accept either with or without header row
-    meta: dict[str, str] = {}
-    start_row = 0
-    if len(values[0]) >= 2 and str(values[0][0]).strip().lower() in {"key", "k"}:
-        start_row = 1
-    for r in values[start_row:]:
-        if not r or len(r) < 2:
-            continue
-        k = str(r[0]).strip()
-        v = str(r[1]).strip()
-        if not k:
-            continue
-        meta[k] = v
-    return dict(meta)
+def save_data_to_gsheets(handles: SheetHandles, df, changes: Changeset | None = None, previous: Snapshot | None = None):
+    """Save dataframe to Google Sheets worksheet.
 
-def save_data_to_gsheets(worksheet, df):
-    """Save dataframe to Google Sheets worksheet"""
+    `changes` (against the `previous` snapshot) go out as one batchUpdate of
+    the changed cells, inserted and deleted rows, and the Meta sheet when
+    meta changed (see sheets_writer). Without them the grid is rewritten in
+    place. Raises on failure, like save_data_to_supabase.
+    """
     try:
-        # Clear existing data
-        worksheet.clear()
-        
-        # Convert dataframe to list of lists for gspread
-        # Handle NaN/None values
-        df_clean = df.fillna("")
-        
-        # Convert all values to strings to avoid serialization issues
-        for col in df_clean.columns:
-            df_clean[col] = df_clean[col].astype(str).replace('nan', '').replace('None', '').replace('NaT', '')
-        
-        # Write headers
-        headers = df_clean.columns.tolist()
-        
-        # Write data
-        values = [headers] + df_clean.values.tolist()
-        worksheet.update(values, 'A1')
+        meta = _get_meta_from_df(df)
+        if changes is None:
+            changes, _ = diff_frame(None, df, meta)
+        if changes.is_empty:
+            return True
+        meta_ws = None
+        if changes.meta_changed:
+            try:
+                meta_ws = _get_or_create_gsheets_meta_worksheet(handles)
+            except Exception:
+                # Non-fatal: schedule should still save
+                meta_ws = None
+        write_changes(handles.worksheet, previous, changes, meta_ws, meta)
 
-        # Persist metadata (time blocks) to Meta sheet
-        try:
-            meta_ws = _get_or_create_gsheets_meta_worksheet(worksheet)
-            if meta_ws is not None:
-                meta = _apply_time_blocks_to_meta(_get_meta_from_df(df))
-                meta_ws.clear()
-                meta_ws.update([["key", "value"]] + [[k, json.dumps(v) if isinstance(v, (dict, list)) else str(v)] for k, v in meta.items()], "A1")
-                load_meta_from_gsheets.clear()
-        except Exception:
-            # Non-fatal: schedule should still save
-            pass
-        
         # Clear the cache so next load gets fresh data
         load_data_from_gsheets.clear()
         return True
     except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
+        # Sheets may have been renamed or removed: reopen the handles next time
+        # (not after quota errors, reopening would only spend more of it)
+        if status_code(e) not in RETRY_STATUSES:
+            _gsheets_handles.clear()
+        raise RuntimeError(f"Error saving to Google Sheets: {e}") from e
 
 def _data_editor_has_pending_edits(editor_key: str) -> bool:
     """Detect pending edits without touching widget state.
@@ -3096,18 +3151,159 @@ def _data_editor_has_pending_edits(editor_key: str) -> bool:
         return False
 
 
+def _session_save_state() -> dict:
+    """Per-session persistence state shared with the background writer.
+
+    "snapshot" is what the backend holds (see schedule_diff) and "feed_seen"
+    the change-feed position this session already shows. "statuses" are the
+    row statuses of the frame last handed to storage, which save_data stamps
+    status changes against (None: use the snapshot's). A plain dict, so the
+    write-behind thread can update it without touching st.session_state.
+    """
+    state = st.session_state.get("_save_state")
+    if not isinstance(state, dict):
+        state = {"snapshot": None, "feed_seen": None, "statuses": None}
+        st.session_state["_save_state"] = state
+    return state
+
+
+def _merge_saves(older: tuple, newer: tuple) -> tuple:
+    """Newest frame, with the status events and detached stamps of both saves."""
+    detached = {row_id: dict(stamps) for row_id, stamps in older[3].items()}
+    for row_id, stamps in newer[3].items():
+        detached.setdefault(row_id, {}).update(stamps)
+    return newer[0], newer[1], older[2] + newer[2], detached
+
+
+def _get_save_queue() -> WriteBehindQueue | None:
+    """This session's write-behind queue; None when `write_behind_seconds` is 0 (synchronous saves)."""
+    raw = _safe_secret_get("write_behind_seconds")
+    if raw is None or str(raw).strip() == "":
+        raw = os.getenv("WRITE_BEHIND_SECONDS", "") or 1.0
+    try:
+        delay = float(raw)
+    except (TypeError, ValueError):
+        delay = 1.0
+    if delay <= 0:
+        return None
+    queue = st.session_state.get("_save_queue")
+    if not isinstance(queue, WriteBehindQueue):
+        queue = WriteBehindQueue(lambda item: _write_schedule(*item), delay=delay, combine=_merge_saves)
+        st.session_state["_save_queue"] = queue
+    queue.delay = delay
+    if USE_GOOGLE_SHEETS:
+        # Near the write quota, hold saves longer so they merge into fewer writes
+        queue.delay = max(delay, _get_sheets_quota().write_delay())
+    return queue
+
+
+@st.cache_resource
+def _gsheets_reminder_store(spreadsheet_id: str, _spreadsheet) -> GSheetsReminderStore:
+    return GSheetsReminderStore(_spreadsheet)
+
+
+@st.cache_resource
+def _file_reminder_store(path: str) -> JsonFileReminderStore:
+    return JsonFileReminderStore(path)
+
+
+@st.cache_resource
+def _gsheets_status_event_store(spreadsheet_id: str, _spreadsheet) -> GSheetsStatusEventStore:
+    return GSheetsStatusEventStore(_spreadsheet)
+
+
+@st.cache_resource
+def _file_status_event_store(path: str) -> JsonLinesStatusEventStore:
+    return JsonLinesStatusEventStore(path)
+
+
+def _get_status_event_store():
+    """Append-only status event log for the active backend (None when unavailable)."""
+    try:
+        if USE_SUPABASE:
+            sup_url, sup_key, _sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
+            table = str(
+                _safe_secret_get("supabase_status_events_table") or os.getenv("SUPABASE_STATUS_EVENTS_TABLE", "") or ""
+            ).strip() or DEFAULT_STATUS_EVENTS_TABLE
+            return SupabaseStatusEventStore(_supabase_client(sup_url, sup_key), sup_row, table)
+        if USE_GOOGLE_SHEETS:
+            spreadsheet = gsheet_worksheet.spreadsheet
+            return _gsheets_status_event_store(str(spreadsheet.id), spreadsheet)
+        return _file_status_event_store(os.path.splitext(file_path)[0] + ".status_events.jsonl")
+    except Exception:
+        return None
+
+
+def _get_reminder_store():
+    """Keyed snooze/dismiss store for the active backend (None when unavailable)."""
+    try:
+        if USE_SUPABASE:
+            sup_url, sup_key, _sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
+            table = str(
+                _safe_secret_get("supabase_reminder_table") or os.getenv("SUPABASE_REMINDER_TABLE", "") or ""
+            ).strip() or DEFAULT_REMINDER_TABLE
+            return SupabaseReminderStore(_supabase_client(sup_url, sup_key), sup_row, table)
+        if USE_GOOGLE_SHEETS:
+            spreadsheet = gsheet_worksheet.spreadsheet
+            return _gsheets_reminder_store(str(spreadsheet.id), spreadsheet)
+        return _file_reminder_store(os.path.splitext(file_path)[0] + ".reminders.json")
+    except Exception:
+        return None
+
+
+# Snoozes from other sessions show up within this many seconds
+_REMINDER_STATES_TTL = 60
+
+
+def _load_reminder_states(row_ids: frozenset) -> dict:
+    """Reminder states of the schedule's row IDs, read once per schedule and minute.
+
+    This session's own snoozes are written into the cached dict by
+    _persist_reminder_to_storage, so they show without another read.
+    """
+    key = (row_ids, int(time_module.time() // _REMINDER_STATES_TTL))
+    cached = st.session_state.get("_reminder_states")
+    if isinstance(cached, tuple) and cached[0] == key:
+        return cached[1]
+    store = _get_reminder_store()
+    try:
+        states = store.load(row_ids) if store is not None and row_ids else {}
+    except Exception:
+        states = {}
+    st.session_state["_reminder_states"] = (key, states)
+    return states
+
+
 # ================ Load Data ================
 df_raw = None
+_save_queue = _get_save_queue()
+_writes_before_load = _save_queue.written if _save_queue is not None else 0
 
 if USE_SUPABASE:
     sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
-    df_raw = load_data_from_supabase(sup_url, sup_key, sup_table, sup_row)
+    sup_mode, sup_rows_table = _get_supabase_storage_config()
+    # Read the feed position first so a save landing during the load still triggers a rerun
+    _session_save_state()["feed_seen"] = _get_change_feed().sequence(sup_row)
+    sup_version = _supabase_data_version(sup_url, sup_key, sup_table, sup_row)
+    df_raw = load_data_from_supabase(
+        sup_url, sup_key, sup_table, sup_row, sup_mode, sup_rows_table, sup_version, _get_load_profile(),
+        now.strftime("%Y-%m-%d"),
+    )
     if df_raw is None:
         st.error("⚠️ Failed to load data from Supabase.")
         st.stop()
+
+    if hasattr(st, "fragment"):
+        @st.fragment(run_every=timedelta(seconds=2))
+        def _watch_for_schedule_changes():
+            """Rerun this session when another session saved (in-memory check, no storage call)."""
+            if _get_change_feed().sequence(sup_row) != _session_save_state().get("feed_seen"):
+                st.rerun(scope="app")
+
+        _watch_for_schedule_changes()
 elif USE_GOOGLE_SHEETS:
     # Load from Google Sheets
-    df_raw = load_data_from_gsheets(gsheet_worksheet)
+    df_raw = load_data_from_gsheets(gsheet_handles)
     if df_raw is None:
         st.error("⚠️ Failed to load data from Google Sheets.")
         st.stop()
@@ -3118,52 +3314,29 @@ else:
         st.info("💡 See README for Supabase setup instructions.")
         st.stop()
     
-    # Retry logic to handle temporary file corruption during concurrent writes
-    max_retries = 3
-    retry_delay = 0.5  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            meta: dict[str, str] = {}
-            with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-                df_raw = pd.read_excel(xls, sheet_name="Sheet1")
-                try:
-                    if "Meta" in xls.sheet_names:
-                        meta_df = pd.read_excel(xls, sheet_name="Meta")
-                        if not meta_df.empty:
-                            # Expect columns: key, value (case-insensitive)
-                            cols = {str(c).strip().lower(): c for c in meta_df.columns}
-                            kcol = cols.get("key")
-                            vcol = cols.get("value")
-                            if kcol and vcol:
-                                for _, r in meta_df.iterrows():
-                                    k = str(r.get(kcol, "")).strip()
-                                    v = str(r.get(vcol, "")).strip()
-                                    if k:
-                                        meta[k] = v
-                except Exception:
-                    meta = {}
-            try:
-                if df_raw is not None:
-                    df_raw.attrs["meta"] = dict(meta)
-            except Exception:
-                pass
-            break  # Success, exit retry loop
-        except (zipfile.BadZipFile, Exception) as e:
-            if "BadZipFile" in str(type(e).__name__) or "Truncated" in str(e) or "corrupt" in str(e).lower():
-                if attempt < max_retries - 1:
-                    time_module.sleep(retry_delay)  # Wait before retry
-                    continue
-                else:
-                    st.error("⚠️ The Excel file appears to be corrupted or is being modified.")
-                    st.stop()
-            else:
-                raise e
-    
-    if df_raw is None:
-        st.error("⚠️ Failed to load the Excel file after multiple attempts.")
+    # Saves replace the file atomically under a lock, so a read never sees a partial write
+    try:
+        df_raw = read_workbook(file_path)
+    except Exception as e:
+        st.error(f"⚠️ The Excel file could not be read (it may be corrupted): {e}")
         st.stop()
 
+# What the backend now holds; save_data ships only the difference from it
+_save_state = _session_save_state()
+_queued_save = _save_queue.pending_item() if _save_queue is not None else None
+if _queued_save is not None:
+    # A background write is still on its way: show that frame (the writer owns the snapshot)
+    df_raw = _queued_save[0].copy()
+elif _save_queue is not None and _save_queue.written != _writes_before_load:
+    # A background write landed while we were loading; the load may predate it
+    df_raw = _save_queue.last_written[0].copy()
+elif df_raw.attrs.get("needs_full_save"):
+    _save_state["snapshot"] = _save_state["statuses"] = None
+else:
+    _save_state["snapshot"] = take_snapshot(df_raw, df_raw.attrs.get("meta"))
+    # Status changes from here on are against what was just loaded
+    _save_state["statuses"] = None
+
 # Prefer in-session pending changes when auto-save is off
 if st.session_state.get("unsaved_df") is not None:
     try:
@@ -3216,9 +3389,9 @@ if not isinstance(blocks, list) or not all(_is_time_block_valid(b) for b in bloc
     except Exception as e:
         st.warning(f"[Auto-repair] Failed to repair time_blocks format: {e}")
 
-# Ensure expected columns exist (backfills older data/backends)
+# Ensure expected columns exist (backfills older data/backends; lazy columns stay out of a live-view frame)
 for _col in _get_expected_columns():
-    if _col in df_raw.columns:
+    if _col in df_raw.columns or _col in (df_raw.attrs.get("lazy_columns") or ()):
         continue
     if _col == "REMINDER_SNOOZE_UNTIL":
         df_raw[_col] = pd.NA
@@ -3247,6 +3420,7 @@ _extra_assistants: list[str] = []
 for _c in ["FIRST", "SECOND", "Third", "CASE PAPER"]:
     _extra_assistants.extend(_collect_unique_upper(df_raw, _c))
 ASSISTANT_OPTIONS = _unique_preserve_order(ALL_ASSISTANTS + _extra_assistants)
+STAFF_REGISTRY.observe(doctors=_extra_doctors, assistants=_extra_assistants)
 
 # Status options: configured set + any existing values in data
 _extra_statuses = _collect_unique_upper(df_raw, "STATUS")
@@ -3254,17 +3428,17 @@ STATUS_OPTIONS = _unique_preserve_order(STATUS_BASE_OPTIONS + _extra_statuses)
 
 
 # Process data
-df = df_raw.copy()
-# Don't force numeric conversion yet - handle both formats
-df["In Time"] = df["In Time"]
-df["Out Time"] = df["Out Time"]
-
-df["In Time Str"] = df["In Time"].apply(dec_to_time)
-df["Out Time Str"] = df["Out Time"].apply(dec_to_time)
+def _add_time_columns(df_any: pd.DataFrame) -> None:
+    """Derive display strings, picker time objects and In_min/Out_min in one batched parse per column."""
+    for src, prefix in (("In Time", "In"), ("Out Time", "Out")):
+        minutes, labels = parse_time_series(df_any[src])
+        df_any[f"{prefix} Time Str"] = labels
+        # Time objects for picker
+        df_any[f"{prefix} Time Obj"] = minutes_to_time_objs(minutes)
+        df_any[f"{prefix}_min"] = minutes
+    # Handle possible overnight cases
+    df_any.loc[df_any["Out_min"] < df_any["In_min"], "Out_min"] += 1440
 
-# Create time objects for picker
-df["In Time Obj"] = df["In Time Str"].apply(safe_str_to_time_obj)
-df["Out Time Obj"] = df["Out Time Str"].apply(safe_str_to_time_obj)
 
 # Convert checkbox columns (SUCTION, CLEANING) - checkmark or content to boolean
 def str_to_checkbox(val: Any) -> bool:
@@ -3298,19 +3472,6 @@ def str_to_checkbox(val: Any) -> bool:
     # Any other non-empty content is treated as checked (legacy behavior)
     return True
 
-# Convert existing checkbox data
-if "SUCTION" in df.columns:
-    df["SUCTION"] = df["SUCTION"].apply(str_to_checkbox)
-if "CLEANING" in df.columns:
-    df["CLEANING"] = df["CLEANING"].apply(str_to_checkbox)
-
-# Convert time values to minutes since midnight for comparison (function defined earlier)
-df["In_min"] = df["In Time"].apply(time_to_minutes).astype('Int64')
-df["Out_min"] = df["Out Time"].apply(time_to_minutes).astype('Int64')
-
-# Handle possible overnight cases
-df.loc[df["Out_min"] < df["In_min"], "Out_min"] += 1440
-
 # Current time in minutes (same day)
 current_min = now.hour * 60 + now.minute
 
@@ -3341,33 +3502,156 @@ if 'REMINDER_SNOOZE_UNTIL' not in df_raw.columns:
 if 'REMINDER_DISMISSED' not in df_raw.columns:
     df_raw['REMINDER_DISMISSED'] = False
 
-# Refresh df with new columns
+# Build the working frame once the reminder columns are in place
 df = df_raw.copy()
 
-# Re-process time columns after df reassignment
-df["In Time Str"] = df["In Time"].apply(dec_to_time)
-df["Out Time Str"] = df["Out Time"].apply(dec_to_time)
-df["In Time Obj"] = df["In Time Str"].apply(safe_str_to_time_obj)
-df["Out Time Obj"] = df["Out Time Str"].apply(safe_str_to_time_obj)
+# Time columns (Str / Obj / In_min / Out_min)
+_add_time_columns(df)
 
-# Re-convert checkbox columns
+# Convert checkbox columns
 if "SUCTION" in df.columns:
     df["SUCTION"] = df["SUCTION"].apply(str_to_checkbox)
 if "CLEANING" in df.columns:
     df["CLEANING"] = df["CLEANING"].apply(str_to_checkbox)
 
-# Ensure In_min/Out_min exist
-df["In_min"] = df["In Time"].apply(time_to_minutes).astype('Int64')
-df["Out_min"] = df["Out Time"].apply(time_to_minutes).astype('Int64')
-# Handle possible overnight cases
-df.loc[df["Out_min"] < df["In_min"], "Out_min"] += 1440
-
 # Mark ongoing
 df["Is_Ongoing"] = (df["In_min"] <= current_min) & (current_min <= df["Out_min"])
 
+# Today's appointments from shortly before now: what the ongoing/upcoming
+# panels and reminders scan (stats, planning and the assistant index, which
+# is cached per schedule version, keep the whole frame)
+df_live = df[live_window_mask(df, now.strftime("%Y-%m-%d"), current_min)]
+
 # ================ Unified Save Function ================
+def _excel_meta_rows(meta: dict) -> list[dict]:
+    meta_rows = []
+    for k, v in meta.items():
+        if isinstance(v, (dict, list)):
+            meta_rows.append({"key": str(k), "value": json.dumps(v)})
+        else:
+            meta_rows.append({"key": str(k), "value": str(v)})
+    return meta_rows
+
+
+def _patch_excel_cells(path: str, out: str, changes: Changeset, meta: dict) -> bool:
+    """Save `path` with only the edited cells (and Meta when it changed) changed to `out`.
+
+    False when the file no longer lines up.
+    """
+    from openpyxl import load_workbook
+
+    if not (changes.keys_are_ids and "REMINDER_ROW_ID" in changes.columns):
+        return False
+    wb = load_workbook(path)
+    try:
+        ws = wb["Sheet1"]
+        header = [c.value for c in ws[1]]
+        if [str(h).strip() if h is not None else "" for h in header[:len(changes.columns)]] != [c.strip() for c in changes.columns]:
+            return False
+        id_col = changes.columns.index("REMINDER_ROW_ID") + 1
+        for change in changes.updated:
+            if str(ws.cell(row=change.position + 2, column=id_col).value or "").strip() != change.key:
+                return False
+        for pos, col, value in cell_updates(changes):
+            ws.cell(row=pos + 2, column=col + 1, value=None if value == "" else value)
+        if changes.meta_changed:
+            if "Meta" in wb.sheetnames:
+                del wb["Meta"]
+            ws_meta = wb.create_sheet("Meta")
+            ws_meta.append(["key", "value"])
+            for row in _excel_meta_rows(meta):
+                ws_meta.append([row["key"], row["value"]])
+        wb.save(out)
+        return True
+    finally:
+        wb.close()
+
+
+def _save_data_to_excel(path: str, dataframe: pd.DataFrame, changes: Changeset, meta: dict) -> bool:
+    """Write a new workbook beside `path` and swap it in (see excel_store.write_workbook)."""
+    if changes.is_empty:
+        return True
+
+    def write(out: str) -> bool:
+        if changes.only_updates:
+            try:
+                if _patch_excel_cells(path, out, changes, meta):
+                    return True
+            except Exception:
+                pass
+        with pd.ExcelWriter(out, engine='openpyxl') as writer:
+            dataframe.to_excel(writer, sheet_name='Sheet1', index=False)
+            # Persist metadata (time blocks) into a separate sheet
+            try:
+                pd.DataFrame(_excel_meta_rows(meta)).to_excel(writer, sheet_name='Meta', index=False)
+            except Exception:
+                pass
+        return True
+
+    return write_workbook(path, write)
+
+
+def _write_schedule(dataframe, state: dict, events=(), detached=None) -> bool:
+    """Ship the difference between `state["snapshot"]` and `dataframe` (meta already applied).
+
+    Runs on the script thread or the write-behind thread, so no UI calls here.
+    The status `events` (stamped by save_data) are appended to the status
+    event log once the save went through.
+    """
+    meta = _get_meta_from_df(dataframe)
+    changes, snapshot = diff_frame(state.get("snapshot"), dataframe, meta)
+    if USE_SUPABASE:
+        sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
+        sup_mode, sup_rows_table = _get_supabase_storage_config()
+        success = save_data_to_supabase(sup_url, sup_key, sup_table, sup_row, dataframe, sup_mode, sup_rows_table, changes)
+        if success:
+            # Our own save needs no change-feed rerun
+            state["feed_seen"] = _get_change_feed().sequence(sup_row)
+    elif USE_GOOGLE_SHEETS:
+        success = save_data_to_gsheets(gsheet_handles, dataframe, changes, state.get("snapshot"))
+    else:
+        success = _save_data_to_excel(file_path, dataframe, changes, meta)
+    if success:
+        state["snapshot"] = snapshot
+        if events:
+            _log_status_events(events, detached, state)
+    return success
+
+
+def _log_status_events(events, detached, state: dict) -> None:
+    """Append status events; stamp audit columns the live view was loaded without.
+
+    Best effort: the schedule itself is already saved. A failure is kept in
+    state["status_log_error"] for the script thread to show.
+    """
+    errors = []
+    store = _get_status_event_store()
+    try:
+        if store is not None:
+            store.append(events)
+    except Exception as e:
+        errors.append(f"event log: {e}")
+    if USE_SUPABASE and detached:
+        sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
+        sup_mode, sup_rows_table = _get_supabase_storage_config()
+        try:
+            save_lazy_fields(
+                _supabase_client(sup_url, sup_key), sup_table, sup_row, sup_mode, sup_rows_table, detached,
+                project=sup_url, now_iso=datetime.now(IST).isoformat(),
+            )
+        except Exception as e:
+            errors.append(f"audit times: {e}")
+    state["status_log_error"] = "; ".join(errors)
+
+
 def save_data(dataframe, show_toast=True, message="Data saved!"):
-    """Save dataframe to Google Sheets or Excel based on configuration"""
+    """Save dataframe to Supabase, Google Sheets or Excel based on configuration.
+
+    By default the frame is handed to the session's write-behind queue, so
+    several saves in quick succession become one background write. Only the
+    difference against the last loaded/saved snapshot is shipped when the
+    backend can apply it (see schedule_diff).
+    """
     try:
         # Ensure metadata is updated with current time blocks before saving
         if not hasattr(dataframe, 'attrs'):
@@ -3375,36 +3659,33 @@ def save_data(dataframe, show_toast=True, message="Data saved!"):
         meta = _get_meta_from_df(dataframe)
         meta = _apply_time_blocks_to_meta(meta)
         dataframe.attrs["meta"] = meta
-        
-        if USE_SUPABASE:
-            sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
-            success = save_data_to_supabase(sup_url, sup_key, sup_table, sup_row, dataframe)
-            if success and show_toast:
-                st.toast(f"🗄️ {message}", icon="✅")
-            return success
-        elif USE_GOOGLE_SHEETS:
-            success = save_data_to_gsheets(gsheet_worksheet, dataframe)
-            if success and show_toast:
-                st.toast(f"☁️ {message}", icon="✅")
-            return success
+        # New and older undated appointments belong to today
+        stamp_dates(dataframe, now.strftime("%Y-%m-%d"))
+        # Saved frames were edited in place: hash them again on the next lookup
+        _data_versions.pop(id(dataframe), None)
+
+        # Stamp status changes now, at edit time, against the frame last handed
+        # to storage: merged background writes would otherwise skip steps
+        state = _session_save_state()
+        base = state.get("statuses")
+        if base is None and state.get("snapshot") is not None:
+            base = row_statuses(state["snapshot"])
+        events, detached = stamp_status_changes(
+            base, dataframe, datetime.now(IST).isoformat(timespec="seconds"), _now_ist_str()
+        )
+
+        queue = _get_save_queue()
+        if queue is not None:
+            queue.submit((dataframe.copy(), state, events, detached))
+            success = True
         else:
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                dataframe.to_excel(writer, sheet_name='Sheet1', index=False)
-                # Persist metadata (time blocks) into a separate sheet
-                try:
-                    meta = _apply_time_blocks_to_meta(_get_meta_from_df(dataframe))
-                    meta_rows = []
-                    for k, v in meta.items():
-                        if isinstance(v, (dict, list)):
-                            meta_rows.append({"key": str(k), "value": json.dumps(v)})
-                        else:
-                            meta_rows.append({"key": str(k), "value": str(v)})
-                    pd.DataFrame(meta_rows).to_excel(writer, sheet_name='Meta', index=False)
-                except Exception:
-                    pass
-            if show_toast:
-                st.toast(f"💾 {message}", icon="✅")
-            return True
+            success = _write_schedule(dataframe, state, events, detached)
+        if success:
+            state["statuses"] = row_statuses(dataframe)
+        if success and show_toast:
+            icon = "🗄️" if USE_SUPABASE else ("☁️" if USE_GOOGLE_SHEETS else "💾")
+            st.toast(f"{icon} {message}", icon="✅")
+        return success
     except Exception as e:
         st.error(f"Error saving data: {e}")
         return False
@@ -3412,6 +3693,7 @@ def save_data(dataframe, show_toast=True, message="Data saved!"):
 
 def _queue_unsaved_df(df_pending: pd.DataFrame, reason: str = "") -> None:
     """Keep changes in memory when auto-save is disabled."""
+    _data_versions.pop(id(df_pending), None)
     try:
         st.session_state.unsaved_df = df_pending.copy()
     except Exception:
@@ -3487,6 +3769,37 @@ with st.sidebar:
                 message=st.session_state.get("pending_changes_reason") or "Auto-saved pending changes",
             )
 
+    if st.button("💾 Save Changes", key="save_changes_btn", use_container_width=True):
+        saved = True
+        if st.session_state.get("unsaved_df") is not None:
+            saved = save_data(st.session_state.unsaved_df, show_toast=False)
+            if saved:
+                st.session_state.unsaved_df = None
+                st.session_state.pending_changes = False
+                st.session_state.pending_changes_reason = ""
+        if _save_queue is not None:
+            saved = _save_queue.flush() and saved
+        if saved:
+            st.toast("💾 All changes saved", icon="✅")
+        else:
+            st.error(f"Save failed: {getattr(_save_queue, 'last_error', '') or 'see error above'}")
+
+    if _save_queue is not None and hasattr(st, "fragment"):
+        @st.fragment(run_every=timedelta(seconds=2))
+        def _save_status_indicator():
+            status = _save_queue.status()
+            if status in ("pending", "flushing"):
+                st.caption("⏳ Saving in background…")
+            elif status == "failed":
+                st.caption(f"⚠️ Background save failed ({_save_queue.last_error}). Click 'Save Changes' to retry.")
+            elif status == "flushed":
+                st.caption("✅ All changes saved")
+
+        _save_status_indicator()
+
+    if _save_state.get("status_log_error"):
+        st.warning(f"⚠️ Status history was not fully recorded ({_save_state['status_log_error']})")
+
     st.markdown("---")
     st.markdown("## ⏰ Time Blocking")
     st.caption("Block assistants for backend work")
@@ -3699,6 +4012,18 @@ def _persist_reminder_to_storage(row_id, until, dismissed):
         if match.empty:
             return False
 
+        store = _get_reminder_store()
+        if store is not None:
+            try:
+                # One keyed write; the schedule itself is left alone
+                store.set(str(row_id), int(until) if until is not None else None, bool(dismissed))
+                cached = st.session_state.get("_reminder_states")
+                if isinstance(cached, tuple):
+                    cached[1][str(row_id)] = ReminderState(int(until) if until is not None else None, bool(dismissed))
+                return True
+            except Exception:
+                pass  # e.g. reminder table not created yet: keep the legacy columns
+
         ix = match.index[0]
         df_raw.at[ix, 'REMINDER_SNOOZE_UNTIL'] = int(until) if until is not None else pd.NA
         df_raw.at[ix, 'REMINDER_DISMISSED'] = bool(dismissed)
@@ -3759,8 +4084,20 @@ for idx, row in df_raw.iterrows():
     except Exception:
         continue
 
-# Compute hash to detect file changes
-current_hash = hashlib.md5(pd.util.hash_pandas_object(df_raw).values.tobytes()).hexdigest()
+# The reminder store overrides the legacy columns for every row it knows
+_schedule_row_ids = frozenset(df_raw['REMINDER_ROW_ID'].dropna().astype(str))
+for _rid, _state in _load_reminder_states(_schedule_row_ids).items():
+    st.session_state.snoozed.pop(_rid, None)
+    st.session_state.reminder_sent.discard(_rid)
+    if _state.until is not None and _state.until > now_epoch:
+        st.session_state.snoozed[_rid] = _state.until
+    if _state.dismissed:
+        st.session_state.reminder_sent.add(_rid)
+
+# Compute hash to detect file changes (display columns only; the status history never changes the view)
+current_hash = hashlib.md5(
+    pd.util.hash_pandas_object(df_raw[display_columns(df_raw.columns)]).values.tobytes()
+).hexdigest()
 
 if st.session_state.prev_hash != current_hash:
     st.toast("📊 ALLOTMENT UPDATED", icon="🔄")
@@ -3777,9 +4114,9 @@ if "Is_Ongoing" not in df.columns:
     df["Is_Ongoing"] = (df["In_min"] <= current_min) & (current_min <= df["Out_min"])
 
 # Currently Ongoing (filtered)
-ongoing_df = df[
-    df["Is_Ongoing"] &
-    ~df["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED", na=True)
+ongoing_df = df_live[
+    df_live["Is_Ongoing"] &
+    ~df_live["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED", na=True)
 ]
 
 current_ongoing = set(ongoing_df["Patient Name"].dropna())
@@ -3792,10 +4129,10 @@ for patient in new_ongoing:
 
 # Upcoming in next 15 minutes
 upcoming_min = current_min + 15
-upcoming_df = df[
-    (df["In_min"] > current_min) &
-    (df["In_min"] <= upcoming_min) &
-    ~df["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED|ARRIVED|ARRIVING|ON GOING|ONGOING", na=True)
+upcoming_df = df_live[
+    (df_live["In_min"] > current_min) &
+    (df_live["In_min"] <= upcoming_min) &
+    ~df_live["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED|ARRIVED|ARRIVING|ON GOING|ONGOING", na=True)
 ]
 
 current_upcoming = set(upcoming_df["Patient Name"].dropna())
@@ -3816,11 +4153,11 @@ if st.session_state.get("enable_reminders", True):
         # Don't persist clears on natural expiry; we'll overwrite when re-snoozing.
     
     # Find patients needing reminders (0-15 min before In Time)
-    reminder_df = df[
-        (df["In_min"].notna()) &
-        (df["In_min"] - current_min > 0) &
-        (df["In_min"] - current_min <= 15) &
-        ~df["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED|ARRIVED|ARRIVING|ON GOING|ONGOING", na=True)
+    reminder_df = df_live[
+        (df_live["In_min"].notna()) &
+        (df_live["In_min"] - current_min > 0) &
+        (df_live["In_min"] - current_min <= 15) &
+        ~df_live["STATUS"].astype(str).str.upper().str.contains("CANCELLED|DONE|COMPLETED|SHIFTED|ARRIVED|ARRIVING|ON GOING|ONGOING", na=True)
     ].copy()
     
     # Show toast for new reminders (not snoozed, not dismissed)
@@ -3961,6 +4298,38 @@ st.session_state.prev_ongoing = current_ongoing
 st.session_state.prev_upcoming = current_upcoming
 st.session_state.prev_raw = df_raw.copy()
 
+# ================ DOUBLE-BOOKING CHECK ================
+def _get_double_bookings(df_schedule: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Chair/doctor/assistant overlaps among today's rows, recomputed only when the data changes.
+
+    The cell highlights cover today's rows only (same index labels as the schedule).
+    """
+    version = _today_version(df_schedule)
+    cached = st.session_state.get("_double_booking_cache")
+    if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == version:
+        return cached[1]
+    result = find_double_bookings(_today_rows(df_schedule), normalizers={"DR.": _canonical_doctor_name})
+    st.session_state["_double_booking_cache"] = (version, result)
+    return result
+
+
+double_bookings, double_booking_cells = _get_double_bookings(df)
+if not double_bookings.empty:
+    st.warning(f"⚠️ {len(double_bookings)} double booking(s) detected (same chair, doctor or assistant at overlapping times)")
+    with st.expander("Show double bookings", expanded=False):
+        st.dataframe(double_bookings, width="stretch", hide_index=True)
+        _conflict_cols = [c for c in ["Patient Name", "In Time Str", "Out Time Str", "DR.", "OP", "FIRST", "SECOND", "Third", "STATUS"] if c in df.columns]
+        _conflict_rows = double_booking_cells.any(axis=1)
+        _conflict_view = df.loc[_conflict_rows.index[_conflict_rows], _conflict_cols]
+        _conflict_marks = double_booking_cells.loc[_conflict_rows, _conflict_cols]
+        st.dataframe(
+            _conflict_view.style.apply(
+                lambda _: _conflict_marks.map(lambda hit: f"background-color: {COLORS['danger']}; color: white;" if hit else ""),
+                axis=None,
+            ),
+            width="stretch",
+        )
+
 # ================ Doctor Statistics ================
 st.markdown("### 👨‍⚕️ Schedule Summary by Doctor")
 groupby_column = "DR."
@@ -4202,14 +4571,223 @@ with st.expander("🔄 Automatic Assistant Allocation", expanded=False):
     else:
         st.caption("Select a doctor to see department-specific assistant availability")
 
+    if has_permission('edit_appointments'):
+        st.markdown("---")
+        st.caption("Fill assistants for every open appointment today in one pass (In Time order)")
+        if st.button("⚡ Auto-fill Whole Day", key="auto_alloc_day_btn"):
+            # Today's rows only: In_min carries no date, and other days follow other rosters
+            day_allocations = auto_allocate_day(
+                _today_rows(df),
+                DEPARTMENTS,
+                get_department_for_doctor,
+                only_fill_empty=st.session_state.get("auto_assign_only_empty", True),
+                is_unavailable=_is_assistant_off_or_blocked,
+            )
+            if day_allocations:
+                changed = apply_allocations(df_raw, day_allocations)
+                _maybe_save(df_raw, message=f"Auto-allocated {changed} assistant slot(s) across {len(day_allocations)} appointment(s)")
+                st.rerun()
+            else:
+                st.info("Nothing to allocate: no open slots with free assistants.")
+
+# ================ EARLIEST FREE SLOT FINDER ================
+with st.expander("🔎 Find Earliest Free Slot", expanded=False):
+    st.caption("Earliest windows where the doctor, an OP chair and enough department assistants are all free")
+
+    col_fd, col_dur, col_need, col_n = st.columns(4)
+    with col_fd:
+        slot_doctor = st.selectbox("Doctor", options=[""] + ALL_DOCTORS, key="slot_finder_doctor")
+    with col_dur:
+        slot_duration = st.number_input("Duration (min)", min_value=5, max_value=480, value=30, step=5, key="slot_finder_duration")
+    with col_need:
+        slot_needed = st.number_input("Assistants needed", min_value=0, max_value=3, value=1, step=1, key="slot_finder_needed")
+    with col_n:
+        slot_limit = st.number_input("Options", min_value=1, max_value=20, value=5, step=1, key="slot_finder_limit")
+    slot_scope = st.radio("Search", options=["Today", "This week"], horizontal=True, key="slot_finder_scope")
+
+    if slot_doctor:
+        slot_dept = get_department_for_doctor(slot_doctor)
+        slot_assistants = get_assistants_for_department(slot_dept)
+        today_occupancy = _get_day_occupancy(df)
+        block_index = _get_time_block_index()
+        found: list[dict[str, Any]] = []
+        skipped_days: list[str] = []
+        slot_dates = row_dates(df) if slot_scope == "This week" else None
+        for day_offset in range(7 if slot_scope == "This week" else 1):
+            day = now + timedelta(days=day_offset)
+            if day_offset == 0:
+                day_occupancy = today_occupancy
+                day_start = max(8 * 60, now.hour * 60 + now.minute)
+            else:
+                # A day without loaded appointments is unknown (closed or not scheduled yet), not free
+                day_rows = df[slot_dates.eq(day.strftime("%Y-%m-%d"))]
+                if day_rows.empty:
+                    skipped_days.append(day.strftime("%a %d %b"))
+                    continue
+                day_occupancy = build_day_occupancy(
+                    day_rows,
+                    assistants=slot_assistants,
+                    ops=today_occupancy.names["op"],
+                    doctors=[slot_doctor],
+                    normalizers=today_occupancy.normalizers,
+                )
+                day_occupancy.set_unavailable(WEEKLY_OFF.get(day.weekday(), []), block_index.blocks_on(day.strftime("%Y-%m-%d")))
+                day_start = 8 * 60
+            for window in find_free_windows(
+                day_occupancy,
+                int(slot_duration),
+                doctor=slot_doctor,
+                assistants=slot_assistants,
+                n_assistants=int(slot_needed),
+                start_min=day_start,
+                end_min=21 * 60,
+                limit=int(slot_limit) - len(found),
+            ):
+                found.append({
+                    "Day": day.strftime("%a %d %b"),
+                    "Start": f"{window['start_min'] // 60:02d}:{window['start_min'] % 60:02d}",
+                    "End": f"{(window['end_min'] // 60) % 24:02d}:{window['end_min'] % 60:02d}",
+                    "Chairs free": ", ".join(window["ops"]) or "—",
+                    "Assistants free": ", ".join(a.title() for a in window["assistants"]) or "—",
+                })
+            if len(found) >= int(slot_limit):
+                break
+        if found:
+            st.dataframe(pd.DataFrame(found), width="stretch", hide_index=True)
+        else:
+            st.warning("No free window found for these requirements.")
+        if skipped_days:
+            st.caption(f"Not searched (no appointments loaded for these days): {', '.join(skipped_days)}")
+    else:
+        st.caption("Select a doctor to search for free windows")
+
+# ================ STATUS HISTORY ================
+def _lazy_fields(row_ids: list[str]) -> dict[str, dict]:
+    """Lazy columns (status log, audit times) for some rows, fetched only when a view asks."""
+    if not row_ids:
+        return {}
+    if USE_SUPABASE and df_raw.attrs.get("lazy_columns"):
+        sup_url, sup_key, sup_table, sup_row = _get_supabase_config_from_secrets_or_env()
+        sup_mode, sup_rows_table = _get_supabase_storage_config()
+        try:
+            return load_lazy_fields(_supabase_client(sup_url, sup_key), sup_table, sup_row, sup_mode, sup_rows_table, row_ids)
+        except Exception as e:
+            _get_supabase_pool().discard(sup_url, sup_key)
+            st.error(f"Error loading status history: {e}")
+            return {}
+    cols = [c for c in LAZY_COLUMNS if c in df_raw.columns]
+    rows = df_raw[df_raw["REMINDER_ROW_ID"].astype(str).isin(row_ids)]
+    return {str(r["REMINDER_ROW_ID"]): {c: r[c] for c in cols} for _, r in rows.iterrows()}
+
+
+def _status_events(by: str, value: str) -> list:
+    """Status events of one row (by="row") or one day (by="day") from the event log."""
+    store = _get_status_event_store()
+    if store is None:
+        return []
+    try:
+        return store.for_row(value) if by == "row" else store.for_day(value)
+    except Exception as e:
+        st.error(f"Error loading status history: {e}")
+        return []
+
+
+def _status_events_frame(events: list, labels: dict[str, str]) -> pd.DataFrame:
+    def _local(at: str) -> str:
+        try:
+            ts = pd.Timestamp(at)
+            return (ts.tz_convert(IST) if ts.tzinfo else ts).strftime("%Y-%m-%d %H:%M:%S")
+        except (ValueError, TypeError):
+            return at
+
+    return pd.DataFrame([
+        {"Appointment": labels.get(e.row_id, e.row_id), "From": e.from_status, "To": e.to_status, "At": _local(e.at)}
+        for e in events
+    ])
+
+
+with st.expander("🕒 Status History", expanded=False):
+    _history_rows = df_raw[df_raw["REMINDER_ROW_ID"].astype(str).str.strip().ne("")]
+    _history_labels = {
+        str(r["REMINDER_ROW_ID"]): f"{r.get('Patient Name', '')} – {r.get('In Time', '')} ({r.get('DR.', '')})"
+        for _, r in _history_rows.iterrows()
+    }
+    _history_pick = st.selectbox(
+        "Appointment",
+        options=list(_history_labels),
+        index=None,
+        format_func=lambda rid: _history_labels.get(rid, rid),
+        placeholder="Choose an appointment",
+        key="status_history_row",
+    )
+    if _history_pick:
+        _fields = _lazy_fields([_history_pick]).get(_history_pick, {})
+        _audit = {c: _fields.get(c) for c in ("STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT") if _fields.get(c)}
+        if _audit:
+            st.caption(" · ".join(f"{k.replace('_', ' ').title()}: {v}" for k, v in _audit.items()))
+        _events = legacy_events(_history_pick, _fields.get("STATUS_LOG")) + _status_events("row", _history_pick)
+        if _events:
+            st.dataframe(_status_events_frame(_events, _history_labels), hide_index=True)
+        else:
+            st.caption("No status changes recorded.")
+    if st.toggle("All status changes today", key="status_history_today"):
+        _events = _status_events("day", now.strftime("%Y-%m-%d"))
+        if _events:
+            st.dataframe(_status_events_frame(_events, _history_labels), hide_index=True)
+        else:
+            st.caption("No status changes recorded today.")
+
+with st.expander("📅 Schedule by Day", expanded=False):
+    _day_pick = st.date_input("Day", value=(now - timedelta(days=1)).date(), key="schedule_by_day")
+    _day_str = _day_pick.strftime("%Y-%m-%d") if _day_pick else ""
+    if _day_str:
+        if USE_SUPABASE:
+            # Earlier days are not in the live load; read them from their partition
+            _day_df = load_day_from_supabase(
+                sup_url, sup_key, sup_table, sup_row, sup_mode, sup_rows_table, _day_str, sup_version
+            )
+        else:
+            _day_df = df_raw[row_dates(df_raw).eq(_day_str)]
+        _day_cols = [c for c in ["Patient Name", "In Time", "Out Time", "Procedure", "DR.", "OP", "FIRST", "SECOND", "Third", "STATUS"]
+                     if _day_df is not None and c in _day_df.columns]
+        if _day_df is None or _day_df.empty:
+            st.caption(f"No appointments recorded for {_day_pick.strftime('%a %d %b')}.")
+        else:
+            st.dataframe(_day_df[_day_cols], width="stretch", hide_index=True)
+
+# ================ OCCUPANCY HEATMAP ================
+with st.expander("🗺️ Occupancy Heatmap (5-minute slots)", expanded=False):
+    st.caption("Appointments per resource in each 5-minute slot today. Shaded = weekly off / blocked, red = double-booked.")
+    heat_kind_label = st.radio(
+        "Show",
+        options=["Assistants", "OP chairs", "Doctors"],
+        horizontal=True,
+        key="occupancy_heatmap_kind",
+    )
+    heat_kind = {"Assistants": "assistant", "OP chairs": "op", "Doctors": "doctor"}[heat_kind_label]
+    heat_df = _get_day_occupancy(df).heatmap(heat_kind)
+    if heat_df.empty:
+        st.info("No resources to show.")
+    else:
+        def _heat_cell_style(value: int) -> str:
+            if value < 0:
+                return f"background-color: {COLORS['accent']}; color: transparent;"
+            if value == 0:
+                return "color: transparent;"
+            if value == 1:
+                return f"background-color: {COLORS['success']}; color: transparent;"
+            return f"background-color: {COLORS['danger']}; color: white;"
+
+        st.dataframe(heat_df.style.map(_heat_cell_style), width="stretch")
+
 # ================ ASSISTANT WORKLOAD SUMMARY ================
 st.markdown("### 📊 Assistant Workload Summary")
 
 # Count appointments per assistant
 assistant_workload = {}
+_workload_index = _get_schedule_index(df)
 for assistant in ALL_ASSISTANTS:
-    schedule = get_assistant_schedule(assistant.upper(), df)
-    assistant_workload[assistant] = len(schedule)
+    assistant_workload[assistant] = _workload_index.count(assistant.upper())
 
 # Create workload dataframe
 workload_data = []
@@ -0,0 +1,158 @@
+"""
+Schedule change notifications.
+
+LocalChangeFeed is an in-process broadcast: every save publishes the state
+row id, and each dashboard session compares the feed's sequence number for
+that id with the one it last rendered. The check is a dict lookup, so
+sessions can run it every second or two without touching storage.
+
+PostgresNotifyListener extends the feed across processes/servers: a trigger
+on the state table sends NOTIFY (see NOTIFY_TRIGGER_SQL) and a background
+thread LISTENs on a direct database connection and republishes each payload
+into the local feed.
+"""
+
+import threading
+from typing import Any, Callable
+
+NOTIFY_CHANNEL = "tdb_allotment_changes"
+
+NOTIFY_TRIGGER_SQL = (
+    "create or replace function tdb_notify_allotment_change() returns trigger\n"
+    "language plpgsql as $$\n"
+    "begin\n"
+    "  perform pg_notify('tdb_allotment_changes', new.id);\n"
+    "  return new;\n"
+    "end $$;\n\n"
+    "drop trigger if exists tdb_allotment_changes on tdb_allotment_state;\n"
+    "create trigger tdb_allotment_changes\n"
+    "  after insert or update on tdb_allotment_state\n"
+    "  for each row execute function tdb_notify_allotment_change();\n"
+)
+
+
+class LocalChangeFeed:
+    """Per-channel change counters shared by all sessions of one process."""
+
+    def __init__(self):
+        self._sequence: dict[str, int] = {}
+        self._listeners: list[Callable[[str, int], None]] = []
+        self._cond = threading.Condition()
+
+    def publish(self, channel: str) -> int:
+        with self._cond:
+            seq = self._sequence.get(channel, 0) + 1
+            self._sequence[channel] = seq
+            listeners = list(self._listeners)
+            self._cond.notify_all()
+        for listener in listeners:
+            try:
+                listener(channel, seq)
+            except Exception:
+                pass
+        return seq
+
+    def sequence(self, channel: str) -> int:
+        return self._sequence.get(channel, 0)
+
+    def subscribe(self, listener: Callable[[str, int], None]) -> Callable[[], None]:
+        """Call `listener(channel, seq)` on every publish; returns an unsubscribe function."""
+        with self._cond:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._cond:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def wait_for_change(self, channel: str, seen: int, timeout: float) -> int:
+        """Block until `channel` moves past `seen` (or timeout); returns the current sequence."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._sequence.get(channel, 0) != seen, timeout=timeout)
+            return self._sequence.get(channel, 0)
+
+
+class _PsycopgListenConnection:
+    """LISTEN connection over psycopg 3 (optional dependency)."""
+
+    def __init__(self, dsn: str):
+        import psycopg  # type: ignore
+
+        self._conn = psycopg.connect(dsn, autocommit=True)
+
+    def listen(self, channel: str) -> None:
+        self._conn.execute(f'LISTEN "{channel}"')
+
+    def poll(self, timeout: float) -> list[str]:
+        return [n.payload for n in self._conn.notifies(timeout=timeout, stop_after=100)]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class PostgresNotifyListener:
+    """Background thread forwarding Postgres NOTIFY payloads into a LocalChangeFeed.
+
+    `connect(dsn)` returns an object with listen(channel), poll(timeout) ->
+    list of payloads, and close(); the default uses psycopg. Dropped
+    connections are retried with exponential backoff up to `max_backoff`.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        feed: LocalChangeFeed,
+        channel: str = NOTIFY_CHANNEL,
+        connect: Callable[[str], Any] | None = None,
+        poll_timeout: float = 5.0,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.dsn = dsn
+        self.feed = feed
+        self.channel = channel
+        self._connect = connect or _PsycopgListenConnection
+        self.poll_timeout = poll_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.connected = False
+        self.last_error = ""
+
+    def start(self) -> "PostgresNotifyListener":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tdb-change-listener", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        backoff = self.initial_backoff
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect(self.dsn)
+                conn.listen(self.channel)
+                self.connected, backoff = True, self.initial_backoff
+                while not self._stop.is_set():
+                    for payload in conn.poll(self.poll_timeout):
+                        self.feed.publish(str(payload or ""))
+            except Exception as e:
+                self.last_error = str(e)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,36 @@
+"""
+Column projections for loading the schedule.
+
+The live dashboard only shows display columns. The status history and audit
+timestamps are "lazy" columns: the "live" profile leaves them out of the
+load (Supabase stores them apart from the display columns, see
+payload_codec and supabase_store) and they are fetched per row on demand.
+The "full" profile loads everything, as before.
+"""
+
+from typing import Any
+
+# Heavy or audit-only columns, kept out of the live view
+LAZY_COLUMNS = ("STATUS_LOG", "STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT")
+
+LOAD_PROFILES = ("live", "full")
+
+
+def normalize_load_profile(value: Any) -> str:
+    """Map a configured profile to "live" (default) or "full"."""
+    profile = str(value or "").strip().lower()
+    return profile if profile in LOAD_PROFILES else "live"
+
+
+def omitted_columns(profile: str) -> tuple[str, ...]:
+    """Columns a profile leaves out of the load."""
+    return LAZY_COLUMNS if normalize_load_profile(profile) == "live" else ()
+
+
+def project_columns(columns: list[str], omit: tuple[str, ...] | list[str]) -> list[str]:
+    return [c for c in columns if c not in omit]
+
+
+def display_columns(columns: Any) -> list[str]:
+    """Columns that affect what the dashboard shows (everything but the lazy ones)."""
+    return [c for c in columns if c not in LAZY_COLUMNS]
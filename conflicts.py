@@ -0,0 +1,146 @@
+"""
+Double-booking detection for the allotment dashboard.
+
+Every resource cell (OP chair, DR., FIRST/SECOND/Third assistant) of every
+active, timed appointment is stacked into one long table, sorted by
+(resource, In minute), and compared against the running maximum Out minute
+of the earlier bookings of the same resource. A booking that starts before
+that maximum overlaps something; only those rows are expanded into pairs.
+"""
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from schedule_index import ASSISTANT_ROLES, INACTIVE_STATUS_PATTERN
+from time_utils import day_minutes
+
+# Resource kind -> schedule columns booked under it
+RESOURCE_COLUMNS: dict[str, list[str]] = {
+    "OP": ["OP"],
+    "DR.": ["DR."],
+    "ASSISTANT": list(ASSISTANT_ROLES),
+}
+
+CONFLICT_COLUMNS = ["Resource", "Name", "Row", "Other Row", "Patient", "Other Patient", "Overlap"]
+
+_BLANK_NAMES = ["", "NAN", "NONE", "NAT", "<NA>"]
+
+
+def _hhmm(minute: float) -> str:
+    m = int(minute)
+    return f"{(m // 60) % 24:02d}:{m % 60:02d}"
+
+
+def _stack_bookings(
+    df_schedule: pd.DataFrame,
+    in_arr: np.ndarray,
+    out_arr: np.ndarray,
+    keep: np.ndarray,
+    normalizers: dict[str, Callable[[str], str]],
+) -> pd.DataFrame:
+    parts = []
+    positions = np.flatnonzero(keep)
+    for kind, columns in RESOURCE_COLUMNS.items():
+        for col in columns:
+            if col not in df_schedule.columns:
+                continue
+            names = df_schedule[col].astype(str).str.strip().str.upper().to_numpy(dtype=object)[positions]
+            mask = ~np.isin(names, _BLANK_NAMES)
+            if not mask.any():
+                continue
+            names = names[mask]
+            if kind in normalizers:
+                names = np.array([normalizers[kind](n) for n in names], dtype=object)
+            parts.append(pd.DataFrame({
+                "kind": kind,
+                "name": names,
+                "column": col,
+                "pos": positions[mask],
+                "in_min": in_arr[positions[mask]],
+                "out_min": out_arr[positions[mask]],
+            }))
+    if not parts:
+        return pd.DataFrame(columns=["kind", "name", "column", "pos", "in_min", "out_min"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def find_double_bookings(
+    df_schedule: pd.DataFrame,
+    normalizers: dict[str, Callable[[str], str]] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Find every pair of overlapping bookings of the same chair, doctor or assistant.
+
+    `normalizers` optionally maps a resource kind ("DR.", "ASSISTANT", "OP")
+    to a function canonicalising upper-cased names (e.g. doctor aliases).
+    Cancelled/done/shifted rows and rows without times are ignored.
+
+    Returns (conflicts, highlights): one conflict row per overlapping pair
+    (Row/Other Row are index labels of the schedule) and a boolean frame
+    shaped like the schedule marking the cells involved.
+    """
+    empty = pd.DataFrame(columns=CONFLICT_COLUMNS)
+    if df_schedule is None or df_schedule.empty:
+        return empty, pd.DataFrame()
+    highlights = pd.DataFrame(False, index=df_schedule.index, columns=df_schedule.columns)
+
+    in_arr, out_arr = day_minutes(df_schedule)
+    keep = ~np.isnan(in_arr) & ~np.isnan(out_arr)
+    if "STATUS" in df_schedule.columns:
+        status = df_schedule["STATUS"].astype(str).str.strip().str.upper()
+        keep &= ~status.str.contains(INACTIVE_STATUS_PATTERN, regex=True).to_numpy()
+
+    bookings = _stack_bookings(df_schedule, in_arr, out_arr, keep, normalizers or {})
+    if bookings.empty:
+        return empty, highlights
+
+    bookings = bookings.sort_values(["kind", "name", "in_min", "pos"], kind="stable").reset_index(drop=True)
+    group = bookings["kind"] + "\x00" + bookings["name"]
+    prev_max_out = bookings.groupby(group, sort=False)["out_min"].cummax().groupby(group, sort=False).shift()
+    overlapping = (bookings["in_min"] < prev_max_out).to_numpy()
+    if not overlapping.any():
+        return empty, highlights
+
+    labels = df_schedule.index.to_numpy()
+    patients = df_schedule["Patient Name"].to_numpy(dtype=object) if "Patient Name" in df_schedule.columns else np.full(len(df_schedule), "")
+    group_arr = group.to_numpy(dtype=object)
+    kind_arr = bookings["kind"].to_numpy(dtype=object)
+    name_arr = bookings["name"].to_numpy(dtype=object)
+    col_arr = bookings["column"].to_numpy(dtype=object)
+    pos_arr = bookings["pos"].to_numpy()
+    in_b = bookings["in_min"].to_numpy()
+    out_b = bookings["out_min"].to_numpy()
+    col_loc = {c: i for i, c in enumerate(df_schedule.columns)}
+    flags = np.zeros(highlights.shape, dtype=bool)
+
+    records = []
+    seen: set[tuple[str, int, int]] = set()
+    for i in np.flatnonzero(overlapping):
+        j = i - 1
+        while j >= 0 and group_arr[j] == group_arr[i]:
+            # Same person twice on one row (e.g. FIRST and SECOND) is not a double booking
+            if out_b[j] > in_b[i] and pos_arr[j] != pos_arr[i]:
+                flags[pos_arr[i], col_loc[col_arr[i]]] = True
+                flags[pos_arr[j], col_loc[col_arr[j]]] = True
+                pair = (group_arr[i], min(pos_arr[i], pos_arr[j]), max(pos_arr[i], pos_arr[j]))
+                if pair in seen:
+                    j -= 1
+                    continue
+                seen.add(pair)
+                records.append({
+                    "Resource": kind_arr[i],
+                    "Name": name_arr[i],
+                    "Row": labels[pos_arr[j]],
+                    "Other Row": labels[pos_arr[i]],
+                    "Patient": patients[pos_arr[j]],
+                    "Other Patient": patients[pos_arr[i]],
+                    "Overlap": f"{_hhmm(in_b[i])}-{_hhmm(min(out_b[i], out_b[j]))}",
+                })
+            j -= 1
+
+    if not records:
+        return empty, highlights
+    conflicts = pd.DataFrame(records, columns=CONFLICT_COLUMNS)
+    conflicts = conflicts.sort_values(["Resource", "Name", "Overlap"], kind="stable").reset_index(drop=True)
+    return conflicts, pd.DataFrame(flags, index=df_schedule.index, columns=df_schedule.columns)
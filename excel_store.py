@@ -0,0 +1,112 @@
+"""
+Locked, atomic access to the local Excel workbook.
+
+Saving used to rewrite "Putt Allotment.xlsx" in place, so a session loading
+at the same moment could open a half-written zip; the loader retried with
+sleeps until it got a whole one. Now write_workbook() writes a temp file
+next to the workbook and os.replace()s it over the original while holding
+an exclusive lock, and read_workbook() holds a shared lock only while it
+reads. A reader sees either the old file or the new one, never a partial
+one, and never has to retry.
+
+The lock lives in a separate "<workbook>.lock" file because the workbook
+itself is replaced on every save. Shared locks need fcntl; on Windows
+(msvcrt) readers take the exclusive lock instead.
+"""
+
+import os
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """Inter-process lock on `path` (blocks until it is granted)."""
+    with open(path + ".lock", "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    # LK_LOCK itself gives up after ~10 one-second attempts
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_workbook(path: str, write: Callable[[str], bool]) -> bool:
+    """Under the exclusive lock, `write(temp_path)` and move the result over `path`.
+
+    `write` may read `path` (nobody else can change it meanwhile); when it
+    returns False the temp file is discarded and `path` is left alone.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    with file_lock(path):
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=os.path.splitext(name)[1])
+        os.close(fd)
+        try:
+            if not write(tmp):
+                return False
+            # mkstemp creates the file 0600; keep the workbook's mode (or the umask default for a new one)
+            if os.path.exists(path):
+                mode = stat.S_IMODE(os.stat(path).st_mode)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0o666 & ~umask
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+            return True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def meta_from_frame(meta_df: pd.DataFrame) -> dict[str, str]:
+    """Meta sheet key/value pairs (column names matched case-insensitively)."""
+    cols = {str(c).strip().lower(): c for c in meta_df.columns}
+    kcol, vcol = cols.get("key"), cols.get("value")
+    meta: dict[str, str] = {}
+    if kcol is None or vcol is None:
+        return meta
+    for k, v in zip(meta_df[kcol], meta_df[vcol]):
+        k = str(k).strip()
+        if k:
+            meta[k] = str(v).strip()
+    return meta
+
+
+def read_workbook(path: str) -> pd.DataFrame:
+    """Sheet1 as a frame with the Meta sheet in attrs["meta"], read under the shared lock."""
+    with file_lock(path, shared=True):
+        with pd.ExcelFile(path, engine="openpyxl") as xls:
+            df = pd.read_excel(xls, sheet_name="Sheet1")
+            meta: dict[str, str] = {}
+            if "Meta" in xls.sheet_names:
+                try:
+                    meta = meta_from_frame(pd.read_excel(xls, sheet_name="Meta"))
+                except Exception:
+                    meta = {}
+    df.attrs["meta"] = meta
+    return df
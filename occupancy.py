@@ -0,0 +1,319 @@
+"""
+Day occupancy matrix for the allotment dashboard.
+
+One row per resource (assistant, OP chair, doctor) and one column per
+5-minute slot, covering two days so overnight appointments fit. Cells hold
+the number of active appointments using the resource in that slot, so a
+single appointment can be added or removed by incrementing/decrementing its
+slots without rebuilding the matrix. A parallel boolean layer marks assistant
+slots that are unavailable (weekly off, time blocks).
+
+Slot lookups are a conservative prefilter: an empty window means free for
+certain, a touched window means "check the exact appointment list" (slots are
+5 minutes wide, appointments and exclusions are not).
+
+Like find_double_bookings, the matrix takes per-kind `normalizers` (e.g. the
+staff registry's canonical doctor name), so spelling variants of the same
+person share one row.
+"""
+
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from schedule_index import ASSISTANT_ROLES, INACTIVE_STATUS_PATTERN
+from time_utils import day_minutes
+
+SLOT_MINUTES = 5
+DAY_SLOTS = 2 * 1440 // SLOT_MINUTES
+
+RESOURCE_KINDS = ("assistant", "op", "doctor")
+
+_BLANK_NAMES = {"", "NAN", "NONE", "NAT", "<NA>"}
+
+
+def _slot_range(start_min: float, end_min: float) -> tuple[int, int]:
+    """Slots touched by [start, end): floor(start/5) .. ceil(end/5), at least one, clipped."""
+    lo = min(max(0, int(start_min) // SLOT_MINUTES), DAY_SLOTS - 1)
+    hi = -(-int(end_min) // SLOT_MINUTES)
+    return lo, min(DAY_SLOTS, max(lo + 1, hi))
+
+
+def _resource_key(value: Any) -> str:
+    s = str(value if value is not None else "").strip().upper()
+    return "" if s in _BLANK_NAMES else s
+
+
+class DayOccupancy:
+    """Resource x 5-minute-slot occupancy counts for one day's schedule."""
+
+    def __init__(
+        self,
+        assistants: Iterable[str] = (),
+        ops: Iterable[str] = (),
+        doctors: Iterable[str] = (),
+        normalizers: dict[str, Callable[[str], str]] | None = None,
+    ):
+        self.normalizers = dict(normalizers or {})
+        self.names: dict[str, list[str]] = {kind: [] for kind in RESOURCE_KINDS}
+        self._rows: dict[str, dict[str, int]] = {kind: {} for kind in RESOURCE_KINDS}
+        self.counts: dict[str, np.ndarray] = {kind: np.zeros((0, DAY_SLOTS), dtype=np.int16) for kind in RESOURCE_KINDS}
+        self.unavailable = np.zeros((0, DAY_SLOTS), dtype=bool)
+        # entry key -> (lo slot, hi slot, ((kind, row), ...))
+        self._entries: dict[str, tuple[int, int, tuple[tuple[str, int], ...]]] = {}
+        for kind, names in (("assistant", assistants), ("op", ops), ("doctor", doctors)):
+            for name in names:
+                self.row(kind, name)
+
+    def row(self, kind: str, name: Any, create: bool = True) -> int | None:
+        """Matrix row of a resource; unknown names get a new row when `create`."""
+        key = _resource_key(name)
+        if key and kind in self.normalizers:
+            key = _resource_key(self.normalizers[kind](key))
+        if not key:
+            return None
+        rows = self._rows[kind]
+        if key in rows:
+            return rows[key]
+        if not create:
+            return None
+        rows[key] = len(self.names[kind])
+        self.names[kind].append(key)
+        self.counts[kind] = np.vstack([self.counts[kind], np.zeros((1, DAY_SLOTS), dtype=np.int16)])
+        if kind == "assistant":
+            self.unavailable = np.vstack([self.unavailable, np.zeros((1, DAY_SLOTS), dtype=bool)])
+        return rows[key]
+
+    # ---- incremental maintenance -------------------------------------------------
+
+    def add(self, key: str, in_min: float, out_min: float, assistants: Iterable[Any] = (), op: Any = "", doctor: Any = "") -> None:
+        """Mark one appointment's resources busy for [in, out). Replaces an entry with the same key."""
+        self.remove(key)
+        if in_min is None or out_min is None or np.isnan(in_min) or np.isnan(out_min):
+            return
+        lo, hi = _slot_range(in_min, out_min)
+        resources: list[tuple[str, int]] = []
+        for kind, values in (("assistant", assistants), ("op", [op]), ("doctor", [doctor])):
+            for value in values:
+                r = self.row(kind, value)
+                if r is not None and (kind, r) not in resources:
+                    resources.append((kind, r))
+        for kind, r in resources:
+            self.counts[kind][r, lo:hi] += 1
+        self._entries[key] = (lo, hi, tuple(resources))
+
+    def remove(self, key: str) -> bool:
+        """Release a previously added appointment (e.g. cancelled). Returns True if it existed."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        lo, hi, resources = entry
+        for kind, r in resources:
+            self.counts[kind][r, lo:hi] -= 1
+        return True
+
+    def move(self, key: str, in_min: float, out_min: float) -> bool:
+        """Shift an existing appointment to a new window, keeping its resources."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        names = {kind: [] for kind in RESOURCE_KINDS}
+        for kind, r in entry[2]:
+            names[kind].append(self.names[kind][r])
+        self.add(key, in_min, out_min, names["assistant"], next(iter(names["op"]), ""), next(iter(names["doctor"]), ""))
+        return True
+
+    def sync(self, df_schedule: pd.DataFrame) -> int:
+        """Bring the matrix in line with the schedule, touching only rows that changed.
+
+        Rows are keyed by REMINDER_ROW_ID (falling back to position). Returns
+        the number of entries added, changed or removed.
+        """
+        wanted = schedule_entries(df_schedule)
+        changed = 0
+        for key in [k for k in self._entries if k not in wanted]:
+            self.remove(key)
+            changed += 1
+        for key, (in_min, out_min, assistants, op, doctor) in wanted.items():
+            current = self._entries.get(key)
+            if current is not None:
+                lo, hi = _slot_range(in_min, out_min)
+                same_resources = tuple(
+                    (kind, self.row(kind, v))
+                    for kind, values in (("assistant", assistants), ("op", [op]), ("doctor", [doctor]))
+                    for v in dict.fromkeys(values) if _resource_key(v)
+                )
+                if current == (lo, hi, same_resources):
+                    continue
+            self.add(key, in_min, out_min, assistants, op, doctor)
+            changed += 1
+        return changed
+
+    def set_unavailable(self, off_assistants: Iterable[Any] = (), blocks: Iterable[tuple[Any, float, float]] = ()) -> None:
+        """Reset the unavailability layer: whole-day offs plus (assistant, start, end) blocks."""
+        self.unavailable[:] = False
+        for name in off_assistants:
+            r = self.row("assistant", name)
+            if r is not None:
+                self.unavailable[r, :] = True
+        for name, start_min, end_min in blocks:
+            r = self.row("assistant", name)
+            if r is not None:
+                lo, hi = _slot_range(start_min, end_min)
+                self.unavailable[r, lo:hi] = True
+
+    # ---- queries --------------------------------------------------------------
+
+    def busy_in_window(self, kind: str, names: Iterable[Any], start_min: float, end_min: float) -> np.ndarray:
+        """Per name: does any slot of [start, end) have an appointment (or unavailability)?"""
+        names = list(names)
+        lo, hi = _slot_range(start_min, end_min)
+        rows = [self.row(kind, n, create=False) for n in names]
+        out = np.zeros(len(names), dtype=bool)
+        known = [i for i, r in enumerate(rows) if r is not None]
+        if not known:
+            return out
+        idx = np.array([rows[i] for i in known])
+        hits = (self.counts[kind][idx, lo:hi] > 0).any(axis=1)
+        if kind == "assistant":
+            hits |= self.unavailable[idx, lo:hi].any(axis=1)
+        out[known] = hits
+        return out
+
+    def heatmap(self, kind: str = "assistant", start_min: int = 8 * 60, end_min: int = 21 * 60) -> pd.DataFrame:
+        """Counts per resource and slot for display; -1 marks unavailable assistant slots."""
+        lo, hi = _slot_range(start_min, end_min)
+        values = self.counts[kind][:, lo:hi].astype(np.int16)
+        if kind == "assistant":
+            values = np.where(self.unavailable[:, lo:hi], -1, values)
+        columns = [f"{(s * SLOT_MINUTES // 60) % 24:02d}:{s * SLOT_MINUTES % 60:02d}" for s in range(lo, hi)]
+        return pd.DataFrame(values, index=self.names[kind], columns=columns)
+
+
+def _windows_free(busy: np.ndarray, starts: np.ndarray, width: int) -> np.ndarray:
+    """For each row and candidate start slot: is [start, start + width) entirely free?"""
+    csum = np.zeros((busy.shape[0], busy.shape[1] + 1), dtype=np.int32)
+    np.cumsum(busy, axis=1, out=csum[:, 1:])
+    return (csum[:, starts + width] - csum[:, starts]) == 0
+
+
+def find_free_windows(
+    occupancy: DayOccupancy,
+    duration_min: int,
+    doctor: Any = "",
+    assistants: Iterable[Any] = (),
+    n_assistants: int = 1,
+    ops: Iterable[Any] | None = None,
+    start_min: int = 8 * 60,
+    end_min: int = 21 * 60,
+    limit: int = 5,
+) -> list[dict[str, Any]]:
+    """Earliest non-overlapping windows where the doctor, a chair and enough assistants are free.
+
+    Candidate starts are every slot boundary in [start, end - duration]. Each
+    resource's busy slots are turned into "free for the whole window" flags
+    with one cumulative sum, so every candidate start is checked at once.
+    `ops` defaults to the chairs known to the matrix; with no chairs known
+    the chair condition is skipped. Returns up to `limit` dicts with
+    start_min, end_min, free assistants and free chairs.
+    """
+    width = max(1, -(-int(duration_min) // SLOT_MINUTES))
+    first = -(-int(start_min) // SLOT_MINUTES)
+    last = min(int(end_min) // SLOT_MINUTES, DAY_SLOTS) - width
+    if last < first or limit <= 0:
+        return []
+    starts = np.arange(first, last + 1)
+    ok = np.ones(len(starts), dtype=bool)
+
+    doctor_row = occupancy.row("doctor", doctor, create=False)
+    if doctor_row is not None:
+        ok &= _windows_free(occupancy.counts["doctor"][[doctor_row]] > 0, starts, width)[0]
+
+    op_names = list(occupancy.names["op"] if ops is None else [_resource_key(o) for o in ops if _resource_key(o)])
+    op_free = np.zeros((0, len(starts)), dtype=bool)
+    if op_names:
+        op_busy = np.zeros((len(op_names), DAY_SLOTS), dtype=bool)
+        for i, name in enumerate(op_names):
+            r = occupancy.row("op", name, create=False)
+            if r is not None:
+                op_busy[i] = occupancy.counts["op"][r] > 0
+        op_free = _windows_free(op_busy, starts, width)
+        ok &= op_free.any(axis=0)
+
+    assistant_names = list(dict.fromkeys(_resource_key(a) for a in assistants if _resource_key(a)))
+    assistant_free = np.zeros((0, len(starts)), dtype=bool)
+    if n_assistants > 0:
+        assistant_busy = np.zeros((len(assistant_names), DAY_SLOTS), dtype=bool)
+        for i, name in enumerate(assistant_names):
+            r = occupancy.row("assistant", name, create=False)
+            if r is not None:
+                assistant_busy[i] = (occupancy.counts["assistant"][r] > 0) | occupancy.unavailable[r]
+        assistant_free = _windows_free(assistant_busy, starts, width)
+        ok &= assistant_free.sum(axis=0) >= n_assistants
+
+    windows: list[dict[str, Any]] = []
+    next_allowed = first
+    for j in np.flatnonzero(ok):
+        if starts[j] < next_allowed:
+            continue
+        slot = int(starts[j])
+        windows.append({
+            "start_min": slot * SLOT_MINUTES,
+            "end_min": slot * SLOT_MINUTES + int(duration_min),
+            "assistants": [n for i, n in enumerate(assistant_names) if assistant_free.size and assistant_free[i, j]],
+            "ops": [n for i, n in enumerate(op_names) if op_free[i, j]],
+        })
+        if len(windows) >= limit:
+            break
+        next_allowed = slot + width
+    return windows
+
+
+def schedule_entries(df_schedule: pd.DataFrame) -> dict[str, tuple[float, float, list[str], str, str]]:
+    """Active, timed appointments as {entry key: (in, out, assistants, op, doctor)}."""
+    if df_schedule is None or df_schedule.empty:
+        return {}
+    n = len(df_schedule)
+    in_arr, out_arr = day_minutes(df_schedule)
+    if "STATUS" in df_schedule.columns:
+        status = df_schedule["STATUS"].astype(str).str.strip().str.upper()
+        active = ~status.str.contains(INACTIVE_STATUS_PATTERN, regex=True).to_numpy()
+    else:
+        active = np.ones(n, dtype=bool)
+    keep = active & ~np.isnan(in_arr) & ~np.isnan(out_arr)
+
+    def _col(name: str) -> list:
+        return df_schedule[name].tolist() if name in df_schedule.columns else [""] * n
+
+    row_ids = _col("REMINDER_ROW_ID")
+    roles = [_col(r) for r in ASSISTANT_ROLES]
+    ops, doctors = _col("OP"), _col("DR.")
+
+    entries: dict[str, tuple[float, float, list[str], str, str]] = {}
+    for pos in np.flatnonzero(keep):
+        key = str(row_ids[pos] or "").strip() or f"#{pos}"
+        if key in entries:
+            key = f"{key}#{pos}"
+        assistants = [_resource_key(col[pos]) for col in roles]
+        entries[key] = (
+            float(in_arr[pos]),
+            float(out_arr[pos]),
+            [a for a in assistants if a],
+            _resource_key(ops[pos]),
+            _resource_key(doctors[pos]),
+        )
+    return entries
+
+
+def build_day_occupancy(
+    df_schedule: pd.DataFrame,
+    assistants: Iterable[str] = (),
+    ops: Iterable[str] = (),
+    doctors: Iterable[str] = (),
+    normalizers: dict[str, Callable[[str], str]] | None = None,
+) -> DayOccupancy:
+    """Fresh occupancy matrix for a schedule (configured resources get rows even when idle)."""
+    occupancy = DayOccupancy(assistants, ops, doctors, normalizers)
+    occupancy.sync(df_schedule)
+    return occupancy
@@ -0,0 +1,179 @@
+"""
+Columnar encoding for the Supabase schedule payload.
+
+Format 1 (legacy, no "format" key) stores one dict per appointment, so every
+column name is repeated in every row:
+
+    {"columns": [...], "rows": [{col: val, ...}, ...], "meta": {...}}
+
+Format 2 stores one array per column. Columns with few distinct values
+(doctor, assistants, chair, status, checkbox columns) are dictionary-encoded
+as {"dict": [distinct values], "codes": [index per row]}:
+
+    {"format": 2, "columns": [...], "n": 42,
+     "data": {"Patient Name": [...], "STATUS": {"dict": [...], "codes": [...]}},
+     "lazy": {"STATUS_LOG": [...], ...},
+     "meta": {...}}
+
+Lazy columns (column_profiles.LAZY_COLUMNS) sit in their own "lazy" section,
+so the live view can select the payload without them.
+
+Both formats are read by frame_from_payload(); writers use encode_payload().
+"""
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from column_profiles import LAZY_COLUMNS
+
+PAYLOAD_FORMAT = 2
+PAYLOAD_FORMATS = ("columnar", "rows")
+
+# Always stored plain: row ids are looked up by the patch RPC, and free text
+# rarely repeats
+_PLAIN_COLUMNS = ("REMINDER_ROW_ID", "Patient Name", "Patient ID", "STATUS_LOG")
+
+
+def normalize_payload_format(value: Any) -> str:
+    """Map a configured payload format to "columnar" (default) or "rows" (format 1)."""
+    fmt = str(value or "").strip().lower()
+    return fmt if fmt in PAYLOAD_FORMATS else "columnar"
+
+
+def payload_version(payload: dict[str, Any] | None) -> int:
+    try:
+        return int((payload or {}).get("format") or 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _dictionary(values: list[Any]) -> tuple[list[Any], list[int]] | None:
+    """(distinct values, codes) when a column repeats enough to be worth it."""
+    # Keyed by type too, so True, 1 and 1.0 stay distinct
+    index: dict[tuple[type, Any], int] = {}
+    distinct: list[Any] = []
+    codes: list[int] = []
+    for value in values:
+        try:
+            code = index.setdefault((type(value), value), len(distinct))
+        except TypeError:  # unhashable (lists/dicts): keep the column plain
+            return None
+        if code == len(distinct):
+            distinct.append(value)
+        codes.append(code)
+    if len(values) < 4 or len(distinct) * 2 > len(values):
+        return None
+    return distinct, codes
+
+
+def encode_columns(columns: list[str], records: list[dict[str, Any]]) -> dict[str, Any]:
+    """Format-2 body ({"format", "columns", "n", "data", "lazy"}) for JSON-friendly records."""
+    data: dict[str, Any] = {}
+    lazy: dict[str, Any] = {}
+    for col in columns:
+        values = [r.get(col, "") for r in records]
+        if col in LAZY_COLUMNS:
+            lazy[col] = values
+            continue
+        encoded = None if col in _PLAIN_COLUMNS else _dictionary(values)
+        data[col] = {"dict": encoded[0], "codes": encoded[1]} if encoded else values
+    body = {"format": PAYLOAD_FORMAT, "columns": list(columns), "n": len(records), "data": data}
+    if lazy:
+        body["lazy"] = lazy
+    return body
+
+
+def encode_payload(
+    columns: list[str],
+    records: list[dict[str, Any]],
+    meta: dict[str, Any] | None,
+    payload_format: str = "columnar",
+) -> dict[str, Any]:
+    if normalize_payload_format(payload_format) == "rows":
+        payload: dict[str, Any] = {"columns": list(columns), "rows": records}
+    else:
+        payload = encode_columns(columns, records)
+    if meta is not None:
+        payload["meta"] = meta
+    return payload
+
+
+def _column_values(encoded: Any, n: int) -> list[Any]:
+    """Plain list of a column's values; dictionaries are expanded with one numpy take()."""
+    if isinstance(encoded, dict):
+        dictionary = np.empty(len(encoded.get("dict") or []), dtype=object)
+        dictionary[:] = encoded.get("dict") or []
+        values = dictionary.take(np.asarray(encoded.get("codes") or [], dtype=np.intp)).tolist()
+    else:
+        values = list(encoded or [])
+    if len(values) != n:
+        raise ValueError(f"payload column has {len(values)} values, expected {n}")
+    return values
+
+
+def _sections(payload: dict[str, Any]) -> dict[str, Any]:
+    """Format-2 columns from both sections (the lazy one may not have been selected)."""
+    return {**(payload.get("lazy") or {}), **(payload.get("data") or {})}
+
+
+def frame_from_columns(
+    payload: dict[str, Any],
+    expected_columns: list[str],
+    omit: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    """Build the frame straight from a format-2 body (one list per column, no row dicts)."""
+    columns = [c for c in (payload.get("columns") or expected_columns) if c not in omit]
+    for col in expected_columns:
+        if col not in columns and col not in omit:
+            columns.append(col)
+    data = _sections(payload)
+    n = int(payload.get("n") or 0)
+    if n == 0:
+        return frame_from_records([], columns, expected_columns, omit)
+    # pandas types each list exactly as pd.DataFrame(list_of_dicts) would
+    return pd.DataFrame(
+        {col: _column_values(data[col], n) if col in data else [""] * n for col in columns},
+        columns=columns,
+    )
+
+
+def records_from_payload(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    """Row dicts from either format (for code that needs records, not a frame)."""
+    if payload_version(payload) < 2:
+        return list(payload.get("rows") or [])
+    columns = list(payload.get("columns") or [])
+    n = int(payload.get("n") or 0)
+    data = _sections(payload)
+    arrays = {c: _column_values(data[c], n) for c in columns if c in data}
+    return [{c: values[i] for c, values in arrays.items()} for i in range(n)]
+
+
+def frame_from_records(
+    rows: list[dict[str, Any]],
+    columns: list[str] | None,
+    expected_columns: list[str],
+    omit: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    """Rebuild the schedule frame, backfilling expected columns for older data."""
+    columns = [c for c in (columns or expected_columns) if c not in omit]
+    for col in expected_columns:
+        if col not in columns and col not in omit:
+            columns.append(col)
+    df = pd.DataFrame(rows)
+    for col in columns:
+        if col not in df.columns:
+            df[col] = ""
+    return df[columns]
+
+
+def frame_from_payload(
+    payload: dict[str, Any],
+    expected_columns: list[str],
+    omit: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    """Schedule frame from a payload of any format, without the `omit` columns."""
+    if payload_version(payload) >= 2:
+        return frame_from_columns(payload, expected_columns, omit)
+    return frame_from_records(payload.get("rows") or [], payload.get("columns"), expected_columns, omit)
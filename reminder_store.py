@@ -0,0 +1,285 @@
+"""
+Keyed store for reminder snooze/dismiss state.
+
+Reminder state used to live in the REMINDER_SNOOZE_UNTIL / REMINDER_DISMISSED
+columns, so every auto-snooze rewrote the whole schedule. Here it is kept per
+row ID next to the schedule instead, and each snooze is a single tiny write:
+
+- SupabaseReminderStore: one row per (schedule_id, row_id) in its own table
+- GSheetsReminderStore: one line per row ID on a "Reminders" worksheet
+- JsonFileReminderStore: a small JSON file beside the Excel workbook
+
+load(row_ids) returns {row_id: ReminderState} for just those row IDs (all
+of them without); set() upserts one row ID. Every store forgets row IDs not
+set for `retention_seconds` (two days by default): the Supabase and Sheets
+stores prune at most once per PRUNE_INTERVAL_SECONDS, from set().
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+DEFAULT_REMINDER_TABLE = "tdb_reminder_state"
+REMINDER_WORKSHEET = "Reminders"
+_SHEET_HEADER = ["row_id", "snooze_until", "dismissed", "updated_at"]
+RETENTION_SECONDS = 2 * 86400
+PRUNE_INTERVAL_SECONDS = 3600
+# Row IDs per Supabase request (they travel in the URL)
+_IDS_PER_REQUEST = 100
+
+# (table, schedule_id) -> when it was last pruned; the app builds a Supabase store per call
+_SUPABASE_PRUNED_AT: dict[tuple[str, str], float] = {}
+
+REMINDER_TABLE_SQL = (
+    "create table if not exists tdb_reminder_state (\n"
+    "  schedule_id text not null,\n"
+    "  row_id text not null,\n"
+    "  snooze_until bigint,\n"
+    "  dismissed boolean not null default false,\n"
+    "  updated_at timestamptz not null default now(),\n"
+    "  primary key (schedule_id, row_id)\n"
+    ");\n"
+)
+
+
+@dataclass
+class ReminderState:
+    # Epoch seconds the reminder is snoozed until (None when not snoozed)
+    until: int | None = None
+    dismissed: bool = False
+
+
+def _to_epoch(value: Any) -> int | None:
+    try:
+        if value is None or str(value).strip() == "":
+            return None
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().upper() in ("TRUE", "1", "T", "YES")
+
+
+def _ids(row_ids: Iterable[str] | None) -> set[str] | None:
+    return None if row_ids is None else {str(r) for r in row_ids if str(r).strip()}
+
+
+class SupabaseReminderStore:
+    def __init__(
+        self,
+        client: Any,
+        schedule_id: str,
+        table: str = DEFAULT_REMINDER_TABLE,
+        retention_seconds: float = RETENTION_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.schedule_id = schedule_id
+        self.table = table
+        self.retention_seconds = retention_seconds
+        self._clock = clock
+
+    def _select(self, ids: list[str] | None) -> list[dict[str, Any]]:
+        query = self.client.table(self.table).select("row_id,snooze_until,dismissed").eq("schedule_id", self.schedule_id)
+        if ids is not None:
+            query = query.in_("row_id", ids)
+        return getattr(query.execute(), "data", None) or []
+
+    def load(self, row_ids: Iterable[str] | None = None) -> dict[str, ReminderState]:
+        ids = None if row_ids is None else sorted(_ids(row_ids))
+        if ids is None:
+            rows = self._select(None)
+        else:
+            rows = [r for i in range(0, len(ids), _IDS_PER_REQUEST) for r in self._select(ids[i:i + _IDS_PER_REQUEST])]
+        return {
+            str(r["row_id"]): ReminderState(_to_epoch(r.get("snooze_until")), _to_bool(r.get("dismissed")))
+            for r in rows
+        }
+
+    def set(self, row_id: str, until: int | None, dismissed: bool) -> None:
+        now = self._clock()
+        self.client.table(self.table).upsert(
+            {
+                "schedule_id": self.schedule_id,
+                "row_id": str(row_id),
+                "snooze_until": int(until) if until is not None else None,
+                "dismissed": bool(dismissed),
+                # The column default only applies to inserts
+                "updated_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            },
+            on_conflict="schedule_id,row_id",
+        ).execute()
+        key = (self.table, self.schedule_id)
+        if now - _SUPABASE_PRUNED_AT.get(key, 0.0) >= PRUNE_INTERVAL_SECONDS:
+            _SUPABASE_PRUNED_AT[key] = now
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete row IDs not set within the retention period."""
+        cutoff = datetime.fromtimestamp(self._clock() - self.retention_seconds, timezone.utc).isoformat()
+        self.client.table(self.table).delete().eq("schedule_id", self.schedule_id).lt("updated_at", cutoff).execute()
+
+
+class GSheetsReminderStore:
+    """Reminder lines on a separate worksheet; set() rewrites (or appends) one line.
+
+    Lines carry the epoch second they were last set; pruning deletes the
+    stale ones (and lines from before that column existed).
+    """
+
+    def __init__(
+        self,
+        spreadsheet: Any,
+        title: str = REMINDER_WORKSHEET,
+        retention_seconds: float = RETENTION_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.retention_seconds = retention_seconds
+        self._clock = clock
+        self._worksheet: Any = None
+        # row_id -> 1-based sheet row, refreshed by load() and set()
+        self._rows: dict[str, int] = {}
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+
+    def _open(self, create: bool) -> Any:
+        if self._worksheet is None:
+            try:
+                self._worksheet = self.spreadsheet.worksheet(self.title)
+            except Exception:
+                if not create:
+                    return None
+                self._worksheet = self.spreadsheet.add_worksheet(title=self.title, rows=200, cols=len(_SHEET_HEADER))
+                self._worksheet.update("A1:D1", [_SHEET_HEADER])
+        return self._worksheet
+
+    def load(self, row_ids: Iterable[str] | None = None) -> dict[str, ReminderState]:
+        """States for `row_ids`: one read of the ID column, one of just their lines."""
+        ids = _ids(row_ids)
+        with self._lock:
+            worksheet = self._open(create=False)
+            if worksheet is None:
+                return {}
+            self._load_index()
+            wanted = sorted(n for row_id, n in self._rows.items() if ids is None or row_id in ids)
+            if not wanted:
+                return {}
+            runs: list[list[int]] = []
+            for n in wanted:
+                if runs and n == runs[-1][1] + 1:
+                    runs[-1][1] = n
+                else:
+                    runs.append([n, n])
+            blocks = worksheet.batch_get([f"A{a}:C{b}" for a, b in runs])
+        states: dict[str, ReminderState] = {}
+        for block in blocks:
+            for line in block:
+                line = list(line) + [""] * (3 - len(line))
+                row_id = str(line[0]).strip()
+                if row_id and (ids is None or row_id in ids):
+                    states[row_id] = ReminderState(_to_epoch(line[1]), _to_bool(line[2]))
+        return states
+
+    def set(self, row_id: str, until: int | None, dismissed: bool) -> None:
+        with self._lock:
+            self._open(create=True)
+            # Always re-read the IDs: a prune elsewhere may have moved the lines
+            self._load_index()
+            now = self._clock()
+            line = [
+                str(row_id), "" if until is None else str(int(until)), "TRUE" if dismissed else "FALSE", str(int(now)),
+            ]
+            n = self._rows.get(str(row_id))
+            if n is not None:
+                self._worksheet.update(f"A{n}:D{n}", [line])
+            else:
+                # Append (not "next free row") so concurrent writers never overwrite each other
+                resp = self._worksheet.append_row(line, value_input_option="RAW")
+                match = re.search(r"![A-Z]+(\d+)", str((resp or {}).get("updates", {}).get("updatedRange", "")))
+                if match:
+                    self._rows[str(row_id)] = int(match.group(1))
+            if now - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = now
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Delete lines not set within the retention period, in one request."""
+        ids = self._worksheet.col_values(1)
+        stamps = self._worksheet.col_values(4)
+        stale = [
+            n for n in range(2, len(ids) + 1)
+            if now - (_to_epoch(stamps[n - 1] if n <= len(stamps) else "") or 0) >= self.retention_seconds
+        ]
+        if not stale:
+            return
+        # Bottom up, so earlier deletions do not shift the rows still to go
+        requests = [
+            {"deleteDimension": {"range": {
+                "sheetId": self._worksheet.id, "dimension": "ROWS", "startIndex": n - 1, "endIndex": n,
+            }}}
+            for n in reversed(stale)
+        ]
+        self._worksheet.spreadsheet.batch_update({"requests": requests})
+        self._rows = {}
+
+    def _load_index(self) -> None:
+        ids = self._worksheet.col_values(1)
+        self._rows = {str(v).strip(): n for n, v in enumerate(ids[1:], start=2) if str(v).strip()}
+
+
+class JsonFileReminderStore:
+    """Reminder state in a JSON file, replaced atomically on every set()."""
+
+    def __init__(self, path: str, retention_seconds: float = RETENTION_SECONDS, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, row_ids: Iterable[str] | None = None) -> dict[str, ReminderState]:
+        ids = _ids(row_ids)
+        with self._lock:
+            return {
+                row_id: ReminderState(_to_epoch(item.get("until")), _to_bool(item.get("dismissed")))
+                for row_id, item in self._read().items()
+                if isinstance(item, dict) and (ids is None or row_id in ids)
+            }
+
+    def set(self, row_id: str, until: int | None, dismissed: bool) -> None:
+        with self._lock:
+            now = self._clock()
+            data = {
+                k: v for k, v in self._read().items()
+                if isinstance(v, dict) and now - float(v.get("at") or 0) < self.retention_seconds
+            }
+            data[str(row_id)] = {"until": until, "dismissed": bool(dismissed), "at": int(now)}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(prefix=".reminders-", suffix=".json", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
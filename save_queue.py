@@ -0,0 +1,141 @@
+"""
+Write-behind queue for schedule saves.
+
+A session can call save several times while handling one click (reminder
+auto-snoozes, ID backfill, time blocks). The queue keeps only the newest
+frame and writes it on a background thread once no new save has arrived for
+`delay` seconds, so the UI never waits on storage and a burst of saves costs
+one backend write. flush() writes whatever is pending right away. Items
+that must not be dropped when a newer one replaces them are merged with
+`combine(older, newer)`.
+
+The write function runs off the script thread: it must not use Streamlit
+UI or session-state calls and should raise or return False on failure.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        write: Callable[[Any], bool],
+        delay: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        combine: Callable[[Any, Any], Any] | None = None,
+    ):
+        self._write = write
+        self._combine = combine
+        self.delay = delay
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: Any = None
+        self._has_pending = False
+        self._in_flight = False
+        self._in_flight_item: Any = None
+        # Set after a failed write; the worker then waits for the next submit/flush
+        self._paused = False
+        self._submitted_at = 0.0
+        self._worker: threading.Thread | None = None
+        self.submitted = 0
+        self.written = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.last_error = ""
+        self.last_flushed_at: float | None = None
+        # Most recent successfully written item
+        self.last_written: Any = None
+
+    @property
+    def busy(self) -> bool:
+        """A save is waiting or being written."""
+        return self._has_pending or self._in_flight
+
+    def pending_item(self) -> Any:
+        """The newest frame not yet confirmed written (None when idle)."""
+        with self._cond:
+            if self._has_pending:
+                return self._pending
+            return self._in_flight_item if self._in_flight else None
+
+    def status(self) -> str:
+        if self._in_flight:
+            return "flushing"
+        if self._has_pending:
+            return "failed" if self.last_error else "pending"
+        return "failed" if self.last_error else ("flushed" if self.last_flushed_at else "idle")
+
+    def submit(self, item: Any) -> None:
+        with self._cond:
+            if self._has_pending:
+                self.coalesced += 1
+                if self._combine is not None:
+                    item = self._combine(self._pending, item)
+            self._pending, self._has_pending = item, True
+            self._submitted_at = self._clock()
+            self._paused = False
+            self.submitted += 1
+            self._cond.notify_all()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="tdb-write-behind", daemon=True)
+                self._worker.start()
+
+    def flush(self) -> bool:
+        """Write the pending frame now (waiting for any write in progress). True when nothing is left."""
+        self._write_pending()
+        return not self._has_pending and not self.last_error
+
+    def _take(self) -> tuple[bool, Any]:
+        with self._cond:
+            if not self._has_pending:
+                return False, None
+            item = self._pending
+            self._pending, self._has_pending = None, False
+            self._in_flight, self._in_flight_item = True, item
+            return True, item
+
+    def _write_pending(self) -> None:
+        with self._write_lock:
+            taken, item = self._take()
+            if not taken:
+                return
+            try:
+                ok = bool(self._write(item))
+                error = "" if ok else "write returned False"
+            except Exception as e:
+                ok, error = False, str(e) or type(e).__name__
+            with self._cond:
+                self._in_flight, self._in_flight_item = False, None
+                if ok:
+                    self.written += 1
+                    self.last_written = item
+                    self.last_error = ""
+                    self.last_flushed_at = self._clock()
+                else:
+                    self.failures += 1
+                    self.last_error = error
+                    self._paused = True
+                    if not self._has_pending:
+                        # Keep the frame for the next flush/submit
+                        self._pending, self._has_pending = item, True
+                    elif self._combine is not None:
+                        self._pending = self._combine(item, self._pending)
+                self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                # Sleep until the newest submit has been quiet for `delay`
+                while self._has_pending and not self._paused:
+                    wait = self._submitted_at + self.delay - self._clock()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if not self._has_pending or self._paused:
+                    # Idle (or failed: retried by the next submit/flush)
+                    self._worker = None
+                    return
+            self._write_pending()
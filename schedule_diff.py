@@ -0,0 +1,194 @@
+"""
+Row-level diff between the last persisted schedule and the one being saved.
+
+A Snapshot records, per appointment (keyed by REMINDER_ROW_ID), a content hash
+and the JSON-friendly record that was last loaded or saved. diff_frame()
+compares an outgoing frame against it and returns a Changeset: inserted rows,
+updated rows (changed columns only), rows that only moved, and deleted keys.
+Each storage backend applies the changeset in its cheapest form and falls
+back to a full write for anything it cannot patch (see `only_updates`).
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+import pandas as pd
+
+# Meta keys that change on every save without the meta itself changing
+_VOLATILE_META_KEYS = ("time_blocks_updated_at",)
+
+
+def records_from_df(df: pd.DataFrame) -> list[dict[str, Any]]:
+    """JSON-friendly row dicts, blanks as "" (the shape every backend stores)."""
+    df_clean = df.copy().fillna("")
+    for col in df_clean.columns:
+        df_clean[col] = df_clean[col].astype(object)
+    return df_clean.to_dict(orient="records")
+
+
+def _digest(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def row_keys(records: list[dict[str, Any]]) -> list[str]:
+    """Key per record: REMINDER_ROW_ID, made unique ("id#1") and never blank ("pos-N")."""
+    keys: list[str] = []
+    seen: dict[str, int] = {}
+    for pos, record in enumerate(records):
+        key = str(record.get("REMINDER_ROW_ID", "") or "").strip() or f"pos-{pos}"
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        keys.append(key if n == 0 else f"{key}#{n}")
+    return keys
+
+
+def meta_signature(columns: list[str], meta: dict[str, Any] | None) -> str:
+    stable = {k: v for k, v in (meta or {}).items() if k not in _VOLATILE_META_KEYS}
+    return _digest([list(columns), stable])
+
+
+@dataclass
+class Snapshot:
+    """What the backend holds, as far as this session knows."""
+
+    columns: list[str]
+    keys: list[str]
+    hashes: dict[str, str]
+    records: dict[str, dict[str, Any]]
+    meta_signature: str
+    # Every row has its own non-blank REMINDER_ROW_ID (keys are real IDs)
+    keys_are_ids: bool = True
+    # Stored sort key per row, for backends that keep one (Supabase rows mode)
+    positions: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class RowChange:
+    key: str
+    position: int
+    values: dict[str, Any]
+
+
+@dataclass
+class Changeset:
+    columns: list[str]
+    records: list[dict[str, Any]]
+    keys: list[str]
+    columns_changed: bool = False
+    meta_changed: bool = False
+    keys_are_ids: bool = True
+    inserted: list[RowChange] = field(default_factory=list)
+    updated: list[RowChange] = field(default_factory=list)
+    # Surviving rows whose position shifted (values stay empty)
+    moved: list[RowChange] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    # No previous snapshot: the backend must write everything
+    full: bool = False
+    # Stored sort keys of the surviving rows. A backend that keeps them
+    # records what it wrote here; the dict is shared with the new snapshot.
+    positions: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rows_changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.moved or self.deleted or self.columns_changed)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.full and not self.rows_changed and not self.meta_changed
+
+    @property
+    def only_updates(self) -> bool:
+        """True when the change is cell edits in place (patchable without reshaping)."""
+        return not self.full and not (self.inserted or self.moved or self.deleted or self.columns_changed)
+
+    def touched_positions(self) -> list[int]:
+        """Positions of rows whose data changed (inserted or updated; rows that only moved are not)."""
+        return sorted({c.position for c in self.inserted + self.updated})
+
+    def payload_bytes(self) -> int:
+        """Approximate JSON size of the change (for comparing against a full write)."""
+        body = {
+            "inserted": [c.values for c in self.inserted],
+            "updated": {c.key: c.values for c in self.updated},
+            "moved": {c.key: c.position for c in self.moved},
+            "deleted": self.deleted,
+        }
+        return len(json.dumps(body, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+def _build(records: list[dict[str, Any]], columns: list[str], meta: dict[str, Any] | None) -> Snapshot:
+    keys = row_keys(records)
+    ids = [str(r.get("REMINDER_ROW_ID", "") or "").strip() for r in records]
+    return Snapshot(
+        columns=list(columns),
+        keys=keys,
+        hashes={k: _digest(r) for k, r in zip(keys, records)},
+        records=dict(zip(keys, records)),
+        meta_signature=meta_signature(columns, meta),
+        keys_are_ids=all(k == i for k, i in zip(keys, ids)),
+    )
+
+
+def take_snapshot(df: pd.DataFrame, meta: dict[str, Any] | None = None) -> Snapshot:
+    """Snapshot of a frame as it is stored (call right after loading or saving).
+
+    Stored sort keys come from attrs["row_positions"] when the loader set it.
+    """
+    snapshot = _build(records_from_df(df), [str(c) for c in df.columns], meta)
+    stored = df.attrs.get("row_positions") or {}
+    snapshot.positions = {k: int(stored[k]) for k in snapshot.keys if k in stored}
+    return snapshot
+
+
+def diff_frame(
+    previous: Snapshot | None,
+    df: pd.DataFrame,
+    meta: dict[str, Any] | None = None,
+) -> tuple[Changeset, Snapshot]:
+    """Changeset turning `previous` into `df`, plus the snapshot to keep once it is applied."""
+    records = records_from_df(df)
+    current = _build(records, [str(c) for c in df.columns], meta)
+    changes = Changeset(
+        columns=current.columns,
+        records=records,
+        keys=current.keys,
+        keys_are_ids=current.keys_are_ids,
+    )
+    current.positions = changes.positions
+    if previous is None:
+        changes.full = True
+        changes.meta_changed = True
+        changes.inserted = [RowChange(k, i, r) for i, (k, r) in enumerate(zip(current.keys, records))]
+        return changes, current
+
+    changes.columns_changed = current.columns != previous.columns
+    changes.meta_changed = current.meta_signature != previous.meta_signature
+    changes.keys_are_ids = current.keys_are_ids and previous.keys_are_ids
+    changes.positions.update((k, p) for k, p in previous.positions.items() if k in current.hashes)
+    old_pos = {k: i for i, k in enumerate(previous.keys)}
+    for pos, (key, record) in enumerate(zip(current.keys, records)):
+        if key not in old_pos:
+            changes.inserted.append(RowChange(key, pos, record))
+            continue
+        if current.hashes[key] != previous.hashes[key]:
+            before = previous.records[key]
+            changed = {c: v for c, v in record.items() if c not in before or before[c] != v}
+            changes.updated.append(RowChange(key, pos, changed))
+        if old_pos[key] != pos:
+            changes.moved.append(RowChange(key, pos, {}))
+    changes.deleted = [k for k in previous.keys if k not in current.hashes]
+    return changes, current
+
+
+def cell_updates(changes: Changeset) -> list[tuple[int, int, Any]]:
+    """(row position, column index, value) for every updated cell, 0-based."""
+    col_index = {c: i for i, c in enumerate(changes.columns)}
+    return [
+        (change.position, col_index[col], value)
+        for change in changes.updated
+        for col, value in change.values.items()
+        if col in col_index
+    ]
@@ -0,0 +1,398 @@
+"""
+Schedule indexing helpers for the allotment dashboard.
+
+The dashboard asks the same questions about the schedule many times per rerun
+("is ARCHANA free 10:00-11:00?", "who is ANYA with right now?"). Instead of
+walking every row with iterrows() for every assistant, the schedule is indexed
+once per data version into per-assistant interval arrays sorted by In time,
+and those questions are answered with bisect lookups.
+"""
+
+import bisect
+import hashlib
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+ASSISTANT_ROLES = ["FIRST", "SECOND", "Third"]
+
+# Appointments in these states no longer occupy an assistant.
+INACTIVE_STATUS_PATTERN = "CANCELLED|DONE|COMPLETED|SHIFTED"
+
+# Columns whose contents affect the index (used for the data version key).
+_INDEX_SOURCE_COLUMNS = [
+    "REMINDER_ROW_ID", "Patient Name", "In Time", "Out Time", "In_min", "Out_min",
+    "DR.", "OP", "FIRST", "SECOND", "Third", "STATUS", "DATE",
+]
+
+
+def schedule_data_version(df_schedule: pd.DataFrame) -> str:
+    """Cheap content hash of the schedule columns the index depends on."""
+    if df_schedule is None or df_schedule.empty:
+        return "empty"
+    cols = [c for c in _INDEX_SOURCE_COLUMNS if c in df_schedule.columns]
+    try:
+        hashed = pd.util.hash_pandas_object(df_schedule[cols].astype(str), index=True).values
+        return hashlib.md5(hashed.tobytes() + "|".join(cols).encode("utf-8")).hexdigest()
+    except Exception:
+        # Unhashable cell contents: fall back to a string dump (still one pass)
+        return hashlib.md5(df_schedule[cols].to_csv(index=True).encode("utf-8")).hexdigest()
+
+
+class AssistantIntervals:
+    """Appointments for one assistant, sorted by (In minute, row position).
+
+    Timed entries live in parallel numpy arrays so bisect can be used on
+    `in_min`; `max_out` is the running maximum of `out_min`, which lets an
+    overlap probe bail out without touching any entry. Entries whose times
+    could not be parsed are kept separately (they still count as workload and
+    can still mark an assistant busy via their STATUS).
+    """
+
+    def __init__(self, in_min, out_min, row_pos, role, status, untimed_pos, untimed_role, untimed_status):
+        self.in_min = np.asarray(in_min, dtype=np.int64)
+        self.out_min = np.asarray(out_min, dtype=np.int64)
+        self.row_pos = np.asarray(row_pos, dtype=np.int64)
+        self.role = np.asarray(role, dtype=object)
+        self.status = np.asarray(status, dtype=object)
+        self.max_out = np.maximum.accumulate(self.out_min) if len(self.out_min) else self.out_min
+        self.untimed_pos = np.asarray(untimed_pos, dtype=np.int64)
+        self.untimed_role = np.asarray(untimed_role, dtype=object)
+        self.untimed_status = np.asarray(untimed_status, dtype=object)
+        # Plain list copy for the bisect module (bisect on numpy arrays works but is slower)
+        self._in_list = self.in_min.tolist()
+
+    def __len__(self) -> int:
+        return len(self.in_min) + len(self.untimed_pos)
+
+    def overlapping(self, start_min: int, end_min: int) -> list[int]:
+        """Positions (into the timed arrays) of intervals overlapping [start, end)."""
+        hi = bisect.bisect_left(self._in_list, end_min)
+        if hi == 0 or self.max_out[hi - 1] <= start_min:
+            return []
+        return [j for j in range(hi) if self.out_min[j] > start_min]
+
+    def starting_in(self, start_min: int, end_min: int) -> range:
+        """Positions of intervals whose In minute falls in [start, end)."""
+        return range(bisect.bisect_left(self._in_list, start_min), bisect.bisect_left(self._in_list, end_min))
+
+    def covering(self, minute: int) -> list[int]:
+        """Positions of intervals with in_min <= minute <= out_min."""
+        hi = bisect.bisect_right(self._in_list, minute)
+        if hi == 0 or self.max_out[hi - 1] < minute:
+            return []
+        return [j for j in range(hi) if self.out_min[j] >= minute]
+
+    def next_transition(self, minute: int) -> int | None:
+        """First minute after `minute` at which covering() can change.
+
+        Intervals cover in_min..out_min inclusive, so coverage starts at
+        in_min and ends at out_min + 1.
+        """
+        if not len(self.in_min):
+            return None
+        bounds = np.concatenate([self.in_min, self.out_min + 1])
+        later = bounds[bounds > minute]
+        return int(later.min()) if len(later) else None
+
+
+_EMPTY_INTERVALS = AssistantIntervals([], [], [], [], [], [], [], [])
+
+
+class ScheduleIndex:
+    """Per-assistant interval index over one version of the schedule."""
+
+    def __init__(self, df_schedule: pd.DataFrame, by_assistant: dict[str, AssistantIntervals], version: str = ""):
+        self.version = version
+        self._by_assistant = by_assistant
+        n = len(df_schedule)
+
+        def _col(name: str, default: Any = "") -> np.ndarray:
+            if name in df_schedule.columns:
+                return df_schedule[name].to_numpy(dtype=object)
+            return np.full(n, default, dtype=object)
+
+        self._row_id = _col("REMINDER_ROW_ID")
+        self._patient = _col("Patient Name", "Unknown")
+        self._in_time = _col("In Time", None)
+        self._out_time = _col("Out Time", None)
+        self._doctor = _col("DR.")
+        self._op = _col("OP")
+        self._row_id_str = np.array([str(v).strip() for v in self._row_id], dtype=object)
+
+    def intervals(self, assistant_name: str) -> AssistantIntervals:
+        key = str(assistant_name or "").strip().upper()
+        return self._by_assistant.get(key, _EMPTY_INTERVALS)
+
+    def count(self, assistant_name: str) -> int:
+        """Number of active appointments the assistant is assigned to."""
+        return len(self.intervals(assistant_name))
+
+    def row_id(self, row_pos: int) -> str:
+        return self._row_id_str[row_pos]
+
+    def appointment(self, row_pos: int, role: str, status: str) -> dict[str, Any]:
+        """Build the appointment dict shape used throughout the dashboard."""
+        return {
+            "row_id": self._row_id[row_pos],
+            "patient": self._patient[row_pos],
+            "in_time": self._in_time[row_pos],
+            "out_time": self._out_time[row_pos],
+            "doctor": self._doctor[row_pos],
+            "op": self._op[row_pos],
+            "role": role,
+            "status": status,
+        }
+
+    def schedule_for(self, assistant_name: str) -> list[dict[str, Any]]:
+        """All active appointments for an assistant, in schedule row order."""
+        iv = self.intervals(assistant_name)
+        entries = [(int(p), iv.role[j], iv.status[j]) for j, p in enumerate(iv.row_pos)]
+        entries += [(int(p), iv.untimed_role[j], iv.untimed_status[j]) for j, p in enumerate(iv.untimed_pos)]
+        entries.sort(key=lambda e: (e[0], ASSISTANT_ROLES.index(e[1]) if e[1] in ASSISTANT_ROLES else 99))
+        return [self.appointment(p, role, status) for p, role, status in entries]
+
+    def first_conflict(
+        self,
+        assistant_name: str,
+        start_min: int,
+        end_min: int,
+        exclude_row_id: str | None = None,
+    ) -> dict[str, Any] | None:
+        """First appointment (schedule order) overlapping [start, end), or None."""
+        iv = self.intervals(assistant_name)
+        hits = iv.overlapping(start_min, end_min)
+        if not hits:
+            return None
+        exclude = str(exclude_row_id).strip() if exclude_row_id else ""
+        best: int | None = None
+        for j in hits:
+            pos = int(iv.row_pos[j])
+            if exclude and self._row_id_str[pos] == exclude:
+                continue
+            if best is None or (pos, _role_rank(iv.role[j])) < (int(iv.row_pos[best]), _role_rank(iv.role[best])):
+                best = j
+        if best is None:
+            return None
+        appt = self.appointment(int(iv.row_pos[best]), iv.role[best], iv.status[best])
+        appt["in_min"] = int(iv.in_min[best])
+        appt["out_min"] = int(iv.out_min[best])
+        return appt
+
+    def next_transition(self, assistant_names: list[str], current_min: int) -> int | None:
+        """Earliest minute after `current_min` at which any of these assistants' timed bookings start or end."""
+        bounds = [self.intervals(name).next_transition(current_min) for name in assistant_names]
+        bounds = [b for b in bounds if b is not None]
+        return min(bounds) if bounds else None
+
+    def current_appointment(self, assistant_name: str, current_min: int) -> dict[str, Any] | None:
+        """Appointment keeping the assistant busy at `current_min`, or None.
+
+        Busy means: STATUS says ON GOING (regardless of times), STATUS says
+        ARRIVED with missing times, or the minute falls inside In..Out.
+        The earliest such row in schedule order wins.
+        """
+        iv = self.intervals(assistant_name)
+        candidates: list[tuple[int, int, str, str]] = []
+        for j in iv.covering(current_min):
+            candidates.append((int(iv.row_pos[j]), _role_rank(iv.role[j]), iv.role[j], iv.status[j]))
+        for j, status_text in enumerate(iv.status):
+            if "ON GOING" in status_text or "ONGOING" in status_text:
+                candidates.append((int(iv.row_pos[j]), _role_rank(iv.role[j]), iv.role[j], status_text))
+        for j, status_text in enumerate(iv.untimed_status):
+            if "ON GOING" in status_text or "ONGOING" in status_text or "ARRIVED" in status_text:
+                candidates.append((int(iv.untimed_pos[j]), _role_rank(iv.untimed_role[j]), iv.untimed_role[j], status_text))
+        if not candidates:
+            return None
+        pos, _, role, status_text = min(candidates, key=lambda c: (c[0], c[1]))
+        return self.appointment(pos, role, status_text)
+
+
+def _role_rank(role: str) -> int:
+    try:
+        return ASSISTANT_ROLES.index(role)
+    except ValueError:
+        return len(ASSISTANT_ROLES)
+
+
+def _minutes_columns(
+    df_schedule: pd.DataFrame,
+    to_minutes: Callable[[Any], int | None] | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return float arrays of In/Out minutes (NaN when unknown), overnight-adjusted."""
+    n = len(df_schedule)
+    if "In_min" in df_schedule.columns and "Out_min" in df_schedule.columns:
+        in_arr = pd.to_numeric(df_schedule["In_min"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        out_arr = pd.to_numeric(df_schedule["Out_min"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    elif to_minutes is not None:
+        in_arr = np.array(
+            [np.nan if (m := to_minutes(v)) is None else m for v in df_schedule.get("In Time", pd.Series([None] * n))],
+            dtype="float64",
+        )
+        out_arr = np.array(
+            [np.nan if (m := to_minutes(v)) is None else m for v in df_schedule.get("Out Time", pd.Series([None] * n))],
+            dtype="float64",
+        )
+    else:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    overnight = out_arr < in_arr
+    out_arr = np.where(overnight, out_arr + 1440, out_arr)
+    return in_arr, out_arr
+
+
+def build_schedule_index(
+    df_schedule: pd.DataFrame,
+    to_minutes: Callable[[Any], int | None] | None = None,
+    version: str = "",
+) -> ScheduleIndex:
+    """Index the schedule by assistant in one vectorised pass.
+
+    Uses the precomputed `In_min`/`Out_min` columns when present; otherwise
+    `to_minutes` is applied to `In Time`/`Out Time`.
+    """
+    if df_schedule is None or df_schedule.empty:
+        return ScheduleIndex(pd.DataFrame(), {}, version)
+
+    n = len(df_schedule)
+    in_arr, out_arr = _minutes_columns(df_schedule, to_minutes)
+    if "STATUS" in df_schedule.columns:
+        status = df_schedule["STATUS"].astype(str).str.strip().str.upper()
+    else:
+        status = pd.Series([""] * n, index=df_schedule.index)
+    active = ~status.str.contains(INACTIVE_STATUS_PATTERN, regex=True).to_numpy()
+    status_arr = status.to_numpy(dtype=object)
+    positions = np.arange(n, dtype=np.int64)
+
+    parts: list[pd.DataFrame] = []
+    for role in ASSISTANT_ROLES:
+        if role not in df_schedule.columns:
+            continue
+        names = df_schedule[role].astype(str).str.strip().str.upper().to_numpy(dtype=object)
+        keep = active & ~np.isin(names, ["", "NAN", "NONE", "NAT", "<NA>"])
+        if not keep.any():
+            continue
+        parts.append(pd.DataFrame({
+            "key": names[keep],
+            "in_min": in_arr[keep],
+            "out_min": out_arr[keep],
+            "row_pos": positions[keep],
+            "role_rank": _role_rank(role),
+            "role": role,
+            "status": status_arr[keep],
+        }))
+
+    by_assistant: dict[str, AssistantIntervals] = {}
+    if parts:
+        long_df = pd.concat(parts, ignore_index=True)
+        long_df["timed"] = long_df["in_min"].notna() & long_df["out_min"].notna()
+        long_df = long_df.sort_values(["key", "in_min", "row_pos", "role_rank"], kind="mergesort", na_position="last")
+        for key, grp in long_df.groupby("key", sort=False):
+            timed = grp[grp["timed"]]
+            untimed = grp[~grp["timed"]].sort_values(["row_pos", "role_rank"], kind="mergesort")
+            by_assistant[str(key)] = AssistantIntervals(
+                timed["in_min"].to_numpy(dtype=np.int64),
+                timed["out_min"].to_numpy(dtype=np.int64),
+                timed["row_pos"].to_numpy(),
+                timed["role"].to_numpy(dtype=object),
+                timed["status"].to_numpy(dtype=object),
+                untimed["row_pos"].to_numpy(),
+                untimed["role"].to_numpy(dtype=object),
+                untimed["status"].to_numpy(dtype=object),
+            )
+
+    return ScheduleIndex(df_schedule, by_assistant, version)
+
+
+def time_blocks_signature(blocks: list[dict]) -> tuple:
+    """Hashable snapshot of the block fields the block index depends on."""
+    return tuple(
+        (b.get("date"), b.get("assistant"), b.get("start_time"), b.get("end_time"), b.get("reason"))
+        for b in blocks or []
+        if isinstance(b, dict)
+    )
+
+
+class TimeBlockIndex:
+    """Assistant time blocks grouped by date, then assistant, in integer minutes.
+
+    Each (date, assistant) pair holds an AssistantIntervals sorted by start
+    minute whose `row_pos` is the block's position in the source list (so the
+    earliest-added block wins, as with the old list walk) and whose `role`
+    holds the reason. Blocks ending before they start run past midnight.
+    Queries for one date never touch blocks from any other date.
+    """
+
+    def __init__(self, by_date: dict[str, dict[str, AssistantIntervals]], signature: tuple = ()):
+        self.signature = signature
+        self._by_date = by_date
+
+    def intervals(self, date: str, assistant_name: str) -> AssistantIntervals:
+        per_assistant = self._by_date.get(str(date or "").strip())
+        if not per_assistant:
+            return _EMPTY_INTERVALS
+        return per_assistant.get(str(assistant_name or "").strip().upper(), _EMPTY_INTERVALS)
+
+    def blocks_on(self, date: str) -> list[tuple[str, int, int]]:
+        """All (assistant, start, end) blocks on one date."""
+        out = []
+        for assistant, iv in self._by_date.get(str(date or "").strip(), {}).items():
+            out.extend((assistant, int(a), int(b)) for a, b in zip(iv.in_min, iv.out_min))
+        return out
+
+    def next_transition(self, date: str, assistant_names: list[str], minute: int) -> int | None:
+        """Earliest minute after `minute` at which any of these assistants' blocks start or end."""
+        bounds = [self.intervals(date, name).next_transition(minute) for name in assistant_names]
+        bounds = [b for b in bounds if b is not None]
+        return min(bounds) if bounds else None
+
+    @staticmethod
+    def _first_reason(iv: AssistantIntervals, hits: list[int]) -> str | None:
+        if not hits:
+            return None
+        best = min(hits, key=lambda j: int(iv.row_pos[j]))
+        return iv.role[best]
+
+    def blocked_at(self, date: str, assistant_name: str, minute: int) -> str | None:
+        """Reason of the first block covering `minute` (inclusive bounds), or None."""
+        iv = self.intervals(date, assistant_name)
+        return self._first_reason(iv, iv.covering(minute))
+
+    def first_overlap(self, date: str, assistant_name: str, start_min: int, end_min: int) -> str | None:
+        """Reason of the first block overlapping [start, end), or None."""
+        iv = self.intervals(date, assistant_name)
+        return self._first_reason(iv, iv.overlapping(start_min, end_min))
+
+
+def build_time_block_index(
+    blocks: list[dict],
+    to_minutes: Callable[[Any], int | None],
+    default_reason: str = "Blocked",
+) -> TimeBlockIndex:
+    """Group blocks by date and assistant; `to_minutes` parses start/end times."""
+    grouped: dict[str, dict[str, list[tuple[int, int, int, str]]]] = {}
+    for pos, block in enumerate(blocks or []):
+        if not isinstance(block, dict):
+            continue
+        date = str(block.get("date", "")).strip()
+        assistant = str(block.get("assistant", "")).strip().upper()
+        start = to_minutes(block.get("start_time"))
+        end = to_minutes(block.get("end_time"))
+        if not date or not assistant or start is None or end is None:
+            continue
+        if end < start:
+            end += 1440
+        grouped.setdefault(date, {}).setdefault(assistant, []).append(
+            (start, pos, end, block.get("reason", default_reason))
+        )
+
+    by_date: dict[str, dict[str, AssistantIntervals]] = {}
+    for date, per_assistant in grouped.items():
+        by_date[date] = {}
+        for assistant, entries in per_assistant.items():
+            entries.sort()
+            by_date[date][assistant] = AssistantIntervals(
+                [e[0] for e in entries], [e[2] for e in entries], [e[1] for e in entries],
+                [e[3] for e in entries], [""] * len(entries), [], [], [],
+            )
+    return TimeBlockIndex(by_date, time_blocks_signature(blocks))
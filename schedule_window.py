@@ -0,0 +1,113 @@
+"""
+Date partitioning and the live time window.
+
+Appointments carry a DATE ("YYYY-MM-DD"), stamped with the current day by
+the first save that sees them without one (stamp_dates()); rows not saved
+since are treated as part of the current day's sheet. Availability,
+occupancy and double-booking checks look at one day's rows (day_mask()),
+so bookings on other days never block today. The live dashboard only
+needs today's rows from shortly before now onwards: live_window_mask()
+selects them from a loaded frame, and the storage layer keeps earlier days
+out of the live load altogether (rows mode filters on the indexed `date`
+column; payload mode moves past days into per-day partition rows, see
+split_by_day()).
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any
+
+import pandas as pd
+
+from time_utils import coerce_to_time_obj
+
+DATE_COLUMN = "DATE"
+# Minutes before now still shown (late arrivals, appointments just finished)
+DEFAULT_LOOKBACK_MIN = 60
+
+_ISO_DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def normalize_date(value: Any) -> str:
+    """ISO day for a DATE cell; "" when blank or unparseable."""
+    if value is None or isinstance(value, bool):
+        return ""
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return "" if pd.isna(value) else value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    if _ISO_DAY.fullmatch(text):
+        return text
+    if not text or text.lower() in ("nan", "nat", "none"):
+        return ""
+    try:
+        return pd.Timestamp(text).strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return ""
+
+
+def row_dates(df: pd.DataFrame) -> pd.Series:
+    """Normalized DATE per row ("" for undated rows or when there is no DATE column)."""
+    if DATE_COLUMN not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[DATE_COLUMN].map(normalize_date)
+
+
+def day_mask(df: pd.DataFrame, day: str) -> pd.Series:
+    """Rows dated `day`, plus undated rows."""
+    dates = row_dates(df)
+    return dates.eq("") | dates.eq(day)
+
+
+def stamp_dates(df: pd.DataFrame, day: str) -> int:
+    """Fill blank DATE cells with `day` in place (adding the column if needed); returns how many."""
+    if DATE_COLUMN not in df.columns:
+        df[DATE_COLUMN] = ""
+    blank = row_dates(df).eq("")
+    if blank.any():
+        df[DATE_COLUMN] = df[DATE_COLUMN].astype(object)
+        df.loc[blank, DATE_COLUMN] = day
+    return int(blank.sum())
+
+
+def in_minutes(value: Any) -> int | None:
+    """Minutes since midnight of an In Time cell (None when it cannot be parsed)."""
+    t = coerce_to_time_obj(value)
+    return None if t is None else t.hour * 60 + t.minute
+
+
+def live_window_mask(
+    df: pd.DataFrame,
+    today: str,
+    now_min: int,
+    lookback_min: int = DEFAULT_LOOKBACK_MIN,
+) -> pd.Series:
+    """Rows of `today` (or undated) still running or starting after now - lookback.
+
+    Expects In_min/Out_min (see app._add_time_columns); rows whose times
+    could not be parsed are always kept.
+    """
+    on_day = day_mask(df, today)
+    in_min = pd.to_numeric(df["In_min"], errors="coerce") if "In_min" in df.columns else pd.Series(float("nan"), index=df.index)
+    out_min = pd.to_numeric(df["Out_min"], errors="coerce") if "Out_min" in df.columns else in_min
+    in_time = in_min.isna() | (in_min >= now_min - lookback_min) | (out_min >= now_min)
+    return on_day & in_time
+
+
+def split_by_day(records: list[dict[str, Any]], today: str) -> tuple[list[int], dict[str, list[int]]]:
+    """(positions of today/future/undated records, {past day: positions})."""
+    current: list[int] = []
+    past: dict[str, list[int]] = {}
+    for pos, record in enumerate(records):
+        day = normalize_date(record.get(DATE_COLUMN))
+        if day and day < today:
+            past.setdefault(day, []).append(pos)
+        else:
+            current.append(pos)
+    return current, past
+
+
+def partition_id(row_id: str, day: str) -> str:
+    """State-table id of one past day's partition row."""
+    return f"{row_id}@{day}"
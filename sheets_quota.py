@@ -0,0 +1,182 @@
+"""
+Request budget, backoff and metering for Google Sheets calls.
+
+Google Sheets allows a fixed number of read and write requests per minute
+(60 of each per user by default) and answers 429 past that, so on a busy
+clinic day loads and saves failed outright. SheetsQuota keeps a sliding
+one-minute window per kind of request: a call waits for a free slot instead
+of spending one the project does not have. Rejected calls are retried with
+jittered exponential backoff: reads on 429 and 5xx, writes on 429 only. A
+5xx can arrive after Google applied a write, and resending deleted rows or
+appended events would apply them twice; a failed save is re-planned by the
+write-behind queue instead, against a fresh check of the sheet's rows.
+MeteredSpreadsheet routes every call of a gspread spreadsheet (and the
+worksheets it hands out) through it.
+
+write_delay() tells the write-behind queue (save_queue) how long to hold
+saves while the write budget is nearly spent, so they merge into one write.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+WINDOW_SECONDS = 60.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Only a 429 guarantees the write was not applied
+WRITE_RETRY_STATUSES = (429,)
+
+# gspread methods by the quota they draw from
+_READS = frozenset({
+    "values_batch_get", "values_get", "batch_get", "worksheets", "worksheet", "fetch_sheet_metadata",
+    "get_all_values", "get_all_records", "get_values", "col_values", "row_values", "acell", "cell",
+})
+_WRITES = frozenset({
+    "batch_update", "values_batch_update", "values_update", "values_append", "update", "append_row",
+    "append_rows", "add_worksheet", "clear", "insert_rows", "delete_rows", "update_cell",
+})
+
+
+def status_code(error: BaseException) -> int | None:
+    """HTTP status of a gspread APIError (or anything shaped like one)."""
+    code = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SheetsQuota:
+    def __init__(
+        self,
+        reads_per_minute: int = 60,
+        writes_per_minute: int = 60,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        self.limits = {"read": max(1, int(reads_per_minute)), "write": max(1, int(writes_per_minute))}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+        self._sent: dict[str, deque[float]] = {"read": deque(), "write": deque()}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled_waits = 0
+        self.throttled_seconds = 0.0
+        self.failures = 0
+
+    def _used(self, kind: str, now: float) -> deque[float]:
+        sent = self._sent[kind]
+        while sent and now - sent[0] >= WINDOW_SECONDS:
+            sent.popleft()
+        return sent
+
+    def acquire(self, kind: str) -> None:
+        """Take one request slot, sleeping until the window has one free."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                sent = self._used(kind, now)
+                if len(sent) < self.limits[kind]:
+                    sent.append(now)
+                    self.calls += 1
+                    return
+                wait = sent[0] + WINDOW_SECONDS - now
+                self.throttled_waits += 1
+                self.throttled_seconds += wait
+            self._sleep(wait)
+
+    def headroom(self, kind: str) -> int:
+        with self._lock:
+            return self.limits[kind] - len(self._used(kind, self._clock()))
+
+    def write_delay(self, reserve: int = 5) -> float:
+        """Seconds until more than `reserve` write slots are free again (0 when they already are)."""
+        with self._lock:
+            now = self._clock()
+            sent = self._used("write", now)
+            over = len(sent) - (self.limits["write"] - reserve) + 1
+            if over <= 0:
+                return 0.0
+            return max(0.0, sent[min(over, len(sent)) - 1] + WINDOW_SECONDS - now)
+
+    def call(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """fn(*args, **kwargs) within the budget, retrying rejected calls with backoff."""
+        retry_statuses = WRITE_RETRY_STATUSES if kind == "write" else RETRY_STATUSES
+        attempt = 0
+        while True:
+            self.acquire(kind)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if status_code(e) not in retry_statuses or attempt >= self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                # Half fixed, half random, so sessions hitting the limit together spread out
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + self._jitter() / 2)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+            self._sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled_waits": self.throttled_waits,
+                "throttled_seconds": round(self.throttled_seconds, 1),
+                "failures": self.failures,
+                "reads_last_minute": len(self._used("read", now)),
+                "writes_last_minute": len(self._used("write", now)),
+            }
+
+
+class _Metered:
+    """Proxy that sends the target's API methods through a SheetsQuota."""
+
+    def __init__(self, target: Any, quota: SheetsQuota):
+        self._target = target
+        self._quota = quota
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        kind = "read" if name in _READS else "write" if name in _WRITES else None
+        if kind is None or not callable(value):
+            return value
+
+        def metered(*args: Any, **kwargs: Any) -> Any:
+            return self._wrap(self._quota.call(kind, value, *args, **kwargs))
+
+        return metered
+
+    def _wrap(self, result: Any) -> Any:
+        return result
+
+
+class MeteredSpreadsheet(_Metered):
+    def _wrap(self, result: Any) -> Any:
+        if isinstance(result, list):
+            return [self._wrap(r) for r in result]
+        if hasattr(result, "row_count") and hasattr(result, "spreadsheet"):
+            return MeteredWorksheet(result, self)
+        return result
+
+
+class MeteredWorksheet(_Metered):
+    def __init__(self, target: Any, spreadsheet: MeteredSpreadsheet):
+        super().__init__(target, spreadsheet._quota)
+        # Calls made through worksheet.spreadsheet are metered too
+        self.spreadsheet = spreadsheet
@@ -0,0 +1,75 @@
+"""
+Batched reads for the Google Sheets backend.
+
+Loading used to take three or more serial round trips: a worksheet lookup
+for Meta (creating it when missing), its get_all_values(), then
+get_all_records() on the schedule sheet. Now open_handles() resolves the
+schedule and Meta worksheets from one metadata fetch (the app keeps the
+result for the life of the process), and read_schedule() fetches both
+sheets with a single values_batch_get. Nothing is created on the read path;
+the Meta sheet is added by the first save that needs it.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+META_WORKSHEET = "Meta"
+
+
+@dataclass
+class SheetHandles:
+    spreadsheet: Any
+    # The schedule (first worksheet, like gspread's sheet1)
+    worksheet: Any
+    # None until a save creates it
+    meta_worksheet: Any = None
+
+
+def open_handles(spreadsheet: Any) -> SheetHandles:
+    """Schedule and Meta worksheets from a single metadata fetch."""
+    worksheets = spreadsheet.worksheets()
+    meta = next((ws for ws in worksheets if ws.title == META_WORKSHEET), None)
+    return SheetHandles(spreadsheet, worksheets[0], meta)
+
+
+def _a1_sheet(title: str) -> str:
+    """A range covering a whole sheet."""
+    return "'" + title.replace("'", "''") + "'"
+
+
+def records_from_values(values: list[list[Any]]) -> list[dict[str, Any]]:
+    """Row dicts keyed by the header row, numbers converted as get_all_records() does."""
+    from gspread.utils import numericise_all
+
+    if not values:
+        return []
+    header = [str(h) for h in values[0]]
+    width = len(header)
+    return [
+        dict(zip(header, numericise_all((list(row) + [""] * width)[:width])))
+        for row in values[1:]
+    ]
+
+
+def meta_from_values(values: list[list[Any]]) -> dict[str, str]:
+    """Meta sheet key/value pairs (with or without a header row)."""
+    start = 1 if values and len(values[0]) >= 2 and str(values[0][0]).strip().lower() in {"key", "k"} else 0
+    meta: dict[str, str] = {}
+    for row in values[start:]:
+        if len(row) < 2:
+            continue
+        key = str(row[0]).strip()
+        if key:
+            meta[key] = str(row[1]).strip()
+    return meta
+
+
+def read_schedule(handles: SheetHandles) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """(schedule records, meta) in one values_batch_get."""
+    ranges = [_a1_sheet(handles.worksheet.title)]
+    if handles.meta_worksheet is not None:
+        ranges.append(_a1_sheet(handles.meta_worksheet.title))
+    resp = handles.spreadsheet.values_batch_get(ranges)
+    blocks = [r.get("values") or [] for r in (resp or {}).get("valueRanges", [])]
+    blocks += [[]] * (2 - len(blocks))
+    return records_from_values(blocks[0]), meta_from_values(blocks[1])
@@ -0,0 +1,189 @@
+"""
+Cell-diff writer for the Google Sheets backend.
+
+Saving used to clear the worksheet and rewrite every cell, then do the same
+for the Meta sheet: several API calls, quota proportional to the whole sheet
+and a moment where readers saw an empty sheet. write_changes() turns a
+schedule_diff Changeset into a single spreadsheets.batchUpdate:
+
+- removed appointments: deleteDimension on their rows
+- added appointments: insertDimension at their position, then their cells
+- edited appointments: updateCells on the changed runs of cells only
+- Meta: rewritten in the same request, only when meta changed
+
+Saves that cannot be lined up with the last loaded grid (no snapshot,
+reordered rows, changed columns, another session's rows in the way) rewrite
+the cells in place and blank what is left over, still without clearing the
+sheet first.
+"""
+
+import json
+from typing import Any
+
+from schedule_diff import Changeset, Snapshot
+
+
+def cell_text(value: Any) -> str:
+    """A value as the sheet stores it (RAW string, blanks for missing values)."""
+    text = str(value)
+    return "" if text in ("nan", "None", "NaT", "<NA>") else text
+
+
+def meta_rows(meta: dict[str, Any]) -> list[list[str]]:
+    """Meta sheet contents: a key/value header, JSON for lists and dicts."""
+    return [["key", "value"]] + [
+        [str(k), json.dumps(v) if isinstance(v, (dict, list)) else str(v)] for k, v in meta.items()
+    ]
+
+
+def _cells(values: list[Any]) -> dict[str, Any]:
+    return {"values": [{"userEnteredValue": {"stringValue": cell_text(v)}} for v in values]}
+
+
+def _update(sheet_id: int, row: int, col: int, rows: list[list[Any]]) -> dict[str, Any]:
+    return {"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": row, "columnIndex": col},
+        "rows": [_cells(r) for r in rows],
+        "fields": "userEnteredValue",
+    }}
+
+
+def _clear(sheet_id: int, start_row: int, start_col: int = 0) -> dict[str, Any]:
+    """Blank every cell from (start_row, start_col) to the end of the sheet."""
+    return {"updateCells": {
+        "range": {"sheetId": sheet_id, "startRowIndex": start_row, "startColumnIndex": start_col},
+        "fields": "userEnteredValue",
+    }}
+
+
+def _dimension(op: str, sheet_id: int, start: int, end: int) -> dict[str, Any]:
+    body: dict[str, Any] = {"range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": start, "endIndex": end}}
+    if op == "insertDimension":
+        body["inheritFromBefore"] = False
+    return {op: body}
+
+
+def _append(sheet_id: int, dimension: str, length: int) -> dict[str, Any]:
+    return {"appendDimension": {"sheetId": sheet_id, "dimension": dimension, "length": length}}
+
+
+def _runs(positions: list[int]) -> list[tuple[int, int]]:
+    """Contiguous (start, end) runs of sorted positions."""
+    runs: list[tuple[int, int]] = []
+    for p in positions:
+        if runs and runs[-1][1] == p:
+            runs[-1] = (runs[-1][0], p + 1)
+        else:
+            runs.append((p, p + 1))
+    return runs
+
+
+def rewrite_requests(sheet_id: int, changes: Changeset, row_count: int, col_count: int) -> tuple[list[dict[str, Any]], int]:
+    """Write the whole grid over the existing cells and blank the rest; also returns the new row count."""
+    columns = list(changes.columns)
+    grid = [columns] + [[r.get(c, "") for c in columns] for r in changes.records]
+    requests: list[dict[str, Any]] = []
+    if len(grid) > row_count:
+        requests.append(_append(sheet_id, "ROWS", len(grid) - row_count))
+    if len(columns) > col_count:
+        requests.append(_append(sheet_id, "COLUMNS", len(columns) - col_count))
+    requests.append(_update(sheet_id, 0, 0, grid))
+    if row_count > len(grid):
+        requests.append(_clear(sheet_id, len(grid)))
+    if col_count > len(columns):
+        requests.append(_clear(sheet_id, 0, len(columns)))
+    return requests, max(row_count, len(grid))
+
+
+def diff_requests(
+    sheet_id: int,
+    previous: Snapshot,
+    changes: Changeset,
+    row_count: int,
+) -> tuple[list[dict[str, Any]], int] | None:
+    """Requests turning the `previous` grid into the changeset's (and the new row count).
+
+    None when they do not line up.
+    """
+    if changes.columns_changed or not changes.keys_are_ids:
+        return None
+    old_pos = {k: i for i, k in enumerate(previous.keys)}
+    deleted = set(changes.deleted)
+    if [k for k in previous.keys if k not in deleted] != [k for k in changes.keys if k in old_pos]:
+        return None  # rows were reordered
+    requests: list[dict[str, Any]] = []
+    rows = row_count
+    # Bottom-up, so earlier deletions do not shift later ones (row 0 is the header)
+    for start, end in reversed(_runs(sorted(old_pos[k] for k in deleted))):
+        requests.append(_dimension("deleteDimension", sheet_id, start + 1, end + 1))
+        rows -= end - start
+    # Top-down, so each insert lands at its final position
+    for change in sorted(changes.inserted, key=lambda c: c.position):
+        row = change.position + 1
+        if row >= rows:
+            requests.append(_append(sheet_id, "ROWS", row - rows + 1))
+            rows = row + 1
+        else:
+            requests.append(_dimension("insertDimension", sheet_id, row, row + 1))
+            rows += 1
+        requests.append(_update(sheet_id, row, 0, [[change.values.get(c, "") for c in changes.columns]]))
+    col_index = {c: i for i, c in enumerate(changes.columns)}
+    for change in changes.updated:
+        cols = sorted(col_index[c] for c in change.values if c in col_index)
+        for start, end in _runs(cols):
+            values = [change.values[changes.columns[i]] for i in range(start, end)]
+            requests.append(_update(sheet_id, change.position + 1, start, [values]))
+    return requests, rows
+
+
+def meta_requests(sheet_id: int, meta: dict[str, Any], row_count: int) -> list[dict[str, Any]]:
+    rows = meta_rows(meta)
+    grow = [_append(sheet_id, "ROWS", len(rows) - row_count)] if len(rows) > row_count else []
+    return grow + [_update(sheet_id, 0, 0, rows), _clear(sheet_id, len(rows))]
+
+
+def _ids_match(worksheet: Any, previous: Snapshot) -> bool:
+    """Whether the sheet still holds the snapshot's rows (another session may have changed them)."""
+    if "REMINDER_ROW_ID" not in previous.columns:
+        return False
+    stored = worksheet.col_values(previous.columns.index("REMINDER_ROW_ID") + 1)[1:]
+    while stored and not str(stored[-1]).strip():
+        stored.pop()
+    return stored == previous.keys
+
+
+def write_changes(
+    worksheet: Any,
+    previous: Snapshot | None,
+    changes: Changeset,
+    meta_worksheet: Any = None,
+    meta: dict[str, Any] | None = None,
+) -> int:
+    """Apply `changes` (and meta, when it changed) in one batchUpdate; returns the request count."""
+    if changes.is_empty:
+        return 0
+    requests: list[dict[str, Any]] = []
+    rows, cols = worksheet.row_count, worksheet.col_count
+    if changes.rows_changed or changes.full:
+        plan = None
+        if previous is not None and not changes.full and previous.keys_are_ids and _ids_match(worksheet, previous):
+            plan = diff_requests(worksheet.id, previous, changes, rows)
+        if plan is None:
+            plan = rewrite_requests(worksheet.id, changes, rows, cols)
+            cols = max(cols, len(changes.columns))
+        requests, rows = plan
+    if changes.meta_changed and meta_worksheet is not None and meta is not None:
+        requests += meta_requests(meta_worksheet.id, meta, meta_worksheet.row_count)
+    if requests:
+        worksheet.spreadsheet.batch_update({"requests": requests})
+        _remember_grid(worksheet, rows, cols)
+        if meta_worksheet is not None and changes.meta_changed and meta is not None:
+            _remember_grid(meta_worksheet, max(meta_worksheet.row_count, len(meta_rows(meta))), meta_worksheet.col_count)
+    return len(requests)
+
+
+def _remember_grid(worksheet: Any, rows: int, cols: int) -> None:
+    """Keep gspread's cached grid size in step, as its own add_rows()/delete_rows() do."""
+    props = getattr(worksheet, "_properties", None)
+    if isinstance(props, dict):
+        props.setdefault("gridProperties", {}).update(rowCount=rows, columnCount=cols)
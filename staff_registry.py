@@ -0,0 +1,116 @@
+"""
+Canonical staff registry for the allotment dashboard.
+
+Doctor and assistant names reach the app in many spellings ("DR.HUSSAIN",
+"DR. HUSSAIN", "dr.husain", "HUSSAIN"). The registry assigns every canonical
+person a small integer ID and resolves any spelling to that ID (and its
+department) with one dict lookup. Spellings are matched the same way the old
+department lookups did: normalised key equality, then a suffix match in
+either direction, first configured name wins. The result of that scan is
+remembered, so it runs at most once per distinct spelling.
+"""
+
+import re
+from typing import Any, Iterable
+
+SHARED_DEPARTMENT = "SHARED"
+
+
+def norm_staff_key(value: Any) -> str:
+    """Normalize names like 'DR. HUSSAIN' vs 'DR.HUSSAIN' to a stable key."""
+    try:
+        s = str(value or "").strip().upper()
+        return re.sub(r"[^A-Z0-9]+", "", s)
+    except Exception:
+        return ""
+
+
+class StaffRegistry:
+    """Doctor/assistant alias table: spelling -> staff ID -> (name, department).
+
+    `aliases` maps alternative spellings to the canonical name they belong to
+    (e.g. {"DR.HUSAIN": "DR.HUSSAIN"}). Names seen in the data are registered
+    with `observe()`; ones that match no configured person get their own ID
+    with an empty department.
+    """
+
+    def __init__(self, departments: dict[str, dict], aliases: dict[str, str] | None = None):
+        self.names: list[str] = []
+        self.kinds: list[str] = []
+        self.departments: list[str] = []
+        self._by_key: dict[tuple[str, str], int | None] = {}
+        # Configured (key, id) per kind in department order, for the suffix scan
+        self._configured: dict[str, list[tuple[str, int]]] = {"doctor": [], "assistant": []}
+
+        aliases = {norm_staff_key(k): norm_staff_key(v) for k, v in (aliases or {}).items()}
+        for dept, config in departments.items():
+            for kind, names in (("doctor", config.get("doctors", [])), ("assistant", config.get("assistants", []))):
+                for name in names:
+                    key = norm_staff_key(name)
+                    if not key:
+                        continue
+                    canonical = aliases.get(key, key)
+                    staff_id = self._by_key.get((kind, canonical))
+                    if staff_id is None:
+                        staff_id = self._new_id(kind, str(name).strip().upper(), dept)
+                        self._by_key[(kind, canonical)] = staff_id
+                    self._by_key[(kind, key)] = staff_id
+                    self._configured[kind].append((key, staff_id))
+
+        # Alias spellings that are not themselves listed in DEPARTMENTS
+        for key, canonical in aliases.items():
+            for kind in ("doctor", "assistant"):
+                if (kind, canonical) in self._by_key and (kind, key) not in self._by_key:
+                    self._by_key[(kind, key)] = self._by_key[(kind, canonical)]
+
+    def _new_id(self, kind: str, name: str, department: str) -> int:
+        self.names.append(name)
+        self.kinds.append(kind)
+        self.departments.append(department)
+        return len(self.names) - 1
+
+    def _resolve(self, kind: str, value: Any) -> int | None:
+        key = norm_staff_key(value)
+        if not key:
+            return None
+        try:
+            return self._by_key[(kind, key)]
+        except KeyError:
+            pass
+        staff_id = None
+        for cfg_key, cfg_id in self._configured[kind]:
+            if key.endswith(cfg_key) or cfg_key.endswith(key):
+                staff_id = cfg_id
+                break
+        self._by_key[(kind, key)] = staff_id
+        return staff_id
+
+    def observe(self, doctors: Iterable[Any] = (), assistants: Iterable[Any] = ()) -> None:
+        """Register names found in the data so later lookups are a single dict hit."""
+        for kind, values in (("doctor", doctors), ("assistant", assistants)):
+            for value in values:
+                key = norm_staff_key(value)
+                if key and self._resolve(kind, value) is None:
+                    self._by_key[(kind, key)] = self._new_id(kind, str(value).strip().upper(), "")
+
+    def doctor_id(self, name: Any) -> int | None:
+        return self._resolve("doctor", name)
+
+    def assistant_id(self, name: Any) -> int | None:
+        return self._resolve("assistant", name)
+
+    def name(self, staff_id: int) -> str:
+        return self.names[staff_id]
+
+    def department(self, staff_id: int | None) -> str:
+        return "" if staff_id is None else self.departments[staff_id]
+
+    def department_for_doctor(self, name: Any) -> str:
+        """Department of a doctor, "" when unknown."""
+        return self.department(self._resolve("doctor", name))
+
+    def department_for_assistant(self, name: Any) -> str:
+        """Department of an assistant; unknown (and shared) assistants are "SHARED"."""
+        if not norm_staff_key(name):
+            return ""
+        return self.department(self._resolve("assistant", name)) or SHARED_DEPARTMENT
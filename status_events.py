@@ -0,0 +1,269 @@
+"""
+Append-only log of appointment status changes.
+
+Status history used to live in the STATUS_LOG cell as a JSON list, so every
+change re-serialised the whole list and the cell travelled with every load
+and save. Each change is now one appended event, and the schedule row only
+keeps the latest STATUS_CHANGED_AT / ACTUAL_START_AT / ACTUAL_END_AT:
+
+- SupabaseStatusEventStore: one row per event in its own table
+- GSheetsStatusEventStore: one line per event on a "StatusEvents" worksheet
+- JsonLinesStatusEventStore: a JSON-lines file beside the Excel workbook
+
+append() adds events; for_row() and for_day() read the history back in the
+order it was written. stamp_status_changes() turns a save into events,
+compared with row_statuses() of the frame last handed to storage.
+"""
+
+import json
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import pandas as pd
+
+from schedule_diff import Snapshot, row_keys
+
+DEFAULT_STATUS_EVENTS_TABLE = "tdb_status_events"
+STATUS_EVENTS_WORKSHEET = "StatusEvents"
+_SHEET_HEADER = ["row_id", "from_status", "to_status", "at", "day"]
+
+STATUS_EVENTS_TABLE_SQL = (
+    "create table if not exists tdb_status_events (\n"
+    "  id bigint generated always as identity primary key,\n"
+    "  schedule_id text not null,\n"
+    "  row_id text not null,\n"
+    "  from_status text not null default '',\n"
+    "  to_status text not null default '',\n"
+    "  at timestamptz not null default now(),\n"
+    "  day date not null\n"
+    ");\n"
+    "create index if not exists tdb_status_events_row on tdb_status_events (schedule_id, row_id, id);\n"
+    "create index if not exists tdb_status_events_day on tdb_status_events (schedule_id, day, id);\n"
+)
+
+# Statuses that start / finish an appointment (stamp ACTUAL_START_AT / ACTUAL_END_AT)
+START_STATUSES = ("ON GOING", "ONGOING")
+END_STATUSES = ("DONE", "COMPLETED")
+
+
+@dataclass
+class StatusEvent:
+    row_id: str
+    from_status: str
+    to_status: str
+    # ISO timestamp with UTC offset
+    at: str
+    # Local date of the change (defaults to the date part of `at`)
+    day: str = ""
+
+    def __post_init__(self) -> None:
+        self.day = self.day or self.at[:10]
+
+
+def _status(value: Any) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+def _event(row: dict[str, Any]) -> StatusEvent:
+    return StatusEvent(
+        str(row.get("row_id") or ""),
+        _status(row.get("from_status")),
+        _status(row.get("to_status")),
+        str(row.get("at") or ""),
+        str(row.get("day") or ""),
+    )
+
+
+def _keys(df: pd.DataFrame) -> list[str]:
+    ids = df["REMINDER_ROW_ID"].tolist() if "REMINDER_ROW_ID" in df.columns else [""] * len(df)
+    return row_keys([{"REMINDER_ROW_ID": "" if pd.isna(v) else v} for v in ids])
+
+
+def row_statuses(source: Snapshot | pd.DataFrame) -> dict[str, str]:
+    """STATUS per row key of a snapshot or frame (the base for the next stamp_status_changes)."""
+    if isinstance(source, Snapshot):
+        return {key: _status(record.get("STATUS")) for key, record in source.records.items()}
+    if "STATUS" not in source.columns:
+        return {}
+    return {key: _status(value) for key, value in zip(_keys(source), source["STATUS"].tolist())}
+
+
+def stamp_status_changes(
+    previous: dict[str, str] | None,
+    df: pd.DataFrame,
+    at: str,
+    stamp: str,
+) -> tuple[list[StatusEvent], dict[str, dict[str, str]]]:
+    """Events for rows whose STATUS differs from `previous` (see row_statuses), stamping their audit columns.
+
+    STATUS_CHANGED_AT (and ACTUAL_START_AT / ACTUAL_END_AT for start and end
+    statuses) are set to `stamp` in `df`. Stamps for audit columns the frame
+    does not have (left out of a projected load) are returned as
+    {row_id: {column: stamp}} instead. Without a base nothing is known to
+    have changed.
+    """
+    if previous is None or "STATUS" not in df.columns or df.empty:
+        return [], {}
+    events: list[StatusEvent] = []
+    detached: dict[str, dict[str, str]] = {}
+    for pos, (key, value) in enumerate(zip(_keys(df), df["STATUS"].tolist())):
+        new = _status(value)
+        before = previous.get(key)
+        old = before or ""
+        if new.upper() == old.upper() or (before is None and not new) or key.startswith("pos-"):
+            continue
+        events.append(StatusEvent(key, old, new, at))
+        stamps = {"STATUS_CHANGED_AT": stamp}
+        if new.upper() in START_STATUSES:
+            stamps["ACTUAL_START_AT"] = stamp
+        elif new.upper() in END_STATUSES:
+            stamps["ACTUAL_END_AT"] = stamp
+        for col, val in stamps.items():
+            if col in df.columns:
+                df.iat[pos, df.columns.get_loc(col)] = val
+            else:
+                detached.setdefault(key, {})[col] = val
+    return events, detached
+
+
+def legacy_events(row_id: str, status_log: Any) -> list[StatusEvent]:
+    """Events from an old STATUS_LOG cell (a JSON list of {"at", "from", "to"})."""
+    try:
+        items = json.loads(status_log) if isinstance(status_log, str) and status_log.strip() else status_log
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return [
+        StatusEvent(str(row_id), _status(e.get("from")), _status(e.get("to") or e.get("status")), str(e.get("at") or ""))
+        for e in items
+        if isinstance(e, dict)
+    ]
+
+
+class SupabaseStatusEventStore:
+    def __init__(self, client: Any, schedule_id: str, table: str = DEFAULT_STATUS_EVENTS_TABLE):
+        self.client = client
+        self.schedule_id = schedule_id
+        self.table = table
+
+    def append(self, events: list[StatusEvent]) -> None:
+        if events:
+            self.client.table(self.table).insert(
+                [{"schedule_id": self.schedule_id, **asdict(e)} for e in events]
+            ).execute()
+
+    def _select(self, column: str, value: str) -> list[StatusEvent]:
+        resp = (
+            self.client.table(self.table)
+            .select("row_id,from_status,to_status,at,day")
+            .eq("schedule_id", self.schedule_id)
+            .eq(column, value)
+            .order("id")
+            .execute()
+        )
+        return [_event(r) for r in (getattr(resp, "data", None) or [])]
+
+    def for_row(self, row_id: str) -> list[StatusEvent]:
+        return self._select("row_id", str(row_id))
+
+    def for_day(self, day: str) -> list[StatusEvent]:
+        return self._select("day", day)
+
+
+class GSheetsStatusEventStore:
+    """Event lines on a separate worksheet; append() is one append_rows call."""
+
+    def __init__(self, spreadsheet: Any, title: str = STATUS_EVENTS_WORKSHEET):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self._worksheet: Any = None
+        self._lock = threading.Lock()
+
+    def _open(self, create: bool) -> Any:
+        if self._worksheet is None:
+            try:
+                self._worksheet = self.spreadsheet.worksheet(self.title)
+            except Exception:
+                if not create:
+                    return None
+                self._worksheet = self.spreadsheet.add_worksheet(title=self.title, rows=1000, cols=len(_SHEET_HEADER))
+                self._worksheet.update("A1:E1", [_SHEET_HEADER])
+        return self._worksheet
+
+    def append(self, events: list[StatusEvent]) -> None:
+        if not events:
+            return
+        with self._lock:
+            lines = [[e.row_id, e.from_status, e.to_status, e.at, e.day] for e in events]
+            self._open(create=True).append_rows(lines, value_input_option="RAW")
+
+    def _events(self, column: int, value: str) -> list[StatusEvent]:
+        """Lines whose `column` equals `value`: one read of that column, one of just those lines.
+
+        Matching lines are fetched as runs of consecutive rows; a day's
+        events are appended together, so a day is usually a single range.
+        """
+        with self._lock:
+            worksheet = self._open(create=False)
+            if worksheet is None:
+                return []
+            cells = worksheet.col_values(column + 1)
+            rows = [n for n, cell in enumerate(cells[1:], start=2) if str(cell).strip() == value]
+            if not rows:
+                return []
+            runs: list[list[int]] = []
+            for n in rows:
+                if runs and n == runs[-1][1] + 1:
+                    runs[-1][1] = n
+                else:
+                    runs.append([n, n])
+            last = chr(ord("A") + len(_SHEET_HEADER) - 1)
+            blocks = worksheet.batch_get([f"A{a}:{last}{b}" for a, b in runs])
+        lines = [list(line) + [""] * (len(_SHEET_HEADER) - len(line)) for block in blocks for line in block]
+        return [_event(dict(zip(_SHEET_HEADER, line))) for line in lines]
+
+    def for_row(self, row_id: str) -> list[StatusEvent]:
+        return self._events(0, str(row_id))
+
+    def for_day(self, day: str) -> list[StatusEvent]:
+        return self._events(4, day)
+
+
+class JsonLinesStatusEventStore:
+    """One JSON object per line, opened in append mode (never rewritten)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, events: list[StatusEvent]) -> None:
+        if not events:
+            return
+        text = "".join(json.dumps(asdict(e), ensure_ascii=False) + "\n" for e in events)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def _events(self) -> list[StatusEvent]:
+        events = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:  # a line cut short by a crash
+                        continue
+                    if isinstance(item, dict):
+                        events.append(_event(item))
+        except OSError:
+            pass
+        return events
+
+    def for_row(self, row_id: str) -> list[StatusEvent]:
+        return [e for e in self._events() if e.row_id == str(row_id)]
+
+    def for_day(self, day: str) -> list[StatusEvent]:
+        return [e for e in self._events() if e.day == day]
@@ -0,0 +1,715 @@
+"""
+Supabase persistence for the allotment schedule.
+
+Two storage modes are supported behind the same load/save entry points:
+
+- "payload": the original model. One row (`id`, `payload` jsonb) holds every
+  appointment plus meta, column-encoded (see payload_codec; the legacy
+  {"columns", "rows", "meta"} layout is still read). Cell-only edits are
+  shipped through the optional `tdb_patch_payload` RPC.
+- "rows": one row per appointment in a separate table, keyed by
+  (schedule_id, row_id) where row_id is the appointment's REMINDER_ROW_ID.
+  Saves upsert only rows the changeset touched and delete only rows that
+  disappeared, so concurrent sessions editing different appointments no
+  longer overwrite each other. Positions are sparse (POSITION_STEP apart),
+  so an inserted row takes a free position between its neighbours instead
+  of shifting every row below it. Column order and meta (time blocks) stay on
+  the payload row as {"columns": [...], "meta": {...}} and are rewritten only
+  when they change.
+
+Appointments dated before today (see schedule_window) stay out of the live
+load: rows mode filters on the indexed `date` column, payload mode moves
+them into per-day partition rows (`<id>@<day>`) on the next full write.
+load_schedule_range() queries any span of days and In Times.
+
+Saves take a schedule_diff.Changeset. Clients come from a process-wide
+SupabaseClientPool; the functions here take a client and never touch
+Streamlit, so they can be exercised with a fake client in tests.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+from column_profiles import LAZY_COLUMNS
+from payload_codec import encode_payload, frame_from_payload, frame_from_records, payload_version, records_from_payload
+from schedule_diff import Changeset, row_keys
+from schedule_window import DATE_COLUMN, in_minutes, normalize_date, partition_id, row_dates, split_by_day
+
+STORAGE_MODES = ("payload", "rows")
+# Gap between the positions of consecutive rows after a full write
+POSITION_STEP = 1024
+DEFAULT_ROWS_TABLE = "tdb_allotment_rows"
+PAYLOAD_PATCH_RPC = "tdb_patch_payload"
+
+ROWS_TABLE_SQL = (
+    "create table if not exists tdb_allotment_rows (\n"
+    "  schedule_id text not null,\n"
+    "  row_id text not null,\n"
+    "  position integer not null default 0,\n"
+    "  date date,\n"
+    "  in_min integer,\n"
+    "  data jsonb not null,\n"
+    "  lazy jsonb,\n"
+    "  updated_at timestamptz not null default now(),\n"
+    "  primary key (schedule_id, row_id)\n"
+    ");\n"
+    "alter table tdb_allotment_rows add column if not exists lazy jsonb;\n"
+    "alter table tdb_allotment_rows add column if not exists in_min integer;\n"
+    "create index if not exists tdb_allotment_rows_window on tdb_allotment_rows (schedule_id, date, in_min);\n"
+)
+
+# Merges changed cells into payload rows matched by REMINDER_ROW_ID (either
+# payload format); raises (and so rolls back) when a row or column is missing,
+# e.g. deleted by another session.
+PAYLOAD_PATCH_SQL = (
+    "create or replace function tdb_patch_payload(p_table text, p_id text, p_updates jsonb, p_meta jsonb default null)\n"
+    "returns integer language plpgsql as $$\n"
+    "declare\n"
+    "  cur jsonb;\n"
+    "  new_rows jsonb;\n"
+    "  matched integer;\n"
+    "  rid text;\n"
+    "  upd jsonb;\n"
+    "  col text;\n"
+    "  val jsonb;\n"
+    "  colv jsonb;\n"
+    "  pos integer;\n"
+    "  code integer;\n"
+    "  sect text;\n"
+    "begin\n"
+    "  execute format('select payload from %I where id = $1 for update', p_table) into cur using p_id;\n"
+    "  if cur is null then raise exception 'tdb_patch_payload: stale (no payload)'; end if;\n"
+    "  if coalesce(cur->>'format', '1') = '2' then\n"
+    "    matched := 0;\n"
+    "    for rid, upd in select key, value from jsonb_each(p_updates) loop\n"
+    "      pos := null;\n"
+    "      select t.ord - 1 into pos from jsonb_array_elements_text(cur->'data'->'REMINDER_ROW_ID')\n"
+    "        with ordinality as t(v, ord) where t.v = rid limit 1;\n"
+    "      if pos is null then raise exception 'tdb_patch_payload: stale (rows changed)'; end if;\n"
+    "      for col, val in select key, value from jsonb_each(upd) loop\n"
+    "        sect := case when (cur->'data') ? col then 'data' else 'lazy' end;\n"
+    "        colv := cur->sect->col;\n"
+    "        if colv is null then raise exception 'tdb_patch_payload: stale (columns changed)'; end if;\n"
+    "        if jsonb_typeof(colv) = 'object' then\n"
+    "          code := null;\n"
+    "          select t.ord - 1 into code from jsonb_array_elements(colv->'dict')\n"
+    "            with ordinality as t(v, ord) where t.v = val limit 1;\n"
+    "          if code is null then\n"
+    "            code := jsonb_array_length(colv->'dict');\n"
+    "            cur := jsonb_set(cur, array[sect, col, 'dict'], (colv->'dict') || jsonb_build_array(val));\n"
+    "          end if;\n"
+    "          cur := jsonb_set(cur, array[sect, col, 'codes', pos::text], to_jsonb(code));\n"
+    "        else\n"
+    "          cur := jsonb_set(cur, array[sect, col, pos::text], val);\n"
+    "        end if;\n"
+    "      end loop;\n"
+    "      matched := matched + 1;\n"
+    "    end loop;\n"
+    "    if p_meta is not null then cur := jsonb_set(cur, '{meta}', p_meta, true); end if;\n"
+    "    execute format('update %I set payload = $1, updated_at = now() where id = $2', p_table) using cur, p_id;\n"
+    "    return matched;\n"
+    "  end if;\n"
+    "  select count(*) into matched from jsonb_array_elements(cur->'rows') r where p_updates ? (r->>'REMINDER_ROW_ID');\n"
+    "  if matched <> (select count(*) from jsonb_object_keys(p_updates)) then\n"
+    "    raise exception 'tdb_patch_payload: stale (rows changed)';\n"
+    "  end if;\n"
+    "  select coalesce(jsonb_agg(case when p_updates ? (r->>'REMINDER_ROW_ID')\n"
+    "           then r || (p_updates -> (r->>'REMINDER_ROW_ID')) else r end order by ord), '[]'::jsonb)\n"
+    "    into new_rows from jsonb_array_elements(cur->'rows') with ordinality as t(r, ord);\n"
+    "  cur := jsonb_set(cur, '{rows}', new_rows);\n"
+    "  if p_meta is not null then cur := jsonb_set(cur, '{meta}', p_meta, true); end if;\n"
+    "  execute format('update %I set payload = $1, updated_at = now() where id = $2', p_table) using cur, p_id;\n"
+    "  return matched;\n"
+    "end $$;\n"
+)
+
+# Projects whose database lacks the patch function (full writes only)
+_PATCH_RPC_MISSING: set[str] = set()
+# PostgREST "function not in the schema cache" / Postgres "undefined function"
+_FUNCTION_MISSING_CODES = ("PGRST202", "42883")
+
+
+def _function_missing(error: Exception) -> bool:
+    """Whether an RPC failed because the function does not exist (not a timeout or 5xx)."""
+    code = str(getattr(error, "code", "") or "")
+    text = str(error)
+    return code in _FUNCTION_MISSING_CODES or any(c in text for c in _FUNCTION_MISSING_CODES)
+
+
+class SupabaseClientPool:
+    """One shared client per (url, key) for the whole process.
+
+    `factory(url, key)` builds a client (with its HTTP connection pool and
+    timeouts); every later get() for the same pair reuses it. A client that
+    failed a request or a health check is discarded and rebuilt on next use.
+    """
+
+    def __init__(self, factory: Callable[[str, str], Any], health_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self._factory = factory
+        self._clients: dict[tuple[str, str], Any] = {}
+        self._checked_at: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.health_interval = health_interval
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def get(self, url: str, key: str) -> Any:
+        with self._lock:
+            client = self._clients.get((url, key))
+            if client is not None:
+                self.reused += 1
+                return client
+            client = self._factory(url, key)
+            self._clients[(url, key)] = client
+            self.opened += 1
+            return client
+
+    def discard(self, url: str, key: str) -> None:
+        with self._lock:
+            if self._clients.pop((url, key), None) is not None:
+                self.discarded += 1
+            self._checked_at.pop((url, key), None)
+
+    def check_health(self, url: str, key: str, probe: Callable[[Any], Any], force: bool = False) -> None:
+        """Run `probe(client)` at most once per health_interval; on failure discard and re-raise."""
+        now = self._clock()
+        last = self._checked_at.get((url, key))
+        if not force and last is not None and now - last < self.health_interval:
+            return
+        try:
+            probe(self.get(url, key))
+        except Exception:
+            self.discard(url, key)
+            raise
+        self._checked_at[(url, key)] = now
+
+    def stats(self) -> dict[str, int]:
+        return {"opened": self.opened, "reused": self.reused, "discarded": self.discarded, "live": len(self._clients)}
+
+
+def normalize_storage_mode(value: Any) -> str:
+    """Map a configured storage mode to "payload" (default) or "rows"."""
+    mode = str(value or "").strip().lower()
+    return mode if mode in STORAGE_MODES else "payload"
+
+
+def probe_version(client: Any, table: str, row_id: str) -> str:
+    """The state row's updated_at (bumped by every save); "absent" when there is no row yet.
+
+    Selecting just this column is the cheap check that decides whether the
+    cached schedule is still current.
+    """
+    resp = client.table(table).select("updated_at").eq("id", row_id).execute()
+    data = getattr(resp, "data", None)
+    if not data or not isinstance(data, list):
+        return "absent"
+    return str(data[0].get("updated_at") or "")
+
+
+def _fetch_payload(client: Any, table: str, row_id: str) -> dict[str, Any] | None:
+    resp = client.table(table).select("payload").eq("id", row_id).execute()
+    data = getattr(resp, "data", None)
+    if not data or not isinstance(data, list):
+        return None
+    payload = data[0].get("payload")
+    return payload if isinstance(payload, dict) else None
+
+
+# Every top-level payload key except "lazy": format-2 payloads load without
+# their lazy columns (legacy row-dict payloads come back whole)
+_PAYLOAD_LIVE_SELECT = (
+    "format:payload->format,columns:payload->columns,n:payload->n,"
+    "data:payload->data,meta:payload->meta,rows:payload->rows,storage:payload->storage"
+)
+
+
+def _fetch_live_payload(client: Any, table: str, row_id: str) -> dict[str, Any] | None:
+    resp = client.table(table).select(_PAYLOAD_LIVE_SELECT).eq("id", row_id).execute()
+    data = getattr(resp, "data", None)
+    if not data or not isinstance(data, list):
+        return None
+    payload = {k: v for k, v in data[0].items() if v is not None}
+    return payload or None
+
+
+def _records_by_key(records: list[dict[str, Any]], columns: tuple[str, ...]) -> dict[str, dict[str, Any]]:
+    keys = row_keys(records)
+    return {k: {c: r[c] for c in columns if c in r} for k, r in zip(keys, records)}
+
+
+# ---------------- payload mode ----------------
+
+def load_payload_frame(
+    client: Any,
+    table: str,
+    row_id: str,
+    expected_columns: list[str],
+    omit: tuple[str, ...] = (),
+    today: str | None = None,
+) -> pd.DataFrame:
+    """Load the payload row, leaving out `omit` columns (see column_profiles).
+
+    A projected frame carries the left-out names in attrs["lazy_columns"].
+    When it still holds appointments dated before `today`, attrs
+    ["needs_full_save"] is set so the next save moves them to their day
+    partitions.
+    """
+    payload = _fetch_live_payload(client, table, row_id) if omit else _fetch_payload(client, table, row_id)
+    if not payload:
+        df = pd.DataFrame(columns=[c for c in expected_columns if c not in omit])
+    else:
+        df = frame_from_payload(payload, expected_columns, omit)
+        meta = payload.get("meta")
+        if isinstance(meta, dict):
+            df.attrs["meta"] = dict(meta)
+        if today:
+            dates = row_dates(df)
+            if (dates.ne("") & dates.lt(today)).any():
+                df.attrs["needs_full_save"] = True
+    if omit:
+        df.attrs["lazy_columns"] = list(omit)
+    return df
+
+
+def _payload_lazy_fields(client: Any, table: str, row_id: str, columns: tuple[str, ...]) -> dict[str, dict[str, Any]]:
+    payload = _fetch_payload(client, table, row_id) or {}
+    return _records_by_key(records_from_payload(payload), columns)
+
+
+def save_payload_frame(
+    client: Any,
+    table: str,
+    row_id: str,
+    changes: Changeset,
+    meta: dict[str, Any] | None,
+    project: str = "",
+    now_iso: str | None = None,
+    payload_format: str = "columnar",
+    lazy_columns: tuple[str, ...] = (),
+    today: str | None = None,
+) -> str:
+    """Apply a changeset to the single payload row.
+
+    Pure cell edits on rows with real REMINDER_ROW_IDs go through the
+    `tdb_patch_payload` RPC, shipping only the changed cells (and meta when it
+    changed); anything else, or a failed patch, rewrites the whole payload.
+    Both bump updated_at (the RPC server-side). Returns "skipped", "patched"
+    or "full". Full writes use `payload_format` (see payload_codec), keep
+    the stored values of `lazy_columns` (those the frame was loaded without)
+    and, given `today`, move earlier days into their partition rows.
+    """
+    if changes.is_empty:
+        return "skipped"
+    if changes.only_updates and changes.keys_are_ids and project not in _PATCH_RPC_MISSING:
+        params = {
+            "p_table": table,
+            "p_id": row_id,
+            "p_updates": {c.key: c.values for c in changes.updated},
+            "p_meta": meta if changes.meta_changed else None,
+        }
+        try:
+            client.rpc(PAYLOAD_PATCH_RPC, params).execute()
+            return "patched"
+        except Exception as e:
+            # Otherwise (stale snapshot, timeout, 5xx) only this save falls back
+            if _function_missing(e):
+                _PATCH_RPC_MISSING.add(project)
+    columns, records = list(changes.columns), changes.records
+    missing = tuple(c for c in lazy_columns if c not in columns)
+    if missing:
+        stored = _payload_lazy_fields(client, table, row_id, missing)
+        missing = tuple(c for c in missing if any(c in fields for fields in stored.values()))
+        columns += list(missing)
+        records = [{**r, **{c: stored.get(k, {}).get(c, "") for c in missing}} for k, r in zip(changes.keys, records)]
+    if today:
+        current, past = split_by_day(records, today)
+        for day, positions in sorted(past.items()):
+            _archive_day(client, table, row_id, day, columns, [changes.keys[i] for i in positions],
+                         [records[i] for i in positions], payload_format, now_iso)
+        records = [records[i] for i in current]
+    record: dict[str, Any] = {"id": row_id, "payload": encode_payload(columns, records, meta, payload_format)}
+    if now_iso:
+        record["updated_at"] = now_iso
+    client.table(table).upsert(record).execute()
+    return "full"
+
+
+def _archive_day(
+    client: Any,
+    table: str,
+    row_id: str,
+    day: str,
+    columns: list[str],
+    keys: list[str],
+    records: list[dict[str, Any]],
+    payload_format: str,
+    now_iso: str | None,
+) -> None:
+    """Merge one past day's appointments into its partition row (same key wins)."""
+    pid = partition_id(row_id, day)
+    stored = _fetch_payload(client, table, pid) or {}
+    stored_records = records_from_payload(stored)
+    merged = dict(zip(row_keys(stored_records), stored_records))
+    merged.update(zip(keys, records))
+    all_columns = list(stored.get("columns") or [])
+    all_columns += [c for c in columns if c not in all_columns]
+    record: dict[str, Any] = {"id": pid, "payload": encode_payload(all_columns, list(merged.values()), None, payload_format)}
+    if now_iso:
+        record["updated_at"] = now_iso
+    client.table(table).upsert(record).execute()
+
+
+# ---------------- rows mode ----------------
+
+def _split_lazy(record: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    data = {c: v for c, v in record.items() if c not in LAZY_COLUMNS}
+    return data, {c: v for c, v in record.items() if c in LAZY_COLUMNS}
+
+
+def load_rows_frame(
+    client: Any,
+    table: str,
+    row_id: str,
+    rows_table: str,
+    expected_columns: list[str],
+    omit: tuple[str, ...] = (),
+    since: str | None = None,
+) -> pd.DataFrame:
+    """Load a row-per-appointment schedule, leaving out `omit` columns.
+
+    Lazy columns live in the rows' `lazy` jsonb column, which the query only
+    selects when nothing is omitted. With `since`, rows dated earlier are
+    left in the table (undated rows always load). The first load after switching from
+    payload mode serves the payload rows and sets attrs["needs_full_save"],
+    so the next save writes all of them.
+    """
+    header = _fetch_payload(client, table, row_id) or {}
+    query = (
+        client.table(rows_table)
+        .select("row_id,position,data" if omit else "row_id,position,data,lazy")
+        .eq("schedule_id", row_id)
+    )
+    if since:
+        query = query.or_(f"date.is.null,date.gte.{since}")
+    data = getattr(query.order("position").execute(), "data", None) or []
+    data = sorted(data, key=lambda r: int(r.get("position") or 0))
+    records = [{**(r.get("data") or {}), **(r.get("lazy") or {})} for r in data]
+    positions = {str(r.get("row_id")): int(r.get("position") or 0) for r in data}
+    migrating = not records and header.get("storage") != "rows" and bool(header.get("rows") or header.get("n"))
+    if migrating:
+        records = records_from_payload(header)
+    df = frame_from_records(records, header.get("columns"), expected_columns, omit)
+    for col in LAZY_COLUMNS:
+        # Rows saved from a live-view frame have no lazy values yet
+        if col in df.columns and df[col].isna().any():
+            df[col] = df[col].fillna("")
+    meta = header.get("meta")
+    if isinstance(meta, dict):
+        df.attrs["meta"] = dict(meta)
+    if migrating:
+        df.attrs["needs_full_save"] = True
+    if omit:
+        df.attrs["lazy_columns"] = list(omit)
+    if positions:
+        # Stored sort keys, picked up by schedule_diff.take_snapshot
+        df.attrs["row_positions"] = positions
+    return df
+
+
+def _longest_increasing(values: list[int]) -> set[int]:
+    """Indexes of one longest strictly increasing subsequence of `values`."""
+    tails: list[int] = []  # index of the smallest tail of each length
+    tail_values: list[int] = []
+    parents = [-1] * len(values)
+    for i, v in enumerate(values):
+        lo = bisect.bisect_left(tail_values, v)
+        parents[i] = tails[lo - 1] if lo else -1
+        if lo == len(tails):
+            tails.append(i)
+            tail_values.append(v)
+        else:
+            tails[lo] = i
+            tail_values[lo] = v
+    keep, i = set(), tails[-1] if tails else -1
+    while i >= 0:
+        keep.add(i)
+        i = parents[i]
+    return keep
+
+
+def place_rows(keys: list[str], stored: dict[str, int]) -> dict[str, int]:
+    """Position for every key in the new order, keeping as many stored positions as possible.
+
+    Rows whose stored positions are still in order keep them; new and
+    reordered rows get evenly spread positions between their kept
+    neighbours. When a gap is too small, every row is renumbered
+    POSITION_STEP apart.
+    """
+    known = [i for i, k in enumerate(keys) if k in stored]
+    kept = {known[j] for j in _longest_increasing([stored[keys[i]] for i in known])}
+    placed = {keys[i]: stored[keys[i]] for i in kept}
+    i = 0
+    while i < len(keys):
+        if i in kept:
+            i += 1
+            continue
+        end = i
+        while end < len(keys) and end not in kept:
+            end += 1
+        lo = placed[keys[i - 1]] if i > 0 else None
+        hi = placed[keys[end]] if end < len(keys) else None
+        count = end - i
+        if lo is None and hi is None:
+            lo, step = -POSITION_STEP, POSITION_STEP
+        elif lo is None:
+            lo, step = hi - POSITION_STEP * (count + 1), POSITION_STEP
+        elif hi is None:
+            step = POSITION_STEP
+        else:
+            step = (hi - lo) // (count + 1)
+            if step < 1:
+                return {k: n * POSITION_STEP for n, k in enumerate(keys)}
+        for n in range(count):
+            placed[keys[i + n]] = lo + step * (n + 1)
+        i = end
+    return placed
+
+
+def _stored_row_ids(client: Any, rows_table: str, row_id: str, since: str | None = None) -> list[str]:
+    query = client.table(rows_table).select("row_id").eq("schedule_id", row_id)
+    if since:
+        query = query.or_(f"date.is.null,date.gte.{since}")
+    return [str(r.get("row_id")) for r in (getattr(query.execute(), "data", None) or [])]
+
+
+def save_rows_frame(
+    client: Any,
+    table: str,
+    row_id: str,
+    rows_table: str,
+    changes: Changeset,
+    meta: dict[str, Any] | None,
+    now_iso: str,
+    since: str | None = None,
+) -> dict[str, int]:
+    """Upsert changed/inserted rows and delete removed ones.
+
+    Rows that only shifted because of an insert or delete keep their stored
+    position and are not written (see place_rows); only rows that really
+    changed order get a new one. Positions written are recorded in
+    `changes.positions`.
+
+    A full changeset (no snapshot to diff against) upserts every row and
+    deletes stored rows that are no longer in the frame (only among rows
+    dated `since` or later, or undated, when the frame was loaded that way).
+    Each row's `date`/`in_min` come from its DATE and In Time cells. Column order and meta
+    go to the payload row only when they changed; its updated_at is bumped
+    on every write. The `lazy` column is only written when the frame has lazy
+    columns, so saving a live-view frame keeps the stored ones. Returns
+    {"upserted", "deleted", "meta_written"} counts.
+    """
+    if changes.full:
+        current = set(changes.keys)
+        removed = [k for k in _stored_row_ids(client, rows_table, row_id, since) if k not in current]
+        placed = {k: n * POSITION_STEP for n, k in enumerate(changes.keys)}
+        positions = list(range(len(changes.keys)))
+    else:
+        removed = list(changes.deleted)
+        placed = place_rows(changes.keys, changes.positions)
+        repositioned = {n for n, k in enumerate(changes.keys) if changes.positions.get(k) != placed[k]}
+        positions = sorted(set(changes.touched_positions()) | repositioned)
+
+    if changes.meta_changed:
+        header: dict[str, Any] = {"storage": "rows", "columns": list(changes.columns)}
+        if meta is not None:
+            header["meta"] = meta
+        client.table(table).upsert({"id": row_id, "payload": header, "updated_at": now_iso}).execute()
+    elif positions or removed:
+        # Bump the state row so probe_version() sees the change
+        client.table(table).update({"updated_at": now_iso}).eq("id", row_id).execute()
+
+    if positions:
+        with_lazy = any(c in LAZY_COLUMNS for c in changes.columns)
+        upserts = []
+        for i in positions:
+            data, lazy = _split_lazy(changes.records[i])
+            row = {
+                "schedule_id": row_id,
+                "row_id": changes.keys[i],
+                "position": placed[changes.keys[i]],
+                "date": normalize_date(changes.records[i].get(DATE_COLUMN)) or None,
+                "in_min": in_minutes(changes.records[i].get("In Time")),
+                "data": data,
+                "updated_at": now_iso,
+            }
+            if with_lazy:
+                row["lazy"] = lazy
+            upserts.append(row)
+        client.table(rows_table).upsert(upserts, on_conflict="schedule_id,row_id").execute()
+    if removed:
+        client.table(rows_table).delete().eq("schedule_id", row_id).in_("row_id", removed).execute()
+    changes.positions.clear()
+    changes.positions.update(placed)
+    return {"upserted": len(positions), "deleted": len(removed), "meta_written": int(changes.meta_changed)}
+
+
+def load_lazy_fields(
+    client: Any,
+    table: str,
+    row_id: str,
+    storage_mode: str,
+    rows_table: str,
+    row_ids: list[str] | None = None,
+    columns: tuple[str, ...] = LAZY_COLUMNS,
+) -> dict[str, dict[str, Any]]:
+    """{row key: {column: value}} for lazy columns, for `row_ids` (all rows when None).
+
+    Rows mode fetches just those rows' `lazy` column (older rows kept them in
+    `data`); payload mode reads the payload once.
+    """
+    if normalize_storage_mode(storage_mode) == "rows":
+        query = client.table(rows_table).select("row_id,data,lazy").eq("schedule_id", row_id)
+        if row_ids is not None:
+            query = query.in_("row_id", list(row_ids))
+        fields = {}
+        for r in getattr(query.execute(), "data", None) or []:
+            merged = {**(r.get("data") or {}), **(r.get("lazy") or {})}
+            fields[str(r.get("row_id"))] = {c: merged[c] for c in columns if c in merged}
+    else:
+        fields = _payload_lazy_fields(client, table, row_id, columns)
+    if row_ids is not None:
+        wanted = set(row_ids)
+        fields = {k: v for k, v in fields.items() if k in wanted}
+    return fields
+
+
+def _merge_payload_fields(
+    client: Any,
+    table: str,
+    row_id: str,
+    fields: dict[str, dict[str, Any]],
+    now_iso: str | None,
+) -> None:
+    """Read the payload, set `fields` on their rows and write it back in its own format."""
+    payload = _fetch_payload(client, table, row_id)
+    if not payload:
+        return
+    records = records_from_payload(payload)
+    columns = list(payload.get("columns") or [])
+    added = [c for c in dict.fromkeys(c for values in fields.values() for c in values) if c not in columns]
+    columns += added
+    for key, record in zip(row_keys(records), records):
+        record.update({c: "" for c in added if c not in record})
+        record.update(fields.get(key, {}))
+    payload_format = "columnar" if payload_version(payload) >= 2 else "rows"
+    record: dict[str, Any] = {"payload": encode_payload(columns, records, payload.get("meta"), payload_format)}
+    if now_iso:
+        record["updated_at"] = now_iso
+    client.table(table).update(record).eq("id", row_id).execute()
+
+
+def save_lazy_fields(
+    client: Any,
+    table: str,
+    row_id: str,
+    storage_mode: str,
+    rows_table: str,
+    fields: dict[str, dict[str, Any]],
+    project: str = "",
+    now_iso: str | None = None,
+) -> None:
+    """Write lazy-column values ({row id: {column: value}}) for rows loaded without them.
+
+    Payload mode sends them through the patch RPC, falling back like
+    save_payload_frame to a read-modify-write of the payload when the RPC
+    is missing or fails; rows mode merges them into each row's `lazy` column.
+    """
+    if not fields:
+        return
+    if normalize_storage_mode(storage_mode) != "rows":
+        if project not in _PATCH_RPC_MISSING:
+            params = {"p_table": table, "p_id": row_id, "p_updates": fields, "p_meta": None}
+            try:
+                client.rpc(PAYLOAD_PATCH_RPC, params).execute()
+                return
+            except Exception as e:
+                if _function_missing(e):
+                    _PATCH_RPC_MISSING.add(project)
+        _merge_payload_fields(client, table, row_id, fields, now_iso)
+        return
+    resp = client.table(rows_table).select("row_id,lazy").eq("schedule_id", row_id).in_("row_id", list(fields)).execute()
+    for r in getattr(resp, "data", None) or []:
+        key = str(r.get("row_id"))
+        (
+            client.table(rows_table)
+            .update({"lazy": {**(r.get("lazy") or {}), **fields[key]}})
+            .eq("schedule_id", row_id)
+            .eq("row_id", key)
+            .execute()
+        )
+
+
+def load_schedule_range(
+    client: Any,
+    table: str,
+    row_id: str,
+    storage_mode: str,
+    rows_table: str,
+    date_from: str,
+    date_to: str,
+    expected_columns: list[str],
+    from_min: int | None = None,
+    to_min: int | None = None,
+) -> pd.DataFrame:
+    """Appointments dated date_from..date_to (inclusive), optionally by In Time minutes.
+
+    Rows mode runs one query on the (schedule_id, date, in_min) index;
+    payload mode reads the day partitions plus the live payload. Undated
+    rows are not included.
+    """
+    if normalize_storage_mode(storage_mode) == "rows":
+        query = (
+            client.table(rows_table)
+            .select("row_id,position,date,in_min,data,lazy")
+            .eq("schedule_id", row_id)
+            .gte("date", date_from)
+            .lte("date", date_to)
+        )
+        if from_min is not None:
+            query = query.gte("in_min", from_min)
+        if to_min is not None:
+            query = query.lte("in_min", to_min)
+        data = getattr(query.order("date").execute(), "data", None) or []
+        data = sorted(data, key=lambda r: (str(r.get("date") or ""), r.get("in_min") or 0, int(r.get("position") or 0)))
+        records = [{**(r.get("data") or {}), **(r.get("lazy") or {})} for r in data]
+        return frame_from_records(records, _record_columns(records), expected_columns)
+
+    days = pd.date_range(date_from, date_to, freq="D").strftime("%Y-%m-%d").tolist()
+    resp = client.table(table).select("id,payload").in_("id", [row_id] + [partition_id(row_id, d) for d in days]).execute()
+    records: list[dict[str, Any]] = []
+    for stored in sorted(getattr(resp, "data", None) or [], key=lambda r: str(r.get("id"))):
+        records += records_from_payload(stored.get("payload") or {})
+    picked = []
+    for record in records:
+        day = normalize_date(record.get(DATE_COLUMN))
+        start = in_minutes(record.get("In Time"))
+        if not day or not (date_from <= day <= date_to):
+            continue
+        if (from_min is not None or to_min is not None) and start is None:
+            continue
+        if (from_min is not None and start < from_min) or (to_min is not None and start > to_min):
+            continue
+        picked.append(record)
+    picked.sort(key=lambda r: (normalize_date(r.get(DATE_COLUMN)), in_minutes(r.get("In Time")) or 0))
+    return frame_from_records(picked, _record_columns(picked), expected_columns)
+
+
+def _record_columns(records: list[dict[str, Any]]) -> list[str]:
+    """Every key in the records, in first-seen order (so DATE survives the expected-column backfill)."""
+    return list(dict.fromkeys(k for r in records for k in r))
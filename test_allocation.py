@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Tests for the day-wide assistant allocator.
+
+auto_allocate_day() must produce the same assignments as running the original
+per-row allocator over the day in In Time order (each row seeing the rows
+filled before it), just without the per-row availability rebuild.
+"""
+
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from allocation import AllocationTables, auto_allocate_day, apply_allocations, get_allocation_tables
+from schedule_window import day_mask
+
+DEPARTMENTS = {
+    "PROSTHO": {
+        "doctors": ["DR.HUSSAIN", "DR.SHIFA"],
+        "assistants": ["ARCHANA", "SHAKSHI", "RAJA", "NITIN", "ANSHIKA", "BABU", "PRAMOTH", "RESHMA"],
+        "allocation_rules": {
+            "FIRST": {
+                "default": ["ANSHIKA", "RAJA", "NITIN", "RESHMA", "PRAMOTH", "BABU"],
+                "time_override": [(13, "ARCHANA"), (15.5, "SHAKSHI")],
+            },
+            "SECOND": {
+                "when_first_is": {"ANSHIKA": ["ARCHANA", "NITIN", "BABU", "RAJA", "RESHMA", "PRAMOTH"]},
+                "default": ["NITIN", "ANSHIKA", "BABU", "RAJA", "RESHMA", "PRAMOTH"],
+            },
+        },
+    },
+    "ENDO": {
+        "doctors": ["DR.FARHATH", "DR.NIMAI", "DR.SHRUTI"],
+        "assistants": ["ANYA", "LAVANYA", "ROHINI", "MUKHILA", "SHAKSHI", "ARCHANA", "ANSHIKA"],
+        "allocation_rules": {
+            "FIRST": {
+                "DR.NIMAI": ["ARCHANA"],
+                "DR.FARHATH": ["ANYA", "LAVANYA", "ROHINI"],
+                "default": ["LAVANYA", "ROHINI", "ANYA"],
+                "time_override": [(12, "ANYA")],
+            },
+            "SECOND": {"default": ["MUKHILA", "SHAKSHI", "ARCHANA", "ROHINI"]},
+            "Third": {"default": ["ROHINI", "SHAKSHI", "ARCHANA", "MUKHILA"]},
+        },
+    },
+}
+DOCTOR_DEPT = {d: dept for dept, cfg in DEPARTMENTS.items() for d in cfg["doctors"]}
+
+
+def _dept(doctor: str) -> str:
+    return DOCTOR_DEPT.get(str(doctor).strip().upper(), "")
+
+
+def _make_day(n_rows: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    everyone = sorted({a for cfg in DEPARTMENTS.values() for a in cfg["assistants"]})
+    rows = []
+    for i in range(n_rows):
+        start = rng.randrange(9 * 60, 19 * 60, 5)
+        rows.append({
+            "REMINDER_ROW_ID": f"r{i}",
+            "DR.": rng.choice(list(DOCTOR_DEPT) + [""]),
+            "In_min": start,
+            "Out_min": start + rng.choice([15, 30, 45, 60]),
+            "FIRST": rng.choice([""] * 6 + everyone),
+            "SECOND": rng.choice([""] * 8 + everyone),
+            "Third": "",
+            "STATUS": rng.choice(["WAITING", "WAITING", "ARRIVED", "CANCELLED"]),
+        })
+    return pd.DataFrame(rows)
+
+
+def _nested_rule_pick(rule, role, doctor, first, appt_hour, free, already):
+    """The original nested walk over one role's allocation rule."""
+    def pick(names):
+        return [free[a] for a in names if a not in already and a in free]
+
+    preferred = pick(rule.get("default", []))
+    if not preferred:
+        preferred = pick(rule.get(doctor, []))
+        if not preferred and role == "SECOND" and first in rule.get("when_first_is", {}):
+            preferred = pick(rule["when_first_is"][first])
+        if not preferred and role == "FIRST":
+            preferred = pick([a for hour, a in rule.get("time_override", []) if appt_hour >= hour])
+    return preferred[0] if preferred else ""
+
+
+def _reference_allocate(df: pd.DataFrame, is_unavailable) -> pd.DataFrame:
+    """Original per-row allocator, run row by row in In Time order."""
+    df = df.copy()
+    blank = lambda v: str(v).strip().lower() in {"", "nan", "none"}
+
+    def busy(name, start, end, row_id):
+        for _, r in df.iterrows():
+            if r["REMINDER_ROW_ID"] == row_id or "CANCELLED" in str(r["STATUS"]).upper():
+                continue
+            if name not in [str(r[c]).strip().upper() for c in ["FIRST", "SECOND", "Third"]]:
+                continue
+            if not (end <= r["In_min"] or start >= r["Out_min"]):
+                return True
+        return False
+
+    for label in df[~df["STATUS"].str.contains("CANCELLED")].sort_values("In_min", kind="stable").index:
+        row = df.loc[label]
+        dept = _dept(row["DR."])
+        if not dept:
+            continue
+        start, end = int(row["In_min"]), int(row["Out_min"])
+        cfg = DEPARTMENTS[dept]
+        free = {
+            a.upper(): a for a in cfg["assistants"]
+            if not is_unavailable(a, start, end) and not busy(a.upper(), start, end, row["REMINDER_ROW_ID"])
+        }
+        already = {str(row[c]).strip().upper() for c in ["FIRST", "SECOND", "Third"] if not blank(row[c])}
+        for role in ["FIRST", "SECOND", "Third"]:
+            if not blank(df.at[label, role]):
+                continue
+            rule = cfg["allocation_rules"].get(role)
+            first = str(df.at[label, "FIRST"]).strip()
+            chosen = _nested_rule_pick(rule, role, row["DR."].strip(), first, start / 60, free, already) if rule else ""
+            chosen = chosen or next((v for v in free.values() if v not in already), "")
+            if chosen:
+                df.at[label, role] = chosen
+                already.add(chosen)
+    return df
+
+
+def test_matches_row_by_row_allocation():
+    off = {"RAJA"}
+    blocks = {"ANYA": [(12 * 60, 13 * 60)]}
+
+    def is_unavailable(name, start, end):
+        if name in off:
+            return True
+        return any(not (end <= s or start >= e) for s, e in blocks.get(name, []))
+
+    for seed in range(5):
+        df = _make_day(60, seed)
+        expected = _reference_allocate(df, is_unavailable)
+        allocations = auto_allocate_day(df, DEPARTMENTS, _dept, is_unavailable=is_unavailable)
+        got = df.copy()
+        apply_allocations(got, allocations)
+        pd.testing.assert_frame_equal(got, expected)
+
+
+def test_nobody_double_booked_and_frame_untouched():
+    df = _make_day(300, seed=42)
+    snapshot = df.copy()
+    started = time.perf_counter()
+    allocations = auto_allocate_day(df, DEPARTMENTS, _dept)
+    elapsed = time.perf_counter() - started
+    pd.testing.assert_frame_equal(df, snapshot)
+    assert allocations
+    assert elapsed < 1.0, f"300-row allocation took {elapsed:.3f}s"
+
+    filled = df.copy()
+    apply_allocations(filled, allocations)
+    for label in allocations:
+        row = filled.loc[label]
+        given = list(allocations[label].values())
+        kept = [df.at[label, r] for r in ["FIRST", "SECOND", "Third"] if df.at[label, r]]
+        assert len(given) == len(set(given)) and not set(given) & set(kept)
+        for name in allocations[label].values():
+            clash = filled[
+                (filled.index != label)
+                & ~filled["STATUS"].str.contains("CANCELLED")
+                & (filled[["FIRST", "SECOND", "Third"]] == name).any(axis=1)
+                & (filled["In_min"] < row["Out_min"])
+                & (filled["Out_min"] > row["In_min"])
+            ]
+            assert clash.empty, f"{name} double-booked at row {label}"
+
+
+def test_other_days_neither_block_nor_get_filled():
+    today, tomorrow = "2026-01-05", "2026-01-06"
+    df = pd.DataFrame({
+        "DATE": [today, tomorrow, tomorrow, ""],
+        "DR.": ["DR.FARHATH"] * 4,
+        "In_min": [600, 600, 600, 700],
+        "Out_min": [630, 630, 630, 730],
+        "FIRST": ["", "LAVANYA", "", ""],
+        "SECOND": ["MUKHILA", "MUKHILA", "MUKHILA", "MUKHILA"],
+        "Third": ["ROHINI", "ROHINI", "ROHINI", "ROHINI"],
+        "STATUS": ["WAITING"] * 4,
+    }, index=[10, 11, 12, 13])
+
+    # What the app hands the sweep: today's and undated rows, original labels kept
+    allocations = auto_allocate_day(df[day_mask(df, today)], DEPARTMENTS, _dept)
+    assert set(allocations) == {10, 13}
+    # Tomorrow's LAVANYA booking at the same minutes does not block her today
+    assert allocations[10] == {"FIRST": "LAVANYA"}
+    apply_allocations(df, allocations)
+    assert df.at[12, "FIRST"] == "" and df.at[11, "FIRST"] == "LAVANYA"
+
+
+def test_compiled_tables_match_nested_rules():
+    tables = AllocationTables(DEPARTMENTS)
+    rng = random.Random(3)
+    for _ in range(3000):
+        dept = rng.choice(list(DEPARTMENTS))
+        cfg = DEPARTMENTS[dept]
+        role = rng.choice(["FIRST", "SECOND", "Third"])
+        doctor = rng.choice(cfg["doctors"] + ["DR.UNKNOWN"])
+        first = rng.choice(cfg["assistants"] + [""])
+        hour = rng.choice([9.0, 11.99, 12.0, 12.5, 13.0, 15.49, 15.5, 18.0])
+        free = {a: a for a in cfg["assistants"] if rng.random() < 0.4}
+        already = {a for a in cfg["assistants"] if rng.random() < 0.2}
+        rule = cfg["allocation_rules"].get(role)
+        expected = _nested_rule_pick(rule, role, doctor, first, hour, free, already) if rule else ""
+        assert tables.pick(dept, role, doctor, hour, first, free, already) == expected
+
+
+def test_compile_rejects_unknown_names_and_recompiles_on_change():
+    bad = {"ENDO": {"doctors": ["DR.NIMAI"], "assistants": ["ANYA"],
+                    "allocation_rules": {"FIRST": {"default": ["ANYA", "ANAYA"], "DR.NIMAY": ["ANYA"]}}}}
+    try:
+        AllocationTables(bad)
+    except ValueError as exc:
+        assert "ANAYA" in str(exc) and "DR.NIMAY" in str(exc)
+    else:
+        raise AssertionError("unknown names should fail compilation")
+
+    roster = {"ENDO": {"doctors": ["DR.NIMAI"], "assistants": ["ANYA", "ROHINI"],
+                       "allocation_rules": {"FIRST": {"default": ["ANYA"]}}}}
+    first = get_allocation_tables(roster)
+    assert get_allocation_tables(roster) is first
+    roster["ENDO"]["allocation_rules"]["FIRST"]["default"] = ["ROHINI", "ANYA"]
+    second = get_allocation_tables(roster)
+    assert second is not first
+    assert second.candidates("ENDO", "FIRST", "DR. NIMAI", 10.0) == ("ROHINI", "ANYA")
+
+
+if __name__ == "__main__":
+    test_matches_row_by_row_allocation()
+    test_nobody_double_booked_and_frame_untouched()
+    test_other_days_neither_block_nor_get_filled()
+    test_compiled_tables_match_nested_rules()
+    test_compile_rejects_unknown_names_and_recompiles_on_change()
+    print("✅ allocation tests passed")
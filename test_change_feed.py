@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for schedule change notifications.
+
+The in-process feed must wake waiting sessions and count every publish; the
+NOTIFY listener must forward payloads from a (fake) Postgres connection and
+reconnect after the connection drops.
+"""
+
+import threading
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from change_feed import LocalChangeFeed, PostgresNotifyListener
+
+
+def test_local_feed_counts_and_wakes_waiters():
+    feed = LocalChangeFeed()
+    seen = []
+    unsubscribe = feed.subscribe(lambda channel, seq: seen.append((channel, seq)))
+    assert feed.sequence("main") == 0
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(feed.wait_for_change("main", 0, timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    assert feed.publish("main") == 1
+    waiter.join(2)
+    assert result == [1]
+
+    feed.publish("other")
+    unsubscribe()
+    feed.publish("main")
+    assert seen == [("main", 1), ("other", 1)]
+    assert feed.sequence("main") == 2
+    assert feed.wait_for_change("main", 2, timeout=0.01) == 2
+
+
+class _FakeConnection:
+    def __init__(self, script):
+        self.script = script
+        self.listened = []
+
+    def listen(self, channel):
+        self.listened.append(channel)
+
+    def poll(self, timeout):
+        if not self.script:
+            time.sleep(0.01)
+            return []
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        pass
+
+
+def test_notify_listener_forwards_and_reconnects():
+    feed = LocalChangeFeed()
+    connections = [
+        _FakeConnection([["main"], ConnectionResetError("server closed the connection")]),
+        _FakeConnection([["main", "main"]]),
+    ]
+    opened = []
+
+    def connect(dsn):
+        opened.append(dsn)
+        return connections[len(opened) - 1]
+
+    listener = PostgresNotifyListener(
+        "postgres://x", feed, connect=connect, poll_timeout=0.01, initial_backoff=0.01, max_backoff=0.05,
+    ).start()
+    deadline = time.time() + 3
+    while feed.sequence("main") < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    listener.stop()
+    assert feed.sequence("main") == 3
+    assert opened == ["postgres://x", "postgres://x"]
+    assert connections[0].listened == ["tdb_allotment_changes"]
+    assert "server closed" in listener.last_error
+
+
+if __name__ == "__main__":
+    test_local_feed_counts_and_wakes_waiters()
+    test_notify_listener_forwards_and_reconnects()
+    print("✅ change feed tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the double-booking detector.
+
+find_double_bookings() must report exactly the overlapping pairs a brute
+force comparison of every pair of rows finds, per chair, doctor and assistant.
+"""
+
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from conflicts import find_double_bookings
+
+ASSISTANTS = ["ANSHIKA", "ARCHANA", "RAJA", "NITIN", "ANYA", "ROHINI"]
+
+
+def _make_schedule(n_rows: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        start = rng.randrange(8 * 60, 20 * 60, 5)
+        rows.append({
+            "Patient Name": f"P{i}",
+            "In_min": start,
+            "Out_min": start + rng.choice([15, 30, 60]),
+            "DR.": rng.choice(["DR.HUSSAIN", "DR.HUSAIN", "DR.NIMAI", ""]),
+            "OP": rng.choice(["OP 1", "OP 2", "OP 3", "OP 4", "OP 5", ""]),
+            "FIRST": rng.choice(ASSISTANTS + [""] * 4),
+            "SECOND": rng.choice(ASSISTANTS + [""] * 8),
+            "Third": "",
+            "STATUS": rng.choice(["WAITING", "ARRIVED", "CANCELLED", "DONE"]),
+        })
+    return pd.DataFrame(rows, index=[f"r{i}" for i in range(n_rows)])
+
+
+def _brute_force(df: pd.DataFrame, canonical) -> set:
+    active = df[~df["STATUS"].str.contains("CANCELLED|DONE")]
+    found = set()
+    rows = list(active.iterrows())
+    for a, (label_a, ra) in enumerate(rows):
+        for label_b, rb in rows[a + 1:]:
+            if not (ra["In_min"] < rb["Out_min"] and rb["In_min"] < ra["Out_min"]):
+                continue
+            if ra["OP"] and ra["OP"] == rb["OP"]:
+                found.add(("OP", ra["OP"], frozenset([label_a, label_b])))
+            if ra["DR."] and canonical(ra["DR."]) == canonical(rb["DR."]):
+                found.add(("DR.", canonical(ra["DR."]), frozenset([label_a, label_b])))
+            shared = {ra["FIRST"], ra["SECOND"]} & {rb["FIRST"], rb["SECOND"]} - {""}
+            for name in shared:
+                found.add(("ASSISTANT", name, frozenset([label_a, label_b])))
+    return found
+
+
+def test_matches_pairwise_comparison():
+    canonical = lambda name: "DR.HUSSAIN" if name == "DR.HUSAIN" else name
+    for seed in range(4):
+        df = _make_schedule(120, seed)
+        conflicts, cells = find_double_bookings(df, normalizers={"DR.": canonical})
+        got = {(r["Resource"], r["Name"], frozenset([r["Row"], r["Other Row"]])) for _, r in conflicts.iterrows()}
+        assert got == _brute_force(df, canonical)
+        assert len(got) == len(conflicts)
+        flagged = set(cells.index[cells.any(axis=1)])
+        assert flagged == {label for _, _, pair in got for label in pair}
+
+
+def test_highlights_mark_the_clashing_cells_only():
+    df = pd.DataFrame({
+        "Patient Name": ["A", "B", "C"],
+        "In Time": ["09:00", "09:30", "11:00"],
+        "Out Time": ["10:00", "10:15", "11:30"],
+        "DR.": ["DR.NIMAI", "DR.SHIFA", "DR.NIMAI"],
+        "OP": ["OP 1", "OP 1", "OP 1"],
+        "FIRST": ["ANYA", "RAJA", "ANYA"],
+        "SECOND": ["", "anya ", ""],
+        "Third": ["", "", ""],
+        "STATUS": ["WAITING", "ARRIVED", "WAITING"],
+    })
+    conflicts, cells = find_double_bookings(df)
+    assert conflicts[["Resource", "Name", "Overlap"]].values.tolist() == [
+        ["ASSISTANT", "ANYA", "09:30-10:00"],
+        ["OP", "OP 1", "09:30-10:00"],
+    ]
+    assert cells.loc[0, ["OP", "FIRST"]].all() and cells.loc[1, ["OP", "SECOND"]].all()
+    assert not cells.loc[1, "FIRST"] and not cells.loc[:, "DR."].any() and not cells.loc[2].any()
+
+
+def test_large_day_is_fast_and_empty_is_safe():
+    df = _make_schedule(2000, seed=9)
+    started = time.perf_counter()
+    find_double_bookings(df)
+    assert time.perf_counter() - started < 2.0
+    conflicts, _ = find_double_bookings(pd.DataFrame())
+    assert conflicts.empty
+
+
+if __name__ == "__main__":
+    test_matches_pairwise_comparison()
+    test_highlights_mark_the_clashing_cells_only()
+    test_large_day_is_fast_and_empty_is_safe()
+    print("✅ double-booking tests passed")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the locked, atomic Excel workbook access.
+
+Saves must swap in a complete file (or leave the old one untouched) and a
+reader must wait for a save in progress instead of seeing a partial file.
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from excel_store import file_lock, meta_from_frame, read_workbook, write_workbook
+
+
+def _write_frame(df, meta=None):
+    def write(out):
+        with pd.ExcelWriter(out, engine="openpyxl") as writer:
+            df.to_excel(writer, sheet_name="Sheet1", index=False)
+            if meta is not None:
+                pd.DataFrame([{"key": k, "value": v} for k, v in meta.items()]).to_excel(writer, sheet_name="Meta", index=False)
+        return True
+    return write
+
+
+def _leftovers(directory):
+    return sorted(f for f in os.listdir(directory) if not f.endswith((".xlsx", ".lock")))
+
+
+def test_round_trip_and_failed_writes_leave_the_file_alone():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "Putt Allotment.xlsx")
+        df = pd.DataFrame({"Patient Name": ["Asha", "Ravi"], "In Time": ["09:30", "10:00"]})
+        assert write_workbook(path, _write_frame(df, {"time_blocks": "[]"}))
+        loaded = read_workbook(path)
+        assert loaded["Patient Name"].tolist() == ["Asha", "Ravi"]
+        assert loaded.attrs["meta"] == {"time_blocks": "[]"}
+
+        # A writer that gives up, or fails half-way, changes nothing and leaves no temp file
+        assert not write_workbook(path, lambda out: False)
+        def broken(out):
+            with open(out, "wb") as f:
+                f.write(b"PK\x03\x04 half a zip")
+            raise OSError("disk full")
+        try:
+            write_workbook(path, broken)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("the write error should propagate")
+        assert read_workbook(path)["Patient Name"].tolist() == ["Asha", "Ravi"]
+        assert _leftovers(d) == []
+
+        # The workbook keeps its permissions across saves
+        os.chmod(path, 0o644)
+        write_workbook(path, _write_frame(df))
+        assert os.stat(path).st_mode & 0o777 == 0o644
+
+        # Without a Meta sheet
+        write_workbook(path, _write_frame(df.iloc[:1]))
+        assert read_workbook(path).attrs["meta"] == {}
+
+
+def test_reader_waits_for_a_save_in_progress():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "book.xlsx")
+        write_workbook(path, _write_frame(pd.DataFrame({"n": [1]})))
+        started, release = threading.Event(), threading.Event()
+
+        def slow_save(out):
+            started.set()
+            release.wait(5)
+            return _write_frame(pd.DataFrame({"n": [2]}))(out)
+
+        writer = threading.Thread(target=write_workbook, args=(path, slow_save))
+        writer.start()
+        started.wait(5)
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(read_workbook(path)["n"].tolist()))
+        reader.start()
+        time.sleep(0.2)
+        assert seen == []  # blocked on the lock, not retrying
+        release.set()
+        writer.join(5)
+        reader.join(5)
+        assert seen == [[2]]
+
+        # Readers share the lock
+        with file_lock(path, shared=True):
+            assert read_workbook(path)["n"].tolist() == [2]
+
+
+def test_meta_columns_are_matched_case_insensitively():
+    meta_df = pd.DataFrame({"Key": ["time_blocks", "", "note"], "VALUE": ["[]", "x", " hi "]})
+    assert meta_from_frame(meta_df) == {"time_blocks": "[]", "note": "hi"}
+    assert meta_from_frame(pd.DataFrame({"a": [1]})) == {}
+
+
+if __name__ == "__main__":
+    test_round_trip_and_failed_writes_leave_the_file_alone()
+    test_reader_waits_for_a_save_in_progress()
+    test_meta_columns_are_matched_case_insensitively()
+    print("✅ excel store tests passed")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for the day occupancy matrix.
+
+The slot matrix is a prefilter, so it must never report a window free when
+an appointment really overlaps it (and must agree exactly when times sit on
+5-minute boundaries). Incremental syncs must leave the matrix identical to a
+fresh build.
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from occupancy import DayOccupancy, build_day_occupancy, find_free_windows
+
+ASSISTANTS = ["ANSHIKA", "ARCHANA", "RAJA", "NITIN", "ANYA", "ROHINI"]
+
+
+def _make_schedule(n_rows: int, seed: int, step: int = 5) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        start = rng.randrange(8 * 60, 20 * 60, step)
+        rows.append({
+            "REMINDER_ROW_ID": f"row-{i}",
+            "In_min": start,
+            "Out_min": start + rng.choice([step, 15, 30, 60, 95]),
+            "DR.": rng.choice(["DR.HUSSAIN", "DR.NIMAI", ""]),
+            "OP": rng.choice(["OP 1", "OP 2", "OP 3", ""]),
+            "FIRST": rng.choice(ASSISTANTS + [""]),
+            "SECOND": rng.choice(ASSISTANTS + ["", ""]),
+            "Third": "",
+            "STATUS": rng.choice(["WAITING", "ARRIVED", "CANCELLED", "DONE", ""]),
+        })
+    return pd.DataFrame(rows)
+
+
+def _exact_busy(df: pd.DataFrame, name: str, start: int, end: int) -> bool:
+    active = ~df["STATUS"].str.contains("CANCELLED|DONE")
+    mine = (df[["FIRST", "SECOND", "Third"]] == name).any(axis=1)
+    hit = df[active & mine & (df["In_min"] < end) & (df["Out_min"] > start)]
+    return not hit.empty
+
+
+def test_window_probe_is_conservative_and_exact_on_slot_boundaries():
+    for step, exact in [(5, True), (1, False)]:
+        df = _make_schedule(120, seed=step, step=step)
+        occupancy = build_day_occupancy(df, assistants=ASSISTANTS)
+        rng = random.Random(7)
+        for _ in range(120):
+            start = rng.randrange(7 * 60, 21 * 60, step)
+            end = start + rng.choice([step, 20, 45, 90])
+            flags = occupancy.busy_in_window("assistant", ASSISTANTS, start, end)
+            for name, flagged in zip(ASSISTANTS, flags):
+                truth = _exact_busy(df, name, start, end)
+                if truth:
+                    assert flagged, (name, start, end)
+                elif exact:
+                    assert not flagged, (name, start, end)
+
+
+def test_incremental_sync_matches_fresh_build():
+    df = _make_schedule(80, seed=3)
+    occupancy = build_day_occupancy(df, assistants=ASSISTANTS)
+    rng = random.Random(11)
+    for step in range(60):
+        i = rng.randrange(len(df))
+        action = rng.choice(["move", "cancel", "reassign", "add", "drop"])
+        if action == "move":
+            shift = rng.choice([-30, 15, 45])
+            df.loc[i, ["In_min", "Out_min"]] = df.loc[i, ["In_min", "Out_min"]] + shift
+        elif action == "cancel":
+            df.loc[i, "STATUS"] = "CANCELLED"
+        elif action == "reassign":
+            df.loc[i, "FIRST"] = rng.choice(ASSISTANTS)
+        elif action == "add":
+            row = df.iloc[[i]].copy()
+            row["REMINDER_ROW_ID"] = f"new-{step}"
+            row["STATUS"] = "WAITING"
+            df = pd.concat([df, row], ignore_index=True)
+        else:
+            df = df.drop(index=i).reset_index(drop=True)
+        assert occupancy.sync(df) <= 1
+        fresh = build_day_occupancy(df, assistants=ASSISTANTS)
+        for kind in ["assistant", "op", "doctor"]:
+            for name in fresh.names[kind]:
+                mine = occupancy.counts[kind][occupancy.row(kind, name, create=False)]
+                assert np.array_equal(mine, fresh.counts[kind][fresh.row(kind, name, create=False)]), (kind, name)
+
+
+def test_add_move_remove_and_unavailability():
+    occupancy = DayOccupancy(assistants=["ANYA", "ROHINI"])
+    occupancy.add("a", 600, 630, ["ANYA"], op="OP 1", doctor="DR.NIMAI")
+    assert occupancy.busy_in_window("assistant", ["ANYA", "ROHINI"], 610, 620).tolist() == [True, False]
+    assert occupancy.busy_in_window("op", ["op 1"], 630, 640).tolist() == [False]
+
+    occupancy.move("a", 700, 730)
+    assert occupancy.busy_in_window("assistant", ["ANYA"], 600, 630).tolist() == [False]
+    assert occupancy.busy_in_window("doctor", ["DR.NIMAI"], 720, 725).tolist() == [True]
+
+    occupancy.remove("a")
+    assert not occupancy.counts["assistant"].any() and not occupancy.counts["op"].any()
+
+    occupancy.set_unavailable(off_assistants=["ROHINI"], blocks=[("ANYA", 780, 840)])
+    assert occupancy.busy_in_window("assistant", ["ANYA", "ROHINI", "NOBODY"], 800, 810).tolist() == [True, True, False]
+    heat = occupancy.heatmap("assistant", 13 * 60, 14 * 60)
+    assert list(heat.index) == ["ANYA", "ROHINI"] and heat.shape == (2, 12)
+    assert (heat.loc["ROHINI"] == -1).all() and heat.loc["ANYA", "13:30"] == -1
+
+
+
+def test_doctor_spellings_share_one_row():
+    aliases = {"DR.HUSAIN": "DR.HUSSAIN", "HUSSAIN": "DR.HUSSAIN"}
+    df = pd.DataFrame([
+        {"REMINDER_ROW_ID": "a", "In_min": 600, "Out_min": 630, "DR.": "Dr.Husain", "STATUS": "WAITING"},
+        {"REMINDER_ROW_ID": "b", "In_min": 660, "Out_min": 690, "DR.": "HUSSAIN", "STATUS": "WAITING"},
+    ])
+    occupancy = build_day_occupancy(df, doctors=["DR.HUSSAIN"], normalizers={"doctor": lambda n: aliases.get(n, n)})
+    assert occupancy.names["doctor"] == ["DR.HUSSAIN"]
+    assert occupancy.busy_in_window("doctor", ["DR.HUSSAIN", "DR.HUSAIN"], 610, 620).tolist() == [True, True]
+    windows = find_free_windows(occupancy, 30, doctor="DR.HUSSAIN", n_assistants=0, start_min=600, end_min=720, limit=5)
+    assert [w["start_min"] for w in windows] == [630, 690]
+    # Re-syncing the same schedule changes nothing
+    assert occupancy.sync(df) == 0
+
+def _brute_force_windows(occupancy, duration, doctor, assistants, need, ops, start, end, limit):
+    def free(kind, name, a, b):
+        return not occupancy.busy_in_window(kind, [name], a, b)[0]
+
+    found, t = [], -(-start // 5) * 5
+    while t + duration <= end and len(found) < limit:
+        ok_doctor = free("doctor", doctor, t, t + duration)
+        chairs = [o for o in ops if free("op", o, t, t + duration)]
+        helpers = [a for a in assistants if free("assistant", a, t, t + duration)]
+        if ok_doctor and chairs and len(helpers) >= need:
+            found.append((t, helpers, chairs))
+            t += -(-duration // 5) * 5
+        else:
+            t += 5
+    return found
+
+
+def test_free_window_finder_matches_brute_force():
+    df = _make_schedule(150, seed=21)
+    occupancy = build_day_occupancy(df, assistants=ASSISTANTS)
+    occupancy.set_unavailable(off_assistants=["RAJA"], blocks=[("ANYA", 12 * 60, 14 * 60)])
+    ops = ["OP 1", "OP 2", "OP 3"]
+    for duration, need in [(30, 1), (45, 2), (20, 0), (90, 3)]:
+        got = find_free_windows(occupancy, duration, "DR.NIMAI", ASSISTANTS, need, ops, 8 * 60 + 2, 21 * 60, limit=6)
+        expected = _brute_force_windows(occupancy, duration, "DR.NIMAI", ASSISTANTS, need, ops, 8 * 60 + 2, 21 * 60, 6)
+        assert [(w["start_min"], w["assistants"] if need else [], w["ops"]) for w in got] == [
+            (t, helpers if need else [], chairs) for t, helpers, chairs in expected
+        ]
+        for w in got:
+            assert w["end_min"] - w["start_min"] == duration
+
+    empty = DayOccupancy(assistants=["ANYA"])
+    assert find_free_windows(empty, 30, "DR.X", ["ANYA"], 1, start_min=600, end_min=660, limit=5) == [
+        {"start_min": 600, "end_min": 630, "assistants": ["ANYA"], "ops": []},
+        {"start_min": 630, "end_min": 660, "assistants": ["ANYA"], "ops": []},
+    ]
+    assert find_free_windows(empty, 30, "DR.X", ["ANYA"], 2, start_min=600, end_min=660) == []
+
+
+if __name__ == "__main__":
+    test_window_probe_is_conservative_and_exact_on_slot_boundaries()
+    test_incremental_sync_matches_fresh_build()
+    test_add_move_remove_and_unavailability()
+    test_doctor_spellings_share_one_row()
+    test_free_window_finder_matches_brute_force()
+    print("✅ occupancy tests passed")
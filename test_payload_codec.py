@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests and benchmark for the columnar schedule payload.
+
+A format-2 payload must load into exactly the frame the row-dict format
+gives, and on a realistic clinic day it must be smaller on the wire. Load
+times vary from run to run, so they are only measured by the benchmark:
+run this file directly to print it.
+"""
+
+import json
+import random
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from payload_codec import (
+    encode_payload,
+    frame_from_payload,
+    normalize_payload_format,
+    payload_version,
+    records_from_payload,
+)
+from schedule_diff import records_from_df
+
+EXPECTED = [
+    "Patient ID", "Patient Name", "In Time", "Out Time", "Procedure", "DR.",
+    "FIRST", "SECOND", "Third", "CASE PAPER", "OP",
+    "SUCTION", "CLEANING", "STATUS", "REMINDER_ROW_ID",
+    "REMINDER_SNOOZE_UNTIL", "REMINDER_DISMISSED",
+    "STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT", "STATUS_LOG",
+]
+
+
+def _clinic_day(n: int, seed: int) -> pd.DataFrame:
+    """A day shaped like the real sheet: few doctors/assistants/chairs, many patients."""
+    rng = random.Random(seed)
+    doctors = ["DR.NIMAI", "DR.HUSSAIN", "DR.SHRUTI", "DR.KAUSHIK", "DR.PRIYA"]
+    assistants = ["ANYA", "ROHINI", "MEERA", "SONAL", "KIRAN", "JYOTI", "POOJA", ""]
+    procedures = ["RCT", "SCALING", "EXTRACTION", "CROWN PREP", "CONSULTATION", "FILLING", "IMPLANT"]
+    statuses = ["WAITING", "ARRIVED", "ON GOING", "DONE", "CANCELLED"]
+    rows = []
+    for i in range(n):
+        start = rng.randrange(9 * 60, 19 * 60, 15)
+        status = rng.choice(statuses)
+        log = [{"at": f"2026-01-05T{start // 60:02d}:{start % 60:02d}:00+05:30", "from": "WAITING", "to": status}]
+        rows.append({
+            "Patient ID": f"TDB{10000 + seed * 1000 + i}",
+            "Patient Name": f"Patient {seed}-{i}",
+            "In Time": f"{start // 60:02d}:{start % 60:02d}",
+            "Out Time": f"{(start + 45) // 60:02d}:{(start + 45) % 60:02d}",
+            "Procedure": rng.choice(procedures),
+            "DR.": rng.choice(doctors),
+            "FIRST": rng.choice(assistants),
+            "SECOND": rng.choice(assistants),
+            "Third": rng.choice(["", "", "", "MEERA"]),
+            "CASE PAPER": rng.choice(["", "ANYA", "ROHINI"]),
+            "OP": f"OP {rng.randrange(1, 6)}",
+            "SUCTION": rng.random() < 0.5,
+            "CLEANING": rng.random() < 0.5,
+            "STATUS": status,
+            "REMINDER_ROW_ID": f"{seed:04d}-{i:04d}-row",
+            "REMINDER_SNOOZE_UNTIL": 1_767_600_000 if i == 0 else "",
+            "REMINDER_DISMISSED": False,
+            "STATUS_CHANGED_AT": log[0]["at"] if status != "WAITING" else "",
+            "ACTUAL_START_AT": "",
+            "ACTUAL_END_AT": "",
+            "STATUS_LOG": json.dumps(log),
+        })
+    return pd.DataFrame(rows, columns=EXPECTED)
+
+
+def _wire(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _best_parse_seconds(body: bytes, repeat: int = 15) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        frame_from_payload(json.loads(body), EXPECTED)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark(sizes=(40, 120, 300)) -> list[dict]:
+    results = []
+    for n in sizes:
+        df = _clinic_day(n, seed=n)
+        records = records_from_df(df)
+        legacy = _wire(encode_payload(list(df.columns), records, {"time_blocks": []}, "rows"))
+        columnar = _wire(encode_payload(list(df.columns), records, {"time_blocks": []}, "columnar"))
+        results.append({
+            "rows": n,
+            "legacy_bytes": len(legacy),
+            "columnar_bytes": len(columnar),
+            "legacy_parse_ms": _best_parse_seconds(legacy) * 1000,
+            "columnar_parse_ms": _best_parse_seconds(columnar) * 1000,
+        })
+    return results
+
+
+def test_columnar_round_trip_matches_row_format():
+    for n in (0, 1, 3, 25):
+        df = _clinic_day(n, seed=7)
+        records = records_from_df(df)
+        legacy = json.loads(_wire(encode_payload(list(df.columns), records, None, "rows")))
+        columnar = json.loads(_wire(encode_payload(list(df.columns), records, None)))
+        assert payload_version(legacy) == 1 and payload_version(columnar) == 2
+        pd.testing.assert_frame_equal(frame_from_payload(columnar, EXPECTED), frame_from_payload(legacy, EXPECTED))
+        assert records_from_payload(columnar) == records_from_payload(legacy) == records
+
+
+def test_dictionary_keeps_bools_and_numbers_apart():
+    records = [{"OP": v, "STATUS": "WAITING"} for v in (True, 1, 1.0, True, 1, True, "1", True)]
+    payload = encode_payload(["OP", "STATUS"], records, {"time_blocks": []})
+    assert isinstance(payload["data"]["OP"], dict) and payload["meta"] == {"time_blocks": []}
+    decoded = records_from_payload(json.loads(_wire(payload)))
+    assert [type(r["OP"]) for r in decoded] == [type(r["OP"]) for r in records]
+
+    # Older payloads with columns missing from the expected list are backfilled
+    frame = frame_from_payload({"format": 2, "columns": ["OP"], "n": 2, "data": {"OP": ["OP 1", "OP 2"]}}, ["OP", "STATUS"])
+    assert list(frame.columns) == ["OP", "STATUS"] and frame["STATUS"].tolist() == ["", ""]
+    assert normalize_payload_format("ROWS") == "rows" and normalize_payload_format(None) == "columnar"
+
+
+def test_columnar_payload_is_smaller():
+    df = _clinic_day(120, seed=120)
+    records = records_from_df(df)
+    legacy = _wire(encode_payload(list(df.columns), records, {"time_blocks": []}, "rows"))
+    columnar = _wire(encode_payload(list(df.columns), records, {"time_blocks": []}, "columnar"))
+    assert len(columnar) * 2 < len(legacy), (len(columnar), len(legacy))
+
+
+if __name__ == "__main__":
+    test_columnar_round_trip_matches_row_format()
+    test_dictionary_keeps_bools_and_numbers_apart()
+    test_columnar_payload_is_smaller()
+    print(f"{'rows':>5} {'row-dict KB':>12} {'columnar KB':>12} {'row-dict ms':>12} {'columnar ms':>12}")
+    for r in benchmark():
+        print(
+            f"{r['rows']:>5} {r['legacy_bytes'] / 1024:>12.1f} {r['columnar_bytes'] / 1024:>12.1f}"
+            f" {r['legacy_parse_ms']:>12.2f} {r['columnar_parse_ms']:>12.2f}"
+        )
+    print("✅ payload codec tests passed")
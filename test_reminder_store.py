@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the keyed reminder store.
+
+A snooze must be a single small write keyed by row ID (never the schedule),
+every backend must hand the same state back on load (for just the row IDs
+asked for) and forget row IDs after the retention period.
+"""
+
+import re
+import tempfile
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from reminder_store import GSheetsReminderStore, JsonFileReminderStore, ReminderState, SupabaseReminderStore
+from test_supabase_store import FakeSupabase
+
+
+class _FakeWorksheet:
+    id = 7
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.values: list[list[str]] = []
+
+    def get_all_values(self):
+        self.spreadsheet.calls.append("get_all_values")
+        return [list(v) for v in self.values]
+
+    def col_values(self, col):
+        self.spreadsheet.calls.append("col_values")
+        cells = [v[col - 1] if col <= len(v) else "" for v in self.values]
+        while cells and cells[-1] == "":
+            cells.pop()
+        return cells
+
+    def batch_get(self, ranges):
+        self.spreadsheet.calls.append(("batch_get", tuple(ranges)))
+        blocks = []
+        for a1 in ranges:
+            start, end = (int(re.sub(r"^[A-Z]+", "", cell)) for cell in a1.split(":"))
+            blocks.append([list(line) for line in self.values[start - 1:end]])
+        return blocks
+
+    def update(self, range_name, rows):
+        self.spreadsheet.calls.append(("update", range_name))
+        n = int(range_name.split(":")[0][1:])
+        while len(self.values) < n:
+            self.values.append(["", "", ""])
+        self.values[n - 1] = list(rows[0])
+
+    def append_row(self, line, value_input_option=None):
+        self.spreadsheet.calls.append("append_row")
+        self.values.append(list(line))
+        n = len(self.values)
+        return {"updates": {"updatedRange": f"Reminders!A{n}:C{n}"}}
+
+
+class _FakeSpreadsheet:
+    def __init__(self):
+        self.sheets: dict[str, _FakeWorksheet] = {}
+        self.calls: list = []
+
+    def worksheet(self, title):
+        if title not in self.sheets:
+            raise KeyError(title)
+        return self.sheets[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.calls.append("add_worksheet")
+        self.sheets[title] = _FakeWorksheet(self)
+        return self.sheets[title]
+
+    def batch_update(self, body):
+        self.calls.append("batch_update")
+        for request in body["requests"]:
+            span = request["deleteDimension"]["range"]
+            for sheet in self.sheets.values():
+                if sheet.id == span["sheetId"]:
+                    del sheet.values[span["startIndex"]:span["endIndex"]]
+
+
+def test_supabase_snooze_is_one_keyed_upsert():
+    now = [1_700_000_000.0]
+    client = FakeSupabase()
+    store = SupabaseReminderStore(client, "main", clock=lambda: now[0])
+    store.set("id-1", 1_700_000_030, False)
+    store.set("id-1", 1_700_000_060, False)
+    store.set("id-2", None, True)
+    # One upsert per snooze, plus the first prune
+    assert [op for _, op, _ in client.calls] == ["upsert", "delete", "upsert", "upsert"]
+    assert all(table == "tdb_reminder_state" for table, _, _ in client.calls) and "tdb_allotment_state" not in client.tables
+    assert store.load() == {"id-1": ReminderState(1_700_000_060, False), "id-2": ReminderState(None, True)}
+    assert store.load(["id-2", "id-9"]) == {"id-2": ReminderState(None, True)}
+    assert SupabaseReminderStore(client, "other").load() == {}
+
+    # Loading no IDs asks for nothing; long ID lists are split across requests
+    client.calls.clear()
+    assert store.load([]) == {} and client.calls == []
+    assert len(store.load(f"id-{i}" for i in range(250))) == 2 and len(client.calls) == 3
+
+    # Row IDs not set for the retention period are deleted by the next prune (at most hourly)
+    now[0] += 3 * 86400
+    store.set("id-3", None, True)
+    assert set(store.load()) == {"id-3"}
+
+
+def test_gsheets_store_updates_one_line():
+    now = [1_700_000_000.0]
+    spreadsheet = _FakeSpreadsheet()
+    store = GSheetsReminderStore(spreadsheet, clock=lambda: now[0])
+    assert store.load() == {} and "add_worksheet" not in spreadsheet.calls
+
+    store.set("id-1", 1_700_000_030, False)
+    store.set("id-2", None, True)
+    store.set("id-1", 1_700_000_060, False)
+    assert spreadsheet.calls.count("append_row") == 2
+    assert spreadsheet.calls[-1] == ("update", "A2:D2")
+
+    fresh = GSheetsReminderStore(spreadsheet)
+    assert fresh.load() == {"id-1": ReminderState(1_700_000_060, False), "id-2": ReminderState(None, True)}
+
+    # Only the requested lines are read: the ID column, then their cells
+    spreadsheet.calls.clear()
+    assert fresh.load(["id-2", "id-9"]) == {"id-2": ReminderState(None, True)}
+    assert spreadsheet.calls == ["col_values", ("batch_get", ("A3:C3",))]
+    assert fresh.load(["id-9"]) == {} and spreadsheet.calls[-1] == "col_values"
+
+    # Stale lines (and ones without a time) are deleted bottom up in one request
+    spreadsheet.sheets["Reminders"].values.insert(1, ["legacy", "", "TRUE"])
+    now[0] += 3 * 86400
+    store.set("id-2", None, False)
+    assert spreadsheet.calls.count("batch_update") == 1
+    assert store.load() == {"id-2": ReminderState(None, False)}
+    store.set("id-4", None, True)
+    assert spreadsheet.calls.count("batch_update") == 1  # not again within the hour
+    assert [line[0] for line in spreadsheet.sheets["Reminders"].values] == ["row_id", "id-2", "id-4"]
+
+
+def test_file_store_round_trips_and_prunes():
+    now = [1_700_000_000.0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Putt Allotment.reminders.json")
+        store = JsonFileReminderStore(path, retention_seconds=3600, clock=lambda: now[0])
+        assert store.load() == {}
+        store.set("id-1", 1_700_000_030, False)
+        store.set("id-2", None, True)
+        assert JsonFileReminderStore(path).load() == {
+            "id-1": ReminderState(1_700_000_030, False),
+            "id-2": ReminderState(None, True),
+        }
+        assert store.load({"id-2"}) == {"id-2": ReminderState(None, True)}
+        now[0] += 7200
+        store.set("id-3", None, True)
+        assert set(store.load()) == {"id-3"}
+        assert os.listdir(tmp) == ["Putt Allotment.reminders.json"]
+
+
+if __name__ == "__main__":
+    test_supabase_snooze_is_one_keyed_upsert()
+    test_gsheets_store_updates_one_line()
+    test_file_store_round_trips_and_prunes()
+    print("✅ reminder store tests passed")
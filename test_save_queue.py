@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind save queue.
+
+A burst of submits must end up as one write of the newest item, flush() must
+write immediately, and a failed write must keep the item for a retry
+(merged with any newer one when the queue combines items).
+"""
+
+import threading
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from save_queue import WriteBehindQueue
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_burst_is_coalesced_into_one_write():
+    written = []
+    queue = WriteBehindQueue(lambda item: written.append(item) or True, delay=0.05)
+    for i in range(10):
+        queue.submit({"version": i})
+    assert queue.status() == "pending" and queue.pending_item() == {"version": 9}
+    assert _wait_until(lambda: queue.status() == "flushed")
+    assert written == [{"version": 9}]
+    assert (queue.submitted, queue.coalesced, queue.written) == (10, 9, 1)
+    assert queue.pending_item() is None and not queue.busy
+
+
+def test_flush_writes_now_and_waits_for_in_flight_write():
+    release = threading.Event()
+    written = []
+
+    def slow_write(item):
+        if item == "first":
+            release.wait(2)
+        written.append(item)
+        return True
+
+    queue = WriteBehindQueue(slow_write, delay=0.0)
+    queue.submit("first")
+    assert _wait_until(lambda: queue.status() == "flushing")
+    assert queue.pending_item() == "first"
+    queue.delay = 60  # the worker would wait a minute; flush must not
+    queue.submit("second")
+    threading.Timer(0.05, release.set).start()
+    assert queue.flush()
+    assert written == ["first", "second"] and not queue.busy
+
+
+def test_failed_write_is_kept_for_retry():
+    attempts = []
+
+    def flaky_write(item):
+        attempts.append(item)
+        if len(attempts) == 1:
+            raise ConnectionError("timed out")
+        return True
+
+    queue = WriteBehindQueue(flaky_write, delay=0.01)
+    queue.submit("a")
+    assert _wait_until(lambda: queue.status() == "failed")
+    assert "timed out" in queue.last_error and queue.pending_item() == "a"
+    time.sleep(0.05)
+    assert attempts == ["a"]  # no hot retry loop
+    assert queue.flush()
+    assert attempts == ["a", "a"] and queue.status() == "flushed" and queue.failures == 1
+
+
+def test_combine_keeps_what_replaced_items_carried():
+    attempts = []
+
+    def write(item):
+        attempts.append(item)
+        if len(attempts) == 1:
+            raise ConnectionError("timed out")
+        return True
+
+    queue = WriteBehindQueue(write, delay=60, combine=lambda older, newer: (newer[0], older[1] + newer[1]))
+    queue.submit(("v1", ["a"]))
+    queue.submit(("v2", ["b"]))
+    assert queue.pending_item() == ("v2", ["a", "b"])
+    assert not queue.flush()
+
+    # The failed item stays queued and the next save is merged into it
+    queue.submit(("v3", ["c"]))
+    assert queue.flush()
+    assert attempts == [("v2", ["a", "b"]), ("v3", ["a", "b", "c"])]
+
+
+if __name__ == "__main__":
+    test_burst_is_coalesced_into_one_write()
+    test_flush_writes_now_and_waits_for_in_flight_write()
+    test_failed_write_is_kept_for_retry()
+    test_combine_keeps_what_replaced_items_carried()
+    print("✅ save queue tests passed")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the snapshot diff used by save_data.
+
+Applying a changeset to the previous records must reproduce the outgoing
+frame exactly, and a one-cell edit must cost a tiny fraction of a full write.
+"""
+
+import json
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from schedule_diff import diff_frame, records_from_df, take_snapshot
+
+COLUMNS = ["Patient Name", "In Time", "DR.", "FIRST", "SECOND", "STATUS", "REMINDER_ROW_ID", "STATUS_LOG"]
+
+
+def _schedule(n: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame([
+        {"Patient Name": f"Patient {i}", "In Time": f"{rng.randrange(9, 20):02d}:{rng.choice(['00', '30'])}",
+         "DR.": rng.choice(["DR.NIMAI", "DR.HUSSAIN"]), "FIRST": rng.choice(["ANYA", "ROHINI", ""]),
+         "SECOND": None, "STATUS": "WAITING", "REMINDER_ROW_ID": f"id-{seed}-{i}", "STATUS_LOG": "[]"}
+        for i in range(n)
+    ], columns=COLUMNS)
+
+
+def _apply(previous_records: dict, previous_keys: list, changes) -> list[dict]:
+    """Replay a changeset the way a keyed backend would."""
+    store = {k: dict(previous_records[k]) for k in previous_keys}
+    for key in changes.deleted:
+        del store[key]
+    for change in changes.updated:
+        store[change.key].update(change.values)
+    for change in changes.inserted:
+        store[change.key] = dict(change.values)
+    position = {k: i for i, k in enumerate(previous_keys)}
+    for change in changes.inserted + changes.moved:
+        position[change.key] = change.position
+    return [store[k] for k in sorted(store, key=lambda k: position[k])]
+
+
+def test_replaying_changesets_reproduces_the_frame():
+    rng = random.Random(5)
+    df = _schedule(40, seed=1)
+    snapshot = take_snapshot(df)
+    for step in range(150):
+        df = df.copy()
+        action = rng.choice(["edit", "edit", "edit", "insert", "delete", "noop"])
+        if action == "edit":
+            i = rng.randrange(len(df))
+            df.loc[df.index[i], rng.choice(["STATUS", "FIRST", "SECOND", "In Time"])] = f"v{step}"
+        elif action == "insert":
+            row = _schedule(1, seed=1000 + step)
+            at = rng.randrange(len(df) + 1)
+            df = pd.concat([df.iloc[:at], row, df.iloc[at:]], ignore_index=True)
+        elif action == "delete" and len(df) > 1:
+            df = df.drop(index=df.index[rng.randrange(len(df))]).reset_index(drop=True)
+
+        changes, new_snapshot = diff_frame(snapshot, df)
+        assert _apply(snapshot.records, snapshot.keys, changes) == records_from_df(df), step
+        if action == "noop":
+            assert changes.is_empty
+        if action == "edit":
+            assert changes.only_updates and len(changes.updated) <= 1
+            assert all(len(c.values) == 1 for c in changes.updated)
+        snapshot = new_snapshot
+
+
+def test_changeset_size_tracks_the_edit():
+    df = _schedule(120, seed=2)
+    snapshot = take_snapshot(df, {"time_blocks": []})
+    full_bytes = len(json.dumps(records_from_df(df)).encode("utf-8"))
+    df.loc[7, "STATUS"] = "ARRIVED"
+    changes, _ = diff_frame(snapshot, df, {"time_blocks": [], "time_blocks_updated_at": "2026-01-05T10:00"})
+    assert changes.only_updates and not changes.meta_changed
+    assert [(c.key, c.values) for c in changes.updated] == [("id-2-7", {"STATUS": "ARRIVED"})]
+    assert changes.payload_bytes() * 50 < full_bytes
+
+    changes, _ = diff_frame(snapshot, df.assign(NOTES=""), {"time_blocks": []})
+    assert changes.columns_changed and not changes.only_updates
+
+    changes, current = diff_frame(None, df)
+    assert changes.full and len(changes.inserted) == len(df) and current.keys_are_ids
+    df.loc[3, "REMINDER_ROW_ID"] = ""
+    assert not take_snapshot(df).keys_are_ids
+
+
+if __name__ == "__main__":
+    test_replaying_changesets_reproduces_the_frame()
+    test_changeset_size_tracks_the_edit()
+    print("✅ schedule diff tests passed")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-assistant schedule index.
+
+The index must answer exactly like the original row-by-row scans it replaced,
+so those scans are kept here as reference implementations.
+"""
+
+import random
+import sys
+import os
+from datetime import time as time_type
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from schedule_index import build_schedule_index, build_time_block_index, schedule_data_version, time_blocks_signature
+
+ASSISTANTS = ["ANSHIKA", "ARCHANA", "RAJA", "NITIN", "ANYA", "ROHINI"]
+STATUSES = ["WAITING", "ARRIVED", "ON GOING", "DONE", "CANCELLED", "PENDING", ""]
+
+
+def _make_schedule(n_rows: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        start = rng.randrange(8 * 60, 20 * 60, 5)
+        end = start + rng.choice([15, 30, 45, 60, 90])
+        in_min = None if rng.random() < 0.05 else start
+        out_min = None if rng.random() < 0.05 else end % 1440
+        rows.append({
+            "REMINDER_ROW_ID": f"row-{i}",
+            "Patient Name": f"Patient {i}",
+            "In Time": in_min,
+            "Out Time": out_min,
+            "DR.": "DR.HUSSAIN",
+            "OP": f"OP {rng.randint(1, 4)}",
+            "FIRST": rng.choice(ASSISTANTS + [""]),
+            "SECOND": rng.choice(ASSISTANTS + ["", " anya "]),
+            "Third": rng.choice(["", ""] + ASSISTANTS),
+            "STATUS": rng.choice(STATUSES),
+        })
+    df = pd.DataFrame(rows)
+    df["In_min"] = df["In Time"].astype("Int64")
+    df["Out_min"] = df["Out Time"].astype("Int64")
+    df.loc[df["Out_min"] < df["In_min"], "Out_min"] += 1440
+    return df
+
+
+def _legacy_schedule(name: str, df: pd.DataFrame) -> list[dict]:
+    out = []
+    for _, row in df.iterrows():
+        for col in ["FIRST", "SECOND", "Third"]:
+            if str(row.get(col, "")).strip().upper() != name:
+                continue
+            status = str(row.get("STATUS", "")).strip().upper()
+            if any(s in status for s in ["CANCELLED", "DONE", "COMPLETED", "SHIFTED"]):
+                continue
+            out.append({"row_id": row["REMINDER_ROW_ID"], "role": col, "status": status,
+                        "in": row["In_min"], "out": row["Out_min"]})
+    return out
+
+
+def _legacy_conflict(schedule, start, end, exclude=None):
+    for appt in schedule:
+        if exclude and appt["row_id"] == exclude:
+            continue
+        if pd.isna(appt["in"]) or pd.isna(appt["out"]):
+            continue
+        if not (end <= appt["in"] or start >= appt["out"]):
+            return appt["row_id"]
+    return None
+
+
+def _legacy_current(schedule, minute):
+    for appt in schedule:
+        status = appt["status"]
+        if "ON GOING" in status or "ONGOING" in status:
+            return appt["row_id"]
+        untimed = pd.isna(appt["in"]) or pd.isna(appt["out"])
+        if untimed and "ARRIVED" in status:
+            return appt["row_id"]
+        if untimed:
+            continue
+        if appt["in"] <= minute <= appt["out"]:
+            return appt["row_id"]
+    return None
+
+
+def test_schedule_for_matches_row_scan():
+    df = _make_schedule(200, seed=1)
+    index = build_schedule_index(df)
+    for name in ASSISTANTS:
+        got = [(a["row_id"], a["role"], a["status"]) for a in index.schedule_for(name)]
+        expected = [(a["row_id"], a["role"], a["status"]) for a in _legacy_schedule(name, df)]
+        assert got == expected, name
+        assert index.count(name) == len(expected)
+
+
+def test_conflicts_and_current_match_row_scan():
+    df = _make_schedule(150, seed=7)
+    index = build_schedule_index(df)
+    legacy = {name: _legacy_schedule(name, df) for name in ASSISTANTS}
+    rng = random.Random(3)
+    for _ in range(400):
+        name = rng.choice(ASSISTANTS)
+        start = rng.randrange(7 * 60, 21 * 60)
+        end = start + rng.choice([10, 30, 60])
+        exclude = f"row-{rng.randrange(150)}" if rng.random() < 0.3 else None
+        hit = index.first_conflict(name, start, end, exclude)
+        assert (hit["row_id"] if hit else None) == _legacy_conflict(legacy[name], start, end, exclude)
+
+        current = index.current_appointment(name, start)
+        assert (current["row_id"] if current else None) == _legacy_current(legacy[name], start)
+
+
+def test_unknown_assistant_and_empty_schedule():
+    index = build_schedule_index(pd.DataFrame())
+    assert index.schedule_for("ANYA") == []
+    assert index.first_conflict("ANYA", 600, 660) is None
+    assert index.current_appointment("ANYA", 600) is None
+
+
+def test_data_version_tracks_content():
+    df = _make_schedule(20, seed=2)
+    v1 = schedule_data_version(df)
+    assert v1 == schedule_data_version(df.copy())
+    df.loc[0, "FIRST"] = "SOMEONE ELSE"
+    assert schedule_data_version(df) != v1
+
+
+def _make_blocks(n_blocks: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(n_blocks):
+        start = rng.randrange(8 * 60, 20 * 60, 5)
+        end = start + rng.choice([10, 30, 60, 120])
+        blocks.append({
+            "assistant": rng.choice(ASSISTANTS),
+            "date": rng.choice(["2024-05-01", "2024-05-02", "2024-04-30"]),
+            "start_time": time_type(start // 60, start % 60),
+            "end_time": time_type((end // 60) % 24, end % 60),
+            "reason": rng.choice(["Lunch", "Backend Work", "Lab"]),
+        })
+    return blocks
+
+
+def _block_minutes(t):
+    return None if t is None else t.hour * 60 + t.minute
+
+
+def test_time_block_index_matches_list_walk():
+    blocks = _make_blocks(150, seed=9)
+    index = build_time_block_index(blocks, _block_minutes)
+    for date in ["2024-05-01", "2024-05-02", "2099-01-01"]:
+        for name in ASSISTANTS + ["NOBODY"]:
+            for minute in range(7 * 60, 22 * 60, 7):
+                expected = None
+                for b in blocks:
+                    if b["date"] == date and b["assistant"] == name:
+                        start, end = _block_minutes(b["start_time"]), _block_minutes(b["end_time"])
+                        if end < start:
+                            end += 1440
+                        if start <= minute <= end:
+                            expected = b["reason"]
+                            break
+                assert index.blocked_at(date, name.lower(), minute) == expected
+
+                window_end = minute + 25
+                expected = None
+                for b in blocks:
+                    if b["date"] == date and b["assistant"] == name:
+                        start, end = _block_minutes(b["start_time"]), _block_minutes(b["end_time"])
+                        if end < start:
+                            end += 1440
+                        if not (window_end <= start or minute >= end):
+                            expected = b["reason"]
+                            break
+                assert index.first_overlap(date, name, minute, window_end) == expected
+
+    assert index.signature == time_blocks_signature([dict(b) for b in blocks])
+    assert index.signature != time_blocks_signature(blocks[1:])
+    # In-place edits keeping the same list and length still change the signature
+    blocks.append(dict(blocks.pop(0), reason="Moved"))
+    assert index.signature != time_blocks_signature(blocks)
+    before = time_blocks_signature(blocks)
+    blocks[0]["reason"] = "Edited"
+    assert time_blocks_signature(blocks) != before
+
+
+def test_next_transition_bounds_status_changes():
+    df = _make_schedule(200, seed=4)
+    index = build_schedule_index(df, to_minutes=lambda v: None if pd.isna(v) else int(v))
+    blocks = build_time_block_index(_make_blocks(40, seed=2), _block_minutes)
+    names = ASSISTANTS + ["NOBODY"]
+
+    def snapshot(minute):
+        appts = [tuple(sorted(int(index.intervals(n).row_pos[j]) for j in index.intervals(n).covering(minute))) for n in names]
+        return appts, [blocks.blocked_at("2024-05-01", n, minute) for n in names]
+
+    minute = 7 * 60
+    while minute < 22 * 60:
+        nxt = min(
+            [b for b in (index.next_transition(names, minute), blocks.next_transition("2024-05-01", names, minute)) if b is not None],
+            default=None,
+        )
+        stop = 22 * 60 if nxt is None else nxt
+        assert stop > minute
+        before = snapshot(minute)
+        for m in range(minute + 1, min(stop, 22 * 60)):
+            assert snapshot(m) == before, (minute, m)
+        minute = stop
+
+
+if __name__ == "__main__":
+    test_schedule_for_matches_row_scan()
+    test_conflicts_and_current_match_row_scan()
+    test_unknown_assistant_and_empty_schedule()
+    test_data_version_tracks_content()
+    test_time_block_index_matches_list_walk()
+    test_next_transition_bounds_status_changes()
+    print("✅ schedule index tests passed")
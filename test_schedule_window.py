@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the live time window and day partitioning.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+
+import pandas as pd
+
+from schedule_window import (
+    day_mask,
+    in_minutes,
+    live_window_mask,
+    normalize_date,
+    partition_id,
+    split_by_day,
+    stamp_dates,
+)
+
+
+def test_normalize_date_accepts_sheet_and_excel_values():
+    assert normalize_date("2026-01-05") == "2026-01-05"
+    assert normalize_date(" 2026-01-05 00:00:00 ") == "2026-01-05"
+    assert normalize_date(datetime(2026, 1, 5, 9, 30)) == "2026-01-05"
+    assert normalize_date(date(2026, 1, 5)) == "2026-01-05"
+    assert normalize_date(pd.NaT) == normalize_date(None) == normalize_date("nan") == normalize_date("soon") == ""
+    assert in_minutes("09:30") == 570 and in_minutes("") is None
+
+
+def test_live_window_keeps_today_from_shortly_before_now():
+    df = pd.DataFrame({
+        "DATE": ["2026-01-04", "2026-01-05", "2026-01-05", "2026-01-05", "", "2026-01-06"],
+        "In_min": [600, 480, 540, 700, 480, 600],
+        "Out_min": [660, 500, 650, 760, 500, 660],
+    })
+    # 10:00: the 08:00 slot ended too long ago, the 09:00 one is still running
+    mask = live_window_mask(df, "2026-01-05", 600, lookback_min=30)
+    assert mask.tolist() == [False, False, True, True, False, False]
+    # Undated rows belong to the current day; unparsed times always stay
+    df.loc[4, "In_min"] = float("nan")
+    assert live_window_mask(df, "2026-01-05", 600).tolist()[4]
+    # Frames without a DATE column are a single day
+    assert live_window_mask(df.drop(columns=["DATE"]), "2026-01-05", 0).all()
+
+
+def test_split_by_day_moves_only_past_dates():
+    records = [{"DATE": "2026-01-03"}, {"DATE": ""}, {"DATE": "2026-01-05"}, {"DATE": "2026-01-03"}, {}]
+    current, past = split_by_day(records, "2026-01-05")
+    assert current == [1, 2, 4] and past == {"2026-01-03": [0, 3]}
+    assert partition_id("main", "2026-01-03") == "main@2026-01-03"
+
+
+
+def test_stamp_dates_and_day_mask():
+    df = pd.DataFrame({"Patient Name": ["A", "B", "C"]})
+    assert day_mask(df, "2026-01-05").all()
+    assert stamp_dates(df, "2026-01-05") == 3 and df["DATE"].tolist() == ["2026-01-05"] * 3
+    df.loc[1, "DATE"] = "2026-01-06"
+    df.loc[2, "DATE"] = float("nan")
+    assert stamp_dates(df, "2026-01-06") == 1
+    assert df["DATE"].tolist() == ["2026-01-05", "2026-01-06", "2026-01-06"]
+    assert day_mask(df, "2026-01-06").tolist() == [False, True, True]
+    assert stamp_dates(df, "2026-01-07") == 0
+
+if __name__ == "__main__":
+    test_normalize_date_accepts_sheet_and_excel_values()
+    test_live_window_keeps_today_from_shortly_before_now()
+    test_split_by_day_moves_only_past_dates()
+    test_stamp_dates_and_day_mask()
+    print("✅ schedule window tests passed")
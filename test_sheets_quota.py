@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for the Google Sheets request budget.
+
+A fake spreadsheet enforces a per-minute quota against a fake clock and
+answers 429 past it, like the real API, so the tests can run a busy minute
+offline and check that calls wait or back off instead of failing.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sheets_quota import MeteredSpreadsheet, MeteredWorksheet, SheetsQuota, status_code
+from sheets_reader import open_handles, read_schedule
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class _APIError(Exception):
+    """Shaped like gspread.exceptions.APIError."""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = _Response(status)
+
+
+class _QuotaSpreadsheet:
+    """Answers 429 once more than `per_minute` calls arrived within a minute of the clock."""
+
+    def __init__(self, clock, per_minute=60, failures=()):
+        self.clock, self.per_minute = clock, per_minute
+        self.failures = list(failures)
+        self.served: list[float] = []
+        self.rejected = 0
+        self.sheet = _QuotaWorksheet(self)
+
+    def _serve(self):
+        if self.failures:
+            raise _APIError(self.failures.pop(0))
+        recent = [t for t in self.served if self.clock() - t < 60]
+        if len(recent) >= self.per_minute:
+            self.rejected += 1
+            raise _APIError(429)
+        self.served.append(self.clock())
+
+    def worksheets(self):
+        self._serve()
+        return [self.sheet]
+
+    def values_batch_get(self, ranges):
+        self._serve()
+        return {"valueRanges": [{"values": [["Patient Name"], ["Asha"]]}]}
+
+    def batch_update(self, body):
+        self._serve()
+        return {}
+
+
+class _QuotaWorksheet:
+    title, id, row_count = "Sheet1", 0, 100
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def col_values(self, col):
+        self.spreadsheet._serve()
+        return ["REMINDER_ROW_ID"]
+
+
+def _quota(clock, **kwargs):
+    return SheetsQuota(clock=clock, sleep=clock.sleep, jitter=lambda: 0.5, **kwargs)
+
+
+def test_budget_waits_instead_of_hitting_429():
+    clock = _Clock()
+    spreadsheet = _QuotaSpreadsheet(clock, per_minute=10)
+    quota = _quota(clock, reads_per_minute=10)
+    metered = MeteredSpreadsheet(spreadsheet, quota)
+    for _ in range(25):
+        metered.values_batch_get(["'Sheet1'"])
+    assert spreadsheet.rejected == 0 and len(spreadsheet.served) == 25
+    stats = quota.stats()
+    assert stats["calls"] == 25 and stats["retries"] == 0 and stats["throttled_waits"] == 2
+    assert clock.now == 120.0 and quota.headroom("read") == 5
+
+
+def test_rejected_calls_are_retried_with_backoff():
+    clock = _Clock()
+    spreadsheet = _QuotaSpreadsheet(clock, failures=[429, 503, 500])
+    quota = _quota(clock)
+    assert MeteredSpreadsheet(spreadsheet, quota).values_batch_get([]) is not None
+    # 1s, 2s, 4s scaled by the jitter (0.75 at jitter 0.5)
+    assert clock.slept == [0.75, 1.5, 3.0]
+    assert quota.stats()["retries"] == 3 and quota.failures == 0
+
+    # Writes are resent after a 429 only: after a 5xx the batch may already be applied
+    spreadsheet.failures = [429]
+    assert MeteredSpreadsheet(spreadsheet, quota).batch_update({"requests": []}) == {}
+
+    # Other errors, and retries past the limit, are raised
+    for failures, q in (([403], quota), ([503], quota), ([429] * 3, _quota(clock, max_retries=2))):
+        spreadsheet.failures = failures
+        try:
+            MeteredSpreadsheet(spreadsheet, q).batch_update({})
+        except _APIError:
+            pass
+        else:
+            raise AssertionError(f"{failures} should be raised")
+        assert spreadsheet.failures == []
+    assert quota.failures == 2 and quota.retries == 4
+    assert status_code(ValueError()) is None
+
+
+def test_write_delay_holds_saves_near_the_limit():
+    clock = _Clock()
+    quota = _quota(clock, writes_per_minute=10)
+    for _ in range(4):
+        quota.acquire("write")
+    assert quota.write_delay(reserve=5) == 0.0
+    clock.now = 20.0
+    quota.acquire("write")
+    quota.acquire("write")
+    # 4 free slots left: hold saves until the oldest write leaves the window
+    assert quota.write_delay(reserve=5) == 40.0
+    clock.now = 61.0
+    assert quota.write_delay(reserve=5) == 0.0
+
+
+def test_worksheets_and_their_spreadsheet_are_metered():
+    clock = _Clock()
+    spreadsheet = _QuotaSpreadsheet(clock)
+    quota = _quota(clock)
+    handles = open_handles(MeteredSpreadsheet(spreadsheet, quota))
+    assert isinstance(handles.worksheet, MeteredWorksheet)
+    assert handles.worksheet.title == "Sheet1" and handles.worksheet.row_count == 100
+    records, _ = read_schedule(handles)
+    assert records == [{"Patient Name": "Asha"}]
+    handles.worksheet.col_values(1)
+    handles.worksheet.spreadsheet.batch_update({"requests": []})
+    stats = quota.stats()
+    assert stats["reads_last_minute"] == 3 and stats["writes_last_minute"] == 1
+
+
+if __name__ == "__main__":
+    test_budget_waits_instead_of_hitting_429()
+    test_rejected_calls_are_retried_with_backoff()
+    test_write_delay_holds_saves_near_the_limit()
+    test_worksheets_and_their_spreadsheet_are_metered()
+    print("✅ sheets quota tests passed")
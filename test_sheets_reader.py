@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched Google Sheets reader.
+
+Opening must cost one metadata fetch and a load one values_batch_get for
+both sheets, and a missing Meta sheet must never be created while reading.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sheets_reader import meta_from_values, open_handles, read_schedule
+
+
+class _Sheet:
+    def __init__(self, title, values):
+        self.title, self.values = title, values
+
+
+class _FakeSpreadsheet:
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.calls: list = []
+
+    def worksheets(self):
+        self.calls.append("worksheets")
+        return list(self.sheets)
+
+    def values_batch_get(self, ranges):
+        self.calls.append(("values_batch_get", list(ranges)))
+        by_range = {"'" + s.title.replace("'", "''") + "'": s.values for s in self.sheets}
+        return {"valueRanges": [{"range": r, "values": by_range[r]} for r in ranges if by_range[r]]}
+
+    def add_worksheet(self, title, rows, cols):
+        raise AssertionError("the read path must not create sheets")
+
+
+SCHEDULE = [
+    ["Patient ID", "Patient Name", "In Time", "STATUS", "REMINDER_ROW_ID"],
+    ["1042", "Asha", "09:30", "WAITING", "r0"],
+    ["", "Ravi", "10:00"],
+]
+
+
+def test_one_call_for_schedule_and_meta():
+    spreadsheet = _FakeSpreadsheet([
+        _Sheet("Putt's Sheet", SCHEDULE),
+        _Sheet("Reminders", [["row_id"]]),
+        _Sheet("Meta", [["key", "value"], ["time_blocks", "[]"]]),
+    ])
+    handles = open_handles(spreadsheet)
+    records, meta = read_schedule(handles)
+    assert spreadsheet.calls == ["worksheets", ("values_batch_get", ["'Putt''s Sheet'", "'Meta'"])]
+    # Same shape as get_all_records(): numbers converted, short rows padded
+    assert records == [
+        {"Patient ID": 1042, "Patient Name": "Asha", "In Time": "09:30", "STATUS": "WAITING", "REMINDER_ROW_ID": "r0"},
+        {"Patient ID": "", "Patient Name": "Ravi", "In Time": "10:00", "STATUS": "", "REMINDER_ROW_ID": ""},
+    ]
+    assert meta == {"time_blocks": "[]"}
+
+    # Cached handles: later loads skip the metadata fetch
+    read_schedule(handles)
+    assert spreadsheet.calls.count("worksheets") == 1
+
+
+def test_missing_meta_and_empty_sheets():
+    spreadsheet = _FakeSpreadsheet([_Sheet("Sheet1", [])])
+    handles = open_handles(spreadsheet)
+    assert handles.meta_worksheet is None
+    assert read_schedule(handles) == ([], {})
+    assert spreadsheet.calls[-1] == ("values_batch_get", ["'Sheet1'"])
+    assert meta_from_values([["time_blocks", "[]"], ["solo"], ["", "x"]]) == {"time_blocks": "[]"}
+
+
+if __name__ == "__main__":
+    test_one_call_for_schedule_and_meta()
+    test_missing_meta_and_empty_sheets()
+    print("✅ sheets reader tests passed")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the Google Sheets cell-diff writer.
+
+A fake spreadsheet applies the batchUpdate requests to an in-memory grid,
+so the tests check both what is sent (one call, only changed cells) and that
+the sheet ends up holding exactly the saved schedule.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from schedule_diff import diff_frame, take_snapshot
+from sheets_writer import cell_text, write_changes
+
+
+class _FakeSpreadsheet:
+    def __init__(self):
+        self.sheets: dict[int, "_FakeGrid"] = {}
+        self.calls: list = []
+
+    def batch_update(self, body):
+        self.calls.append(("batch_update", [next(iter(r)) for r in body["requests"]]))
+        for request in body["requests"]:
+            (op, args), = request.items()
+            sheet = self.sheets[args.get("sheetId", args.get("range", args.get("start", {})).get("sheetId"))]
+            getattr(sheet, op)(args)
+
+
+class _FakeGrid:
+    """A worksheet as a rows x cols list of strings, edited only by batchUpdate requests."""
+
+    def __init__(self, spreadsheet, sheet_id, rows, cols, values=()):
+        self.spreadsheet, self.id = spreadsheet, sheet_id
+        self.cells = [[""] * cols for _ in range(rows)]
+        for r, line in enumerate(values):
+            self.cells[r][:len(line)] = [str(v) for v in line]
+        self._properties = {"gridProperties": {"rowCount": rows, "columnCount": cols}}
+        spreadsheet.sheets[sheet_id] = self
+
+    @property
+    def row_count(self):
+        return self._properties["gridProperties"]["rowCount"]
+
+    @property
+    def col_count(self):
+        return self._properties["gridProperties"]["columnCount"]
+
+    def col_values(self, col):
+        self.spreadsheet.calls.append("col_values")
+        values = [line[col - 1] for line in self.cells]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def values(self):
+        """Trimmed contents, like the values API returns them."""
+        lines = [list(line) for line in self.cells]
+        while lines and not any(lines[-1]):
+            lines.pop()
+        width = max((max((i + 1 for i, v in enumerate(line) if v), default=0) for line in lines), default=0)
+        return [line[:width] for line in lines]
+
+    # -- batchUpdate requests (checked against the real grid size, like the API)
+    def updateCells(self, args):
+        if "start" in args:
+            r0, c0 = args["start"]["rowIndex"], args["start"]["columnIndex"]
+            for r, row in enumerate(args["rows"]):
+                for c, cell in enumerate(row["values"]):
+                    self.cells[r0 + r][c0 + c] = cell["userEnteredValue"]["stringValue"]
+        else:
+            rng = args["range"]
+            for line in self.cells[rng["startRowIndex"]:]:
+                line[rng["startColumnIndex"]:] = [""] * (len(line) - rng["startColumnIndex"])
+
+    def insertDimension(self, args):
+        start, end = args["range"]["startIndex"], args["range"]["endIndex"]
+        assert start < len(self.cells)
+        self.cells[start:start] = [[""] * len(self.cells[0]) for _ in range(end - start)]
+
+    def deleteDimension(self, args):
+        del self.cells[args["range"]["startIndex"]:args["range"]["endIndex"]]
+
+    def appendDimension(self, args):
+        if args["dimension"] == "ROWS":
+            self.cells += [[""] * len(self.cells[0]) for _ in range(args["length"])]
+        else:
+            self.cells = [line + [""] * args["length"] for line in self.cells]
+
+
+def _schedule(ids) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"Patient Name": f"P{i}", "In Time": f"{9 + n:02d}:00", "STATUS": "WAITING", "REMINDER_ROW_ID": i}
+        for n, i in enumerate(ids)
+    ])
+
+
+def _grid(df):
+    return [list(df.columns)] + [[cell_text(v) for v in r] for r in df.fillna("").values.tolist()]
+
+
+def _setup(df, rows=10, cols=6):
+    spreadsheet = _FakeSpreadsheet()
+    sheet = _FakeGrid(spreadsheet, 1, rows, cols, _grid(df))
+    meta = _FakeGrid(spreadsheet, 2, 3, 2, [["key", "value"], ["time_blocks", "[]"]])
+    return spreadsheet, sheet, meta
+
+
+def test_status_edit_is_one_cell_in_one_call():
+    df = _schedule(["a", "b", "c"])
+    spreadsheet, sheet, meta = _setup(df)
+    snapshot = take_snapshot(df, {"time_blocks": []})
+    edited = df.copy()
+    edited.loc[1, "STATUS"] = "ARRIVED"
+    changes, _ = diff_frame(snapshot, edited, {"time_blocks": []})
+    assert write_changes(sheet, snapshot, changes, meta, {"time_blocks": []}) == 1
+    assert spreadsheet.calls == ["col_values", ("batch_update", ["updateCells"])]
+    assert sheet.values() == _grid(edited) and meta.values() == [["key", "value"], ["time_blocks", "[]"]]
+
+
+def test_inserts_and_deletes_happen_in_place():
+    df = _schedule(["a", "b", "c", "d", "e"])
+    spreadsheet, sheet, meta = _setup(df, rows=6)
+    snapshot = take_snapshot(df)
+    # Drop b and c, add x at the top, y in the middle and z past the end of the grid
+    edited = pd.concat([_schedule(["x"]), df.iloc[[0, 3]], _schedule(["y"]), df.iloc[[4]], _schedule(["z"])], ignore_index=True)
+    edited.loc[2, "STATUS"] = "DONE"
+    changes, _ = diff_frame(snapshot, edited)
+    write_changes(sheet, snapshot, changes)
+    ops = spreadsheet.calls[-1][1]
+    assert ops.count("deleteDimension") == 1 and ops.count("insertDimension") == 2 and ops.count("appendDimension") == 1
+    assert ops.count("updateCells") == 4  # three new rows and one edited cell
+    assert sheet.values() == _grid(edited)
+
+    # The next save lines up with the grid the first one left behind
+    snapshot = take_snapshot(edited)
+    trimmed = edited.iloc[1:].reset_index(drop=True)
+    changes, _ = diff_frame(snapshot, trimmed)
+    write_changes(sheet, snapshot, changes)
+    assert spreadsheet.calls[-1][1] == ["deleteDimension"] and sheet.values() == _grid(trimmed)
+
+
+def test_meta_written_only_when_it_changed():
+    df = _schedule(["a", "b"])
+    spreadsheet, sheet, meta = _setup(df)
+    snapshot = take_snapshot(df, {"time_blocks": []})
+    blocks = {"time_blocks": [{"assistant": "ANYA"}], "note": "x", "more": "y"}
+    changes, _ = diff_frame(snapshot, df, blocks)
+    assert write_changes(sheet, snapshot, changes, meta, blocks) == 3
+    assert spreadsheet.calls == [("batch_update", ["appendDimension", "updateCells", "updateCells"])]
+    assert meta.values()[1] == ["time_blocks", '[{"assistant": "ANYA"}]'] and len(meta.values()) == 4
+    assert sheet.values() == _grid(df)
+
+
+def test_unaligned_sheet_is_rewritten_without_clearing():
+    df = _schedule(["a", "b", "c", "d"])
+    spreadsheet, sheet, meta = _setup(df, cols=8)
+    snapshot = take_snapshot(df)
+
+    # Reordered rows cannot be expressed as inserts/deletes
+    reordered = df.iloc[[1, 0, 2, 3]].reset_index(drop=True)
+    changes, _ = diff_frame(snapshot, reordered)
+    write_changes(sheet, snapshot, changes)
+    assert "deleteDimension" not in spreadsheet.calls[-1][1] and sheet.values() == _grid(reordered)
+
+    # Another session removed a row since this one loaded: rewrite, blank the leftovers
+    sheet.cells[4] = [""] * 8
+    shorter = _schedule(["a", "c"])
+    changes, _ = diff_frame(take_snapshot(df), shorter)
+    write_changes(sheet, take_snapshot(df), changes)
+    assert sheet.values() == _grid(shorter)
+
+    # No snapshot at all (first save): same in-place rewrite
+    changes, _ = diff_frame(None, df)
+    write_changes(sheet, None, changes)
+    assert sheet.values() == _grid(df)
+
+
+if __name__ == "__main__":
+    test_status_edit_is_one_cell_in_one_call()
+    test_inserts_and_deletes_happen_in_place()
+    test_meta_written_only_when_it_changed()
+    test_unaligned_sheet_is_rewritten_without_clearing()
+    print("✅ sheets writer tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the staff registry.
+
+Department lookups through StaffRegistry must match the old per-call scans
+(normalised equality or suffix match, first configured name wins), and
+alias spellings must share one staff ID.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from staff_registry import StaffRegistry, norm_staff_key
+
+DEPARTMENTS = {
+    "PROSTHO": {
+        "doctors": ["DR.HUSSAIN", "DR.HUSAIN", "DR.SHIFA"],
+        "assistants": ["ARCHANA", "SHAKSHI", "RAJA", "NITIN", "ANSHIKA", "BABU", "PRAMOTH", "RESHMA"],
+    },
+    "ENDO": {
+        "doctors": ["DR.FARHATH", "DR.NIMAI", "DR.SHRUTI", "DR.KALPANA", "DR.MANVEEN", "DR.NEHA"],
+        "assistants": ["ANYA", "LAVANYA", "ROHINI", "MUKHILA", "SHAKSHI", "ARCHANA", "ANSHIKA"],
+    },
+}
+
+
+def _legacy_department(name, kind, unknown):
+    if not name:
+        return ""
+    key = norm_staff_key(name)
+    if not key:
+        return ""
+    for dept, config in DEPARTMENTS.items():
+        for n in config[kind]:
+            n_key = norm_staff_key(n)
+            if key == n_key or key.endswith(n_key) or n_key.endswith(key):
+                return dept
+    return unknown
+
+
+SPELLINGS = [
+    "DR.HUSSAIN", "DR. HUSSAIN", "dr.husain", "HUSSAIN", "Dr Nimai", "NIMAI", "DR.NEHA ", "DR.UNKNOWN",
+    "ANYA", "anya", "LAVANYA", "Vanya", "Anshika", "shakshi", "A", "ZED", "", "  ", "...", None,
+]
+
+
+def test_department_lookups_match_legacy_scan():
+    registry = StaffRegistry(DEPARTMENTS, aliases={"DR.HUSAIN": "DR.HUSSAIN"})
+    registry.observe(doctors=["DR.NEW", "dr. nimai"], assistants=["TEMP", "rohini"])
+    for name in SPELLINGS + ["DR.NEW", "TEMP"]:
+        assert registry.department_for_doctor(name) == _legacy_department(name, "doctors", ""), name
+        assert registry.department_for_assistant(name) == _legacy_department(name, "assistants", "SHARED"), name
+
+
+def test_aliases_share_one_id():
+    registry = StaffRegistry(DEPARTMENTS, aliases={"DR.HUSAIN": "DR.HUSSAIN", "DR. HUSEIN": "DR.HUSSAIN"})
+    ids = {registry.doctor_id(n) for n in ["DR.HUSSAIN", "DR. HUSSAIN", "DR.HUSAIN", "dr husein", "HUSSAIN"]}
+    assert len(ids) == 1
+    staff_id = ids.pop()
+    assert registry.name(staff_id) == "DR.HUSSAIN" and registry.department(staff_id) == "PROSTHO"
+    assert registry.assistant_id("ANYA") != registry.assistant_id("LAVANYA")
+    assert registry.assistant_id("SHAKSHI") == registry.assistant_id("shakshi")
+    assert registry.doctor_id("") is None and registry.assistant_id(None) is None
+
+    registry.observe(assistants=["TEMP", "TEMP"])
+    temp = registry.assistant_id("temp")
+    assert temp is not None and registry.name(temp) == "TEMP" and registry.department(temp) == ""
+
+
+if __name__ == "__main__":
+    test_department_lookups_match_legacy_scan()
+    test_aliases_share_one_id()
+    print("✅ staff registry tests passed")
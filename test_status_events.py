@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only status event log.
+
+A status change must become one appended event (never a rewrite of earlier
+history), stamp only the latest audit times on the row, and every backend
+must answer by row and by day.
+"""
+
+import tempfile
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from schedule_diff import take_snapshot
+from status_events import (
+    GSheetsStatusEventStore,
+    JsonLinesStatusEventStore,
+    StatusEvent,
+    SupabaseStatusEventStore,
+    legacy_events,
+    row_statuses,
+    stamp_status_changes,
+)
+from test_reminder_store import _FakeSpreadsheet, _FakeWorksheet
+from test_supabase_store import FakeSupabase
+
+AT = "2026-01-05T10:15:00+05:30"
+
+
+def _day() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Patient Name": ["A", "B", "C", "D"],
+        "STATUS": ["WAITING", "ARRIVED", "ON GOING", ""],
+        "REMINDER_ROW_ID": ["r0", "r1", "r2", ""],
+        "STATUS_CHANGED_AT": ["", "", "2026-01-05 09:40:00", ""],
+        "ACTUAL_START_AT": ["", "", "2026-01-05 09:40:00", ""],
+        "ACTUAL_END_AT": ["", "", "", ""],
+    })
+
+
+def _events_sample() -> list[StatusEvent]:
+    return [
+        StatusEvent("r0", "WAITING", "ARRIVED", "2026-01-04T18:00:00+05:30"),
+        StatusEvent("r1", "WAITING", "ON GOING", AT),
+        StatusEvent("r0", "ARRIVED", "DONE", AT),
+    ]
+
+
+def test_stamp_status_changes_only_touches_changed_rows():
+    before = _day()
+    snapshot = row_statuses(take_snapshot(before))
+    assert snapshot == row_statuses(before)
+    after = before.copy()
+    after.loc[0, "STATUS"] = "waiting"       # case only: no change
+    after.loc[1, "STATUS"] = "ON GOING"
+    after.loc[2, "STATUS"] = "DONE"
+    after.loc[3, "STATUS"] = "ARRIVED"       # no row id: not tracked
+    after = pd.concat([after, pd.DataFrame([{"Patient Name": "E", "STATUS": "ARRIVED", "REMINDER_ROW_ID": "r4"}])], ignore_index=True)
+
+    events, detached = stamp_status_changes(snapshot, after, AT, "2026-01-05 10:15:00")
+    assert [(e.row_id, e.from_status, e.to_status, e.day) for e in events] == [
+        ("r1", "ARRIVED", "ON GOING", "2026-01-05"),
+        ("r2", "ON GOING", "DONE", "2026-01-05"),
+        ("r4", "", "ARRIVED", "2026-01-05"),
+    ]
+    assert detached == {}
+    assert after.loc[1, "ACTUAL_START_AT"] == after.loc[2, "ACTUAL_END_AT"] == "2026-01-05 10:15:00"
+    assert after.loc[2, "ACTUAL_START_AT"] == "2026-01-05 09:40:00" and after.loc[0, "STATUS_CHANGED_AT"] == ""
+
+    # A projected frame without the audit columns hands the stamps back per row
+    live = before.drop(columns=["STATUS_CHANGED_AT", "ACTUAL_START_AT", "ACTUAL_END_AT"])
+    snapshot = row_statuses(live)
+    live.loc[1, "STATUS"] = "DONE"
+    events, detached = stamp_status_changes(snapshot, live, AT, "t")
+    assert len(events) == 1 and detached == {"r1": {"STATUS_CHANGED_AT": "t", "ACTUAL_END_AT": "t"}}
+    assert stamp_status_changes(None, live, AT, "t") == ([], {})
+
+    # Saves stamped one after another against the frame last handed over keep every step
+    frame = _day()
+    base = row_statuses(frame)
+    frame.loc[0, "STATUS"] = "ON GOING"
+    first, _ = stamp_status_changes(base, frame, AT, "10:15")
+    base = row_statuses(frame)
+    frame.loc[0, "STATUS"] = "DONE"
+    second, _ = stamp_status_changes(base, frame, AT, "10:40")
+    assert [(e.from_status, e.to_status) for e in first + second] == [("WAITING", "ON GOING"), ("ON GOING", "DONE")]
+    assert (frame.loc[0, "ACTUAL_START_AT"], frame.loc[0, "ACTUAL_END_AT"]) == ("10:15", "10:40")
+
+
+def test_legacy_status_log_cells_still_read():
+    cell = '[{"at": "2026-01-05 09:00:00", "from": "WAITING", "to": "ARRIVED"}, "junk"]'
+    assert legacy_events("r0", cell) == [StatusEvent("r0", "WAITING", "ARRIVED", "2026-01-05 09:00:00")]
+    assert legacy_events("r0", "") == legacy_events("r0", "not json") == []
+
+
+def test_supabase_store_only_inserts():
+    client = FakeSupabase()
+    store = SupabaseStatusEventStore(client, "main")
+    store.append(_events_sample()[:2])
+    store.append(_events_sample()[2:])
+    store.append([])
+    assert [op for _, op, _ in client.calls] == ["insert", "insert"]
+    assert [e.to_status for e in store.for_row("r0")] == ["ARRIVED", "DONE"]
+    assert [e.row_id for e in store.for_day("2026-01-05")] == ["r1", "r0"]
+    assert SupabaseStatusEventStore(client, "other").for_row("r0") == []
+
+
+class _AppendingWorksheet(_FakeWorksheet):
+    def append_rows(self, lines, value_input_option=None):
+        self.spreadsheet.calls.append("append_rows")
+        self.values.extend(list(line) for line in lines)
+
+
+def test_gsheets_store_appends_lines_and_reads_only_matches():
+    spreadsheet = _FakeSpreadsheet()
+    spreadsheet.sheets["StatusEvents"] = _AppendingWorksheet(spreadsheet)
+    spreadsheet.sheets["StatusEvents"].values = [["row_id", "from_status", "to_status", "at", "day"]]
+    store = GSheetsStatusEventStore(spreadsheet)
+    store.append(_events_sample()[:2])
+    store.append(_events_sample()[2:])
+    assert spreadsheet.calls == ["append_rows", "append_rows"]
+    assert store.for_row("r0") == [_events_sample()[0], _events_sample()[2]]
+    assert [e.row_id for e in store.for_day("2026-01-04")] == ["r0"]
+    assert [e.row_id for e in store.for_day("2026-01-05")] == ["r1", "r0"]
+    # One column read, then only the matching lines (a day's lines as one range)
+    assert spreadsheet.calls[2:] == [
+        "col_values", ("batch_get", ("A2:E2", "A4:E4")),
+        "col_values", ("batch_get", ("A2:E2",)),
+        "col_values", ("batch_get", ("A3:E4",)),
+    ]
+    assert store.for_row("r9") == [] and spreadsheet.calls[-1] == "col_values"
+    assert GSheetsStatusEventStore(_FakeSpreadsheet()).for_day("2026-01-05") == []
+
+
+def test_file_store_appends_and_skips_torn_lines():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Putt Allotment.status_events.jsonl")
+        store = JsonLinesStatusEventStore(path)
+        assert store.for_row("r0") == []
+        store.append(_events_sample()[:2])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"row_id": "r9", "to_st')
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        store.append(_events_sample()[2:])
+        assert JsonLinesStatusEventStore(path).for_row("r0") == [_events_sample()[0], _events_sample()[2]]
+        assert len(store.for_day("2026-01-05")) == 2
+
+
+if __name__ == "__main__":
+    test_stamp_status_changes_only_touches_changed_rows()
+    test_legacy_status_log_cells_still_read()
+    test_supabase_store_only_inserts()
+    test_gsheets_store_appends_lines_and_reads_only_matches()
+    test_file_store_appends_and_skips_torn_lines()
+    print("✅ status event tests passed")
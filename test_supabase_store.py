@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Tests for the Supabase storage modes.
+
+A small in-memory stand-in for the supabase-py query builder (and the
+payload patch RPC) records every write, so the tests can check that saves
+send only what the changeset touched and that both modes round-trip the
+schedule.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from schedule_diff import diff_frame, take_snapshot
+from column_profiles import LAZY_COLUMNS
+from supabase_store import (
+    SupabaseClientPool,
+    load_lazy_fields,
+    load_payload_frame,
+    load_rows_frame,
+    load_schedule_range,
+    normalize_storage_mode,
+    place_rows,
+    probe_version,
+    save_lazy_fields,
+    save_payload_frame,
+    save_rows_frame,
+)
+
+EXPECTED = ["Patient Name", "In Time", "DR.", "FIRST", "STATUS", "REMINDER_ROW_ID", "STATUS_LOG"]
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+        self.op, self.payload, self.filters, self.on_conflict = "select", None, [], None
+        self.columns = "*"
+
+    def select(self, columns):
+        self.op, self.columns = "select", columns
+        return self
+
+    def _project(self, row):
+        """PostgREST-style select list: plain columns and `alias:col->key->key`."""
+        if self.columns == "*":
+            return dict(row)
+        out = {}
+        for item in self.columns.split(","):
+            alias, _, path = item.rpartition(":")
+            parts = path.split("->")
+            value = row.get(parts[0])
+            for key in parts[1:]:
+                value = value.get(key) if isinstance(value, dict) else None
+            out[alias or parts[-1]] = value
+        return out
+
+    def eq(self, col, value):
+        self.filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def in_(self, col, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(col) in values)
+        return self
+
+    def gte(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) >= value)
+        return self
+
+    def lte(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) <= value)
+        return self
+
+    def lt(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) < value)
+        return self
+
+    def or_(self, expr):
+        """Only the `col.is.null` and `col.gte.value` terms the store uses."""
+        tests = []
+        for term in expr.split(","):
+            col, op, value = term.split(".", 2)
+            if op == "is":
+                tests.append(lambda r, c=col: r.get(c) is None)
+            else:
+                tests.append(lambda r, c=col, v=value: r.get(c) is not None and r.get(c) >= v)
+        self.filters.append(lambda r: any(t(r) for t in tests))
+        return self
+
+    def order(self, col):
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.op, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def update(self, values):
+        self.op, self.payload = "update", values
+        return self
+
+    def execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        matches = [r for r in rows if all(f(r) for f in self.filters)]
+        self.client.calls.append((self.table, self.op, self.payload if self.op in ("upsert", "update", "insert") else len(matches)))
+        if self.op == "select":
+            return _Result([self._project(r) for r in matches])
+        if self.op == "update":
+            for r in matches:
+                r.update(self.payload)
+            return _Result(matches)
+        if self.op == "delete":
+            self.client.tables[self.table] = [r for r in rows if r not in matches]
+            return _Result(matches)
+        if self.op == "insert":
+            added = [{"id": len(rows) + n + 1, **item} for n, item in enumerate(self.payload)]
+            rows.extend(added)
+            return _Result(added)
+        keys = (self.on_conflict or "id").split(",")
+        for item in self.payload if isinstance(self.payload, list) else [self.payload]:
+            # Like PostgREST: a conflicting row only gets the columns that were sent
+            existing = next((r for r in rows if all(r.get(k) == item.get(k) for k in keys)), None)
+            if existing is None:
+                rows.append(dict(item))
+            else:
+                existing.update(item)
+        return _Result([])
+
+
+class _APIError(Exception):
+    """Shaped like postgrest's APIError."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class _Rpc:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        self.client.calls.append(("rpc", self.name, self.params))
+        if self.client.rpc_errors:
+            raise self.client.rpc_errors.pop(0)
+        if not self.client.has_patch_rpc:
+            raise _APIError("PGRST202", "Could not find the function public.tdb_patch_payload")
+        updates = self.params["p_updates"]
+        state = next(r for r in self.client.tables[self.params["p_table"]] if r["id"] == self.params["p_id"])
+        if state["payload"].get("format") == 2:
+            self._patch_columns(state["payload"], updates)
+        else:
+            rows = state["payload"]["rows"]
+            if sum(r.get("REMINDER_ROW_ID") in updates for r in rows) != len(updates):
+                raise RuntimeError("tdb_patch_payload: stale (rows changed)")
+            state["payload"]["rows"] = [{**r, **updates.get(r.get("REMINDER_ROW_ID"), {})} for r in rows]
+        if self.params["p_meta"] is not None:
+            state["payload"]["meta"] = self.params["p_meta"]
+        state["updated_at"] = f"rpc-{len(self.client.calls)}"
+        return _Result(len(updates))
+
+    @staticmethod
+    def _patch_columns(payload, updates):
+        """The format-2 branch of PAYLOAD_PATCH_SQL."""
+        ids = payload["data"]["REMINDER_ROW_ID"]
+        for rid, values in updates.items():
+            if rid not in ids:
+                raise RuntimeError("tdb_patch_payload: stale (rows changed)")
+            pos = ids.index(rid)
+            for col, value in values.items():
+                data = payload["data"] if col in payload["data"] else payload.get("lazy", {})
+                if col not in data:
+                    raise RuntimeError("tdb_patch_payload: stale (columns changed)")
+                if isinstance(data[col], dict):
+                    if value not in data[col]["dict"]:
+                        data[col]["dict"].append(value)
+                    data[col]["codes"][pos] = data[col]["dict"].index(value)
+                else:
+                    data[col][pos] = value
+
+
+class FakeSupabase:
+    def __init__(self, has_patch_rpc=True):
+        self.tables: dict[str, list[dict]] = {}
+        self.calls: list[tuple] = []
+        self.has_patch_rpc = has_patch_rpc
+        self.rpc_errors: list[Exception] = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params):
+        return _Rpc(self, name, params)
+
+
+def _schedule(n: int) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"Patient Name": f"P{i}", "In Time": f"{9 + i:02d}:00", "DR.": "DR.NIMAI",
+         "FIRST": "ANYA", "STATUS": "WAITING", "REMINDER_ROW_ID": f"r{i}", "STATUS_LOG": ""}
+        for i in range(n)
+    ])
+
+
+def _save_rows(client, df, previous, meta=None, now="t0"):
+    changes, snapshot = diff_frame(previous, df, meta)
+    return save_rows_frame(client, "state", "main", "rows", changes, meta, now), snapshot
+
+
+def test_payload_mode_round_trip_and_patch():
+    client = FakeSupabase()
+    df = _schedule(3).drop(columns=["STATUS_LOG"])
+    changes, snapshot = diff_frame(None, df, {"time_blocks": []})
+    assert save_payload_frame(client, "state", "main", changes, {"time_blocks": []}) == "full"
+    loaded = load_payload_frame(client, "state", "main", EXPECTED)
+    assert list(loaded.columns)[:6] == list(df.columns) and "STATUS_LOG" in loaded.columns
+    assert loaded["Patient Name"].tolist() == ["P0", "P1", "P2"]
+    assert loaded.attrs["meta"] == {"time_blocks": []}
+    assert load_payload_frame(FakeSupabase(), "state", "main", EXPECTED).empty
+
+    # A status click ships one cell through the RPC
+    client.calls.clear()
+    df.loc[2, "STATUS"] = "ARRIVED"
+    changes, snapshot = diff_frame(snapshot, df, {"time_blocks": []})
+    assert save_payload_frame(client, "state", "main", changes, {"time_blocks": []}) == "patched"
+    assert client.calls == [("rpc", "tdb_patch_payload", {
+        "p_table": "state", "p_id": "main", "p_updates": {"r2": {"STATUS": "ARRIVED"}}, "p_meta": None})]
+    assert load_payload_frame(client, "state", "main", EXPECTED)["STATUS"].tolist() == ["WAITING", "WAITING", "ARRIVED"]
+
+    # Nothing changed: nothing sent
+    client.calls.clear()
+    changes, snapshot = diff_frame(snapshot, df, {"time_blocks": [], "time_blocks_updated_at": "now"})
+    assert save_payload_frame(client, "state", "main", changes, {"time_blocks": []}) == "skipped"
+    assert client.calls == []
+
+
+def test_payload_patch_falls_back_to_full_write():
+    client = FakeSupabase(has_patch_rpc=False)
+    df = _schedule(2)
+    changes, snapshot = diff_frame(None, df)
+    save_payload_frame(client, "state", "main", changes, None, project="p1")
+    df.loc[0, "FIRST"] = "ROHINI"
+    changes, snapshot = diff_frame(snapshot, df)
+    assert save_payload_frame(client, "state", "main", changes, None, project="p1") == "full"
+    df.loc[1, "FIRST"] = "ROHINI"
+    changes, snapshot = diff_frame(snapshot, df)
+    client.calls.clear()
+    # The missing function is remembered; no second RPC attempt
+    assert save_payload_frame(client, "state", "main", changes, None, project="p1") == "full"
+    assert [c[0] for c in client.calls] == ["state"]
+    assert load_payload_frame(client, "state", "main", EXPECTED)["FIRST"].tolist() == ["ROHINI", "ROHINI"]
+
+    # A timeout or 5xx falls back for that save only; the next one patches again
+    client = FakeSupabase()
+    save_payload_frame(client, "state", "main", diff_frame(None, df)[0], None, project="p2")
+    snapshot = take_snapshot(df)
+    for error, expected in ((_APIError("", "502 Bad Gateway"), "full"), (None, "patched")):
+        if error is not None:
+            client.rpc_errors.append(error)
+        df.loc[0, "STATUS"] = "DONE" if expected == "full" else "WAITING"
+        changes, snapshot = diff_frame(snapshot, df)
+        assert save_payload_frame(client, "state", "main", changes, None, project="p2") == expected
+
+
+def test_columnar_payload_patch_and_legacy_reads():
+    client = FakeSupabase()
+    df = _schedule(6)
+    changes, snapshot = diff_frame(None, df)
+    save_payload_frame(client, "state", "main", changes, None)
+    stored = client.tables["state"][0]["payload"]
+    assert stored["format"] == 2 and "rows" not in stored
+    assert stored["data"]["STATUS"] == {"dict": ["WAITING"], "codes": [0] * 6}
+
+    # Cell patches land in dictionary-encoded and plain columns alike
+    df.loc[4, "STATUS"] = "ARRIVED"
+    df.loc[5, "In Time"] = "16:30"
+    changes, snapshot = diff_frame(snapshot, df)
+    assert save_payload_frame(client, "state", "main", changes, None) == "patched"
+    pd.testing.assert_frame_equal(load_payload_frame(client, "state", "main", EXPECTED), df[EXPECTED])
+
+    # Row-dict payloads written by older versions still load and patch
+    legacy = FakeSupabase()
+    changes, snapshot = diff_frame(None, df)
+    save_payload_frame(legacy, "state", "main", changes, None, payload_format="rows")
+    assert "rows" in legacy.tables["state"][0]["payload"]
+    df.loc[0, "FIRST"] = "ROHINI"
+    changes, snapshot = diff_frame(snapshot, df)
+    assert save_payload_frame(legacy, "state", "main", changes, None) == "patched"
+    pd.testing.assert_frame_equal(load_payload_frame(legacy, "state", "main", EXPECTED), df[EXPECTED])
+
+
+def _audited(n: int) -> pd.DataFrame:
+    df = _schedule(n)
+    df["STATUS_LOG"] = [f'[{{"to": "WAITING", "row": {i}}}]' for i in range(n)]
+    df["STATUS_CHANGED_AT"] = [f"2026-01-05 09:0{i}" for i in range(n)]
+    return df
+
+
+def test_live_view_skips_lazy_columns_and_saves_keep_them():
+    full = EXPECTED + ["STATUS_CHANGED_AT"]
+    for mode in ("payload", "rows"):
+        client = FakeSupabase()
+        changes, _ = diff_frame(None, _audited(5))
+        if mode == "rows":
+            save_rows_frame(client, "state", "main", "rows", changes, None, "t0")
+            live = load_rows_frame(client, "state", "main", "rows", full, omit=LAZY_COLUMNS)
+            assert "lazy" not in client.tables["rows"][0]["data"] and "STATUS_LOG" not in client.tables["rows"][0]["data"]
+        else:
+            save_payload_frame(client, "state", "main", changes, None)
+            live = load_payload_frame(client, "state", "main", full, omit=LAZY_COLUMNS)
+            assert set(client.tables["state"][0]["payload"]["lazy"]) == {"STATUS_LOG", "STATUS_CHANGED_AT"}
+        assert not set(LAZY_COLUMNS) & set(live.columns), mode
+        assert live.attrs["lazy_columns"] == list(LAZY_COLUMNS)
+
+        # Insert a row at the top of the live frame (a full rewrite in payload mode)
+        snapshot = take_snapshot(live)
+        edited = pd.concat([_schedule(7).iloc[[6]].drop(columns=["STATUS_LOG"]), live], ignore_index=True)
+        changes, _ = diff_frame(snapshot, edited)
+        if mode == "rows":
+            save_rows_frame(client, "state", "main", "rows", changes, None, "t1")
+            upserted = next(p for t, op, p in reversed(client.calls) if t == "rows" and op == "upsert")
+            assert all("lazy" not in r for r in upserted)
+            reloaded = load_rows_frame(client, "state", "main", "rows", full)
+        else:
+            assert save_payload_frame(client, "state", "main", changes, None, lazy_columns=LAZY_COLUMNS) == "full"
+            reloaded = load_payload_frame(client, "state", "main", full)
+        assert reloaded["STATUS_LOG"].tolist()[1:] == _audited(5)["STATUS_LOG"].tolist(), mode
+        assert reloaded.loc[0, "STATUS_LOG"] == "" and reloaded.loc[3, "STATUS_CHANGED_AT"] == "2026-01-05 09:02"
+
+        # The status history of one appointment, fetched on demand
+        client.calls.clear()
+        fields = load_lazy_fields(client, "state", "main", mode, "rows", ["r3"])
+        assert fields == {"r3": {"STATUS_LOG": '[{"to": "WAITING", "row": 3}]', "STATUS_CHANGED_AT": "2026-01-05 09:03"}}
+        assert len(client.calls) == 1
+
+        # A status stamp for a row the live view loaded without its audit columns
+        save_lazy_fields(client, "state", "main", mode, "rows", {"r3": {"STATUS_CHANGED_AT": "2026-01-05 10:00"}})
+        fields = load_lazy_fields(client, "state", "main", mode, "rows", ["r3"])
+        assert fields["r3"]["STATUS_CHANGED_AT"] == "2026-01-05 10:00" and fields["r3"]["STATUS_LOG"], mode
+
+
+def test_lazy_stamps_without_the_patch_rpc():
+    for payload_format in ("columnar", "rows"):
+        client = FakeSupabase(has_patch_rpc=False)
+        df = _schedule(3)
+        save_payload_frame(client, "state", "main", diff_frame(None, df)[0], {"time_blocks": []},
+                           payload_format=payload_format)
+        # The RPC is missing: the payload is read, stamped and written back in its own format
+        project = f"no-rpc-{payload_format}"
+        for stamp in ("10:00", "10:05"):
+            save_lazy_fields(client, "state", "main", "payload", "rows",
+                             {"r1": {"STATUS_CHANGED_AT": stamp, "ACTUAL_END_AT": stamp}}, project=project, now_iso="t2")
+        assert [c[1] for c in client.calls].count("tdb_patch_payload") == 1, payload_format
+        stored = client.tables["state"][0]
+        assert stored["updated_at"] == "t2" and ("rows" in stored["payload"]) == (payload_format == "rows")
+        loaded = load_payload_frame(client, "state", "main", EXPECTED + ["STATUS_CHANGED_AT", "ACTUAL_END_AT"])
+        assert loaded["STATUS_CHANGED_AT"].tolist() == ["", "10:05", ""], payload_format
+        assert loaded["ACTUAL_END_AT"].tolist()[1] == "10:05" and loaded["FIRST"].tolist() == ["ANYA"] * 3
+        assert loaded.attrs["meta"] == {"time_blocks": []}
+
+
+def test_rows_mode_sends_only_changes():
+    client = FakeSupabase()
+    counts, _ = _save_rows(client, _schedule(5), None, {"time_blocks": []})
+    assert counts == {"upserted": 5, "deleted": 0, "meta_written": 1}
+
+    loaded = load_rows_frame(client, "state", "main", "rows", EXPECTED)
+    pd.testing.assert_frame_equal(loaded, _schedule(5)[EXPECTED])
+    snapshot = take_snapshot(loaded, loaded.attrs["meta"])
+
+    # Status click on one row, the last appointment removed, one added at the end
+    client.calls.clear()
+    edited = loaded.copy()
+    edited.loc[1, "STATUS"] = "ARRIVED"
+    edited = pd.concat([edited.iloc[:4], _schedule(7).iloc[[6]]], ignore_index=True)
+    meta = {"time_blocks": [], "time_blocks_updated_at": "later"}
+    counts, snapshot = _save_rows(client, edited, snapshot, meta, now="t1")
+    assert counts == {"upserted": 2, "deleted": 1, "meta_written": 0}
+    upserted = next(p for t, op, p in client.calls if t == "rows" and op == "upsert")
+    assert sorted(r["row_id"] for r in upserted) == ["r1", "r6"]
+    assert all(r["updated_at"] == "t1" and r["date"] is None for r in upserted)
+    assert {r["row_id"]: r["in_min"] for r in upserted} == {"r1": 600, "r6": 900}
+
+    # Nothing left to send on a repeated save
+    client.calls.clear()
+    assert _save_rows(client, edited, snapshot, meta, now="t2")[0]["upserted"] == 0
+    assert client.calls == []
+
+    reloaded = load_rows_frame(client, "state", "main", "rows", EXPECTED)
+    assert reloaded["REMINDER_ROW_ID"].tolist() == ["r0", "r1", "r2", "r3", "r6"]
+    assert reloaded.loc[1, "STATUS"] == "ARRIVED"
+
+
+
+def test_rows_mode_inserts_do_not_rewrite_neighbours():
+    client = FakeSupabase()
+    _save_rows(client, _schedule(6), None)
+    loaded = load_rows_frame(client, "state", "main", "rows", EXPECTED)
+    snapshot = take_snapshot(loaded)
+
+    # A new first row and a deleted second row shift every other row, but only the new one is sent
+    edited = pd.concat([_schedule(8).iloc[[7]], loaded.drop(index=1)], ignore_index=True)
+    client.calls.clear()
+    counts, snapshot = _save_rows(client, edited, snapshot)
+    assert counts == {"upserted": 1, "deleted": 1, "meta_written": 0}
+    assert [r["row_id"] for t, op, p in client.calls if op == "upsert" for r in p] == ["r7"]
+
+    # Moving one row sends that row alone
+    edited = edited.iloc[[0, 1, 3, 4, 2, 5]].reset_index(drop=True)
+    client.calls.clear()
+    counts, snapshot = _save_rows(client, edited, snapshot)
+    assert counts["upserted"] == 1
+    reloaded = load_rows_frame(client, "state", "main", "rows", EXPECTED)
+    assert reloaded["REMINDER_ROW_ID"].tolist() == edited["REMINDER_ROW_ID"].tolist() == ["r7", "r0", "r3", "r4", "r2", "r5"]
+
+
+def test_place_rows_keeps_order_and_renumbers_when_full():
+    stored = {"a": 0, "b": 1024, "c": 2048}
+    assert place_rows(["a", "x", "b", "c", "y"], stored) == {"a": 0, "x": 512, "b": 1024, "c": 2048, "y": 3072}
+    # c moved to the front: a and b keep their positions
+    assert place_rows(["z", "c", "a", "b"], stored) == {"z": -2048, "c": -1024, "a": 0, "b": 1024}
+    # No room between dense positions (older tables): everything is renumbered
+    assert place_rows(["a", "x", "b"], {"a": 0, "b": 1}) == {"a": 0, "x": 1024, "b": 2048}
+    assert place_rows(["a", "b"], {}) == {"a": 0, "b": 1024}
+
+def test_rows_mode_without_snapshot_and_odd_ids():
+    client = FakeSupabase()
+    _save_rows(client, _schedule(4), None)
+    # No snapshot: full upsert, stale stored rows deleted
+    fresh = _schedule(2)
+    fresh.loc[1, "REMINDER_ROW_ID"] = "r0"
+    fresh = pd.concat([fresh, pd.DataFrame([{"Patient Name": "X", "REMINDER_ROW_ID": ""}])], ignore_index=True)
+    counts, _ = _save_rows(client, fresh, None, now="t1")
+    assert counts["upserted"] == 3 and counts["deleted"] == 3
+    assert sorted(r["row_id"] for r in client.tables["rows"]) == ["pos-2", "r0", "r0#1"]
+    assert normalize_storage_mode(" ROWS ") == "rows" and normalize_storage_mode("bogus") == "payload"
+
+
+def test_switching_from_payload_mode_migrates_on_next_save():
+    client = FakeSupabase()
+    changes, _ = diff_frame(None, _schedule(3), {"time_blocks": []})
+    save_payload_frame(client, "state", "main", changes, {"time_blocks": []})
+    loaded = load_rows_frame(client, "state", "main", "rows", EXPECTED)
+    assert loaded["REMINDER_ROW_ID"].tolist() == ["r0", "r1", "r2"]
+    assert loaded.attrs["needs_full_save"]
+    counts, snapshot = _save_rows(client, loaded, None, loaded.attrs["meta"])
+    assert counts == {"upserted": 3, "deleted": 0, "meta_written": 1}
+    assert "rows" not in client.tables["state"][0]["payload"]
+
+    # Once migrated, an emptied schedule stays empty
+    _save_rows(client, loaded.iloc[0:0], snapshot, loaded.attrs["meta"], now="t1")
+    assert load_rows_frame(client, "state", "main", "rows", EXPECTED).empty
+
+
+def test_version_probe_moves_on_every_save():
+    client = FakeSupabase()
+    assert probe_version(client, "state", "main") == "absent"
+    df = _schedule(3)
+    changes, snapshot = diff_frame(None, df)
+    save_payload_frame(client, "state", "main", changes, None, now_iso="v1")
+    assert probe_version(client, "state", "main") == "v1"
+    df.loc[0, "STATUS"] = "ARRIVED"
+    changes, snapshot = diff_frame(snapshot, df)
+    assert save_payload_frame(client, "state", "main", changes, None, now_iso="v2") == "patched"
+    patched_version = probe_version(client, "state", "main")
+    assert patched_version not in ("v1", "")
+    # The probe only asks for the version column
+    client.calls.clear()
+    probe_version(client, "state", "main")
+    assert client.calls == [("state", "select", 1)]
+
+    rows_client = FakeSupabase()
+    counts, snapshot = _save_rows(rows_client, df, None, now="v1")
+    assert probe_version(rows_client, "state", "main") == "v1"
+    df.loc[1, "STATUS"] = "ARRIVED"
+    _save_rows(rows_client, df, snapshot, now="v2")
+    assert probe_version(rows_client, "state", "main") == "v2"
+
+
+def _dated_week() -> pd.DataFrame:
+    """Two appointments a day for 2026-01-03..2026-01-06 plus one undated row."""
+    df = _schedule(9)
+    df["DATE"] = [f"2026-01-0{3 + i // 2}" for i in range(8)] + [""]
+    return df
+
+
+def test_past_days_stay_out_of_the_live_load():
+    columns = EXPECTED + ["DATE"]
+
+    # Rows mode: the live load filters on the date column, ranges use the index columns
+    client = FakeSupabase()
+    _save_rows(client, _dated_week(), None)
+    assert sorted({r["date"] for r in client.tables["rows"]}, key=lambda d: d or "") == [None, "2026-01-03", "2026-01-04", "2026-01-05", "2026-01-06"]
+    live = load_rows_frame(client, "state", "main", "rows", columns, since="2026-01-05")
+    assert live["REMINDER_ROW_ID"].tolist() == ["r4", "r5", "r6", "r7", "r8"]
+    # A full save of the live window leaves earlier days alone
+    changes, _ = diff_frame(None, live, None)
+    assert save_rows_frame(client, "state", "main", "rows", changes, None, "t1", since="2026-01-05")["deleted"] == 0
+    assert len(client.tables["rows"]) == 9
+    week = load_schedule_range(client, "state", "main", "rows", "rows", "2026-01-03", "2026-01-04", columns, from_min=600)
+    assert week["REMINDER_ROW_ID"].tolist() == ["r1", "r2", "r3"]
+
+    # Payload mode: a full write moves earlier days into partition rows
+    client = FakeSupabase()
+    changes, _ = diff_frame(None, _dated_week(), None)
+    assert save_payload_frame(client, "state", "main", changes, None, today="2026-01-05") == "full"
+    assert sorted(r["id"] for r in client.tables["state"]) == ["main", "main@2026-01-03", "main@2026-01-04"]
+    live = load_payload_frame(client, "state", "main", columns, today="2026-01-05")
+    assert live["REMINDER_ROW_ID"].tolist() == ["r4", "r5", "r6", "r7", "r8"]
+    assert "needs_full_save" not in live.attrs
+    # The next day, yesterday's rows are flagged and move on the next full write
+    later = load_payload_frame(client, "state", "main", columns, today="2026-01-06")
+    assert later.attrs["needs_full_save"]
+    later.loc[0, "STATUS"] = "DONE"
+    changes, _ = diff_frame(None, later, None)
+    save_payload_frame(client, "state", "main", changes, None, today="2026-01-06")
+    week = load_schedule_range(client, "state", "main", "payload", "rows", "2026-01-03", "2026-01-06", columns)
+    assert week["REMINDER_ROW_ID"].tolist() == [f"r{i}" for i in range(8)]
+    assert week.loc[4, "STATUS"] == "DONE" and week["DATE"].tolist()[-1] == "2026-01-06"
+    mornings = load_schedule_range(client, "state", "main", "payload", "rows", "2026-01-04", "2026-01-05", columns, to_min=720)
+    assert mornings["REMINDER_ROW_ID"].tolist() == ["r2", "r3"]
+
+
+def test_client_pool_reuses_and_rebuilds_after_failures():
+    built = []
+    clock = [0.0]
+
+    def factory(url, key):
+        built.append((url, key))
+        return FakeSupabase()
+
+    pool = SupabaseClientPool(factory, health_interval=60, clock=lambda: clock[0])
+    first = pool.get("u", "k")
+    assert pool.get("u", "k") is first and pool.get("u", "k2") is not first
+    assert pool.stats() == {"opened": 2, "reused": 1, "discarded": 0, "live": 2}
+
+    probes = []
+    pool.check_health("u", "k", probes.append)
+    pool.check_health("u", "k", probes.append)
+    clock[0] = 61
+    pool.check_health("u", "k", probes.append)
+    assert probes == [first, first]
+
+    def broken(client):
+        raise ConnectionError("reset by peer")
+
+    try:
+        pool.check_health("u", "k", broken, force=True)
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("health check failure should propagate")
+    assert pool.get("u", "k") is not first and built.count(("u", "k")) == 2
+    assert pool.stats()["discarded"] == 1
+
+
+if __name__ == "__main__":
+    test_payload_mode_round_trip_and_patch()
+    test_payload_patch_falls_back_to_full_write()
+    test_columnar_payload_patch_and_legacy_reads()
+    test_live_view_skips_lazy_columns_and_saves_keep_them()
+    test_lazy_stamps_without_the_patch_rpc()
+    test_rows_mode_sends_only_changes()
+    test_rows_mode_inserts_do_not_rewrite_neighbours()
+    test_place_rows_keeps_order_and_renumbers_when_full()
+    test_rows_mode_without_snapshot_and_odd_ids()
+    test_switching_from_payload_mode_migrates_on_next_save()
+    test_version_probe_moves_on_every_save()
+    test_past_days_stay_out_of_the_live_load()
+    test_client_pool_reuses_and_rebuilds_after_failures()
+    print("✅ supabase store tests passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the batched In Time / Out Time parser.
+
+parse_time_series() must agree with coerce_to_time_obj() for every cell, so a
+large synthetic corpus of the representations seen in real schedules (plus the
+awkward ones people type) is parsed both ways and compared.
+"""
+
+import random
+import sys
+import os
+from datetime import time as time_type, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from time_utils import coerce_to_time_obj, parse_time_series, minutes_to_time_objs
+
+
+def _scalar_expected(value):
+    t = coerce_to_time_obj(value)
+    if t is None:
+        return None, "N/A"
+    return t.hour * 60 + t.minute, f"{t.hour:02d}:{t.minute:02d}"
+
+
+def _synthetic_corpus(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    fixed = [
+        None, np.nan, pd.NA, pd.NaT, "", "   ", "N/A", "nat", "None", "nan",
+        "9", "930", ":30", "9:", "9.", ".30", "9..30", "9.30.1", "24:00", "23:59", "-0:30", "+9:05",
+        "9:5", "09:05:59", "9:30:xx", "9:3x", "9 :30", "9: 30", " 9 : 30 ", "9.5:30", "9:30.5",
+        "12:00 AM", "12:00 PM", "0:30 AM", "00:30 AM", "13:00 PM", "9:60 PM", "9:30:60 PM", "9:30:59 pm",
+        "9:30PM", "9:30 p.m.", "9:30 AMX", "AM 9:30", "9 AM", "9.30 AM", "009:30 PM", "1:30:5 am",
+        "9_0:30", "١٠:٣٠", "9 :30", "9:30\tPM", "\n10.15\n",
+        0, 1, 0.0, -0.0, 1.0, 0.5, 0.625, 0.999, 1.5, 9.3, 9.30, 9.59, 9.6, 9.75, 9.995, 23.99, 23.995,
+        24, 24.5, -1, 100, float("inf"), True, False, np.float32(9.3), np.int64(9),
+        time_type(9, 30), time_type(23, 59, 59), datetime(2024, 1, 1, 9, 30), pd.Timestamp("2024-01-01 09:30"),
+    ]
+    corpus = list(fixed)
+    for _ in range(n):
+        h = rng.randrange(0, 26)
+        m = rng.randrange(0, 75)
+        kind = rng.randrange(9)
+        if kind == 0:
+            corpus.append(f"{h:02d}:{m:02d}")
+        elif kind == 1:
+            corpus.append(f"{h}.{m:02d}")
+        elif kind == 2:
+            h12 = rng.randrange(0, 14)
+            sep = rng.choice(["", " ", "  "])
+            ampm = rng.choice(["AM", "PM", "am", "pm", "Pm"])
+            sec = rng.choice(["", f":{rng.randrange(0, 62):02d}"])
+            corpus.append(f"{h12}:{m:02d}{sec}{sep}{ampm}")
+        elif kind == 3:
+            corpus.append(round(rng.random(), rng.randrange(1, 8)))
+        elif kind == 4:
+            corpus.append(h + m / 100)
+        elif kind == 5:
+            corpus.append(round(rng.uniform(-2, 30), 2))
+        elif kind == 6:
+            corpus.append(f"{h}:{m}:{rng.randrange(60):02d}")
+        elif kind == 7:
+            corpus.append(time_type(h % 24, m % 60))
+        else:
+            corpus.append(rng.choice([" ", "x", "9:30 x", f"{h} . {m}", f" {h}:{m} "]))
+    rng.shuffle(corpus)
+    return corpus
+
+
+def _assert_parity(values: pd.Series) -> None:
+    minutes, labels = parse_time_series(values)
+    assert minutes.dtype == "Int64"
+    assert list(minutes.index) == list(values.index)
+    for pos, value in enumerate(values.tolist()):
+        exp_min, exp_label = _scalar_expected(value)
+        got_min = minutes.iloc[pos]
+        got_min = None if pd.isna(got_min) else int(got_min)
+        assert got_min == exp_min, f"{value!r}: minutes {got_min} != {exp_min}"
+        assert labels.iloc[pos] == exp_label, f"{value!r}: label {labels.iloc[pos]} != {exp_label}"
+
+
+def test_mixed_object_column_matches_scalar_parser():
+    corpus = _synthetic_corpus(20000, seed=11)
+    _assert_parity(pd.Series(corpus, dtype=object))
+
+
+def test_numeric_column_matches_scalar_parser():
+    rng = np.random.default_rng(5)
+    values = np.concatenate([
+        rng.uniform(-1, 25, 5000),
+        np.round(rng.uniform(0, 24, 5000), 2),
+        rng.random(5000),
+        [np.nan, 0, 1, 24],
+    ])
+    _assert_parity(pd.Series(values))
+    _assert_parity(pd.Series([9, 10, 23, 0, 1, 30], dtype="int64"))
+
+
+def test_index_and_time_objects_are_preserved():
+    values = pd.Series(["09:30", 14.15, None], index=[10, 20, 30])
+    minutes, labels = parse_time_series(values)
+    assert minutes.tolist()[:2] == [570, 855] and pd.isna(minutes.iloc[2])
+    assert labels.tolist() == ["09:30", "14:15", "N/A"]
+    objs = minutes_to_time_objs(minutes)
+    assert objs.tolist() == [time_type(9, 30), time_type(14, 15), None]
+    assert list(objs.index) == [10, 20, 30]
+
+
+def test_empty_column():
+    minutes, labels = parse_time_series(pd.Series([], dtype=object))
+    assert len(minutes) == 0 and len(labels) == 0
+
+
+if __name__ == "__main__":
+    test_mixed_object_column_matches_scalar_parser()
+    test_numeric_column_matches_scalar_parser()
+    test_index_and_time_objects_are_preserved()
+    test_empty_column()
+    print("✅ time parser parity tests passed")
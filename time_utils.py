@@ -0,0 +1,299 @@
+"""
+Time parsing helpers for the allotment dashboard.
+
+Schedule times arrive in many shapes depending on the storage backend and who
+typed them: "09:30", "9.30", "09:30 AM", Excel serial fractions (0.39583) and
+9.30-style decimals where the fraction is the minutes. `coerce_to_time_obj`
+parses a single cell; `parse_time_series` parses a whole column in one batched
+pass and gives the same answer cell for cell.
+"""
+
+import re
+from datetime import datetime, time as time_type
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# "HH:MM" label and time object for every minute of the day (display lookups)
+_HHMM_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)], dtype=object)
+_TIME_OBJS = np.array([time_type(m // 60, m % 60) for m in range(1440)], dtype=object)
+
+# 12-hour clock shapes accepted by strptime("%I:%M %p") / ("%I:%M:%S %p")
+_RE_12H = r"^([0-9]{1,2}):([0-9]{1,2})(?::([0-9]{1,2}))? ?(AM|PM)$"
+_RE_12H_HOUR = r"^(?:1[0-2]|0[1-9]|[1-9])$"
+_RE_MIN_SEC = r"^(?:[0-5][0-9]|[0-9])$"
+# What int() accepts once the text is ASCII and whitespace is collapsed
+_RE_INT = r"^\s*[+-]?[0-9]+\s*$"
+
+
+def coerce_to_time_obj(time_value: Any) -> time_type | None:
+    """Best-effort coercion of many time representations into a datetime.time.
+
+    Supports:
+    - datetime.time, datetime
+    - strings: HH:MM, HH:MM:SS, HH.MM, and 12-hour formats like '09:30 AM'
+    - numbers: 9.30 (meaning 09:30), or Excel serial time 0-1
+    """
+    if time_value is None or pd.isna(time_value) or time_value == "":
+        return None
+    if isinstance(time_value, time_type):
+        return time_value
+
+    # Strings
+    if isinstance(time_value, str):
+        s = " ".join(time_value.strip().split())
+        if s == "" or s.upper() in {"N/A", "NAT", "NONE"}:
+            return None
+
+        # 12-hour formats (e.g., 09:30 AM, 9:30PM, 09:30:00 PM)
+        if re.search(r"\b(AM|PM)\b", s, flags=re.IGNORECASE) or re.search(r"(AM|PM)$", s, flags=re.IGNORECASE):
+            s_norm = re.sub(r"\s*(AM|PM)\s*$", r" \1", s, flags=re.IGNORECASE).upper()
+            for fmt in ("%I:%M %p", "%I:%M:%S %p"):
+                try:
+                    dt = datetime.strptime(s_norm, fmt)
+                    return time_type(dt.hour, dt.minute)
+                except ValueError:
+                    pass
+
+        # HH:MM or HH:MM:SS
+        if ":" in s:
+            parts = s.split(":")
+            if len(parts) >= 2:
+                try:
+                    h = int(parts[0])
+                    m_part = re.sub(r"\D.*$", "", parts[1])
+                    m = int(m_part)
+                    if 0 <= h < 24 and 0 <= m < 60:
+                        return time_type(h, m)
+                except (ValueError, TypeError):
+                    pass
+
+        # HH.MM
+        if "." in s:
+            parts = s.split(".")
+            if len(parts) == 2:
+                try:
+                    h = int(parts[0])
+                    m = int(parts[1])
+                    if 0 <= h < 24 and 0 <= m < 60:
+                        return time_type(h, m)
+                except (ValueError, TypeError):
+                    pass
+
+        return None
+
+    # Numeric formats
+    try:
+        num_val = float(time_value)
+    except (ValueError, TypeError):
+        return None
+
+    # Excel serial time format (0.625 = 15:00)
+    if 0 <= num_val <= 1:
+        total_minutes = round(num_val * 1440)
+        hours = (total_minutes // 60) % 24
+        minutes = total_minutes % 60
+        return time_type(hours, minutes)
+
+    # 9.30 meaning 09:30 (decimal part is minutes directly)
+    if 0 <= num_val < 24:
+        hours = int(num_val)
+        decimal_part = num_val - hours
+        minutes = round(decimal_part * 100)
+        if minutes > 59:
+            minutes = round(decimal_part * 60)
+        if minutes >= 60:
+            hours = (hours + 1) % 24
+            minutes = 0
+        if 0 <= hours < 24 and 0 <= minutes < 60:
+            return time_type(hours, minutes)
+
+    return None
+
+
+def _scalar_minutes(value: Any) -> float:
+    t = coerce_to_time_obj(value)
+    return np.nan if t is None else float(t.hour * 60 + t.minute)
+
+
+def _numeric_minutes(values: np.ndarray) -> np.ndarray:
+    """Vectorised numeric branch of coerce_to_time_obj (float array in, minutes out)."""
+    v = np.asarray(values, dtype="float64")
+    out = np.full(v.shape, np.nan)
+
+    serial = (v >= 0) & (v <= 1)
+    total = np.round(v[serial] * 1440)
+    out[serial] = ((total // 60) % 24) * 60 + total % 60
+
+    decimal = (v > 1) & (v < 24)
+    hours = np.trunc(v[decimal])
+    frac = v[decimal] - hours
+    minutes = np.round(frac * 100)
+    minutes = np.where(minutes > 59, np.round(frac * 60), minutes)
+    rolled = minutes >= 60
+    hours = np.where(rolled, (hours + 1) % 24, hours)
+    minutes = np.where(rolled, 0, minutes)
+    out[decimal] = hours * 60 + minutes
+    return out
+
+
+def _string_minutes(values: np.ndarray) -> np.ndarray:
+    """Vectorised string branch of coerce_to_time_obj."""
+    raw = pd.Series(values, dtype=object)
+    out = np.full(len(raw), np.nan)
+    if raw.empty:
+        return out
+
+    # Exotic input (non-ASCII digits/whitespace, int() underscores) keeps the scalar path
+    exotic = raw.str.contains(r"[^\x00-\x7f]|_", regex=True).to_numpy(dtype=bool)
+    if exotic.any():
+        out[exotic] = [_scalar_minutes(v) for v in raw[exotic]]
+
+    s = raw.str.split().str.join(" ").str.upper()
+    pending = ~exotic
+
+    # 12-hour clock
+    m12 = s.str.extract(_RE_12H)
+    ok12 = (
+        pending
+        & m12[0].str.match(_RE_12H_HOUR).fillna(False).to_numpy(dtype=bool)
+        & m12[1].str.match(_RE_MIN_SEC).fillna(False).to_numpy(dtype=bool)
+        & (m12[2].isna() | m12[2].str.match(_RE_MIN_SEC).fillna(False)).to_numpy(dtype=bool)
+    )
+    if ok12.any():
+        h12 = m12.loc[ok12, 0].astype(int).to_numpy() % 12
+        h12 = h12 + np.where(m12.loc[ok12, 3].to_numpy() == "PM", 12, 0)
+        out[ok12] = h12 * 60 + m12.loc[ok12, 1].astype(int).to_numpy()
+    pending &= ~ok12
+
+    # HH:MM (hour before the first colon, leading digits after it)
+    has_colon = pending & s.str.contains(":", regex=False).to_numpy(dtype=bool)
+    if has_colon.any():
+        parts = s.str.extract(r"^([^:]*):([^:]*)")
+        hour_ok = parts[0].str.match(_RE_INT).fillna(False).to_numpy(dtype=bool)
+        minute_digits = parts[1].str.extract(r"^([0-9]+)")[0]
+        cand = has_colon & hour_ok & minute_digits.notna().to_numpy(dtype=bool)
+        if cand.any():
+            h = parts.loc[cand, 0].str.strip().astype(float).to_numpy()
+            m = minute_digits[cand].astype(float).to_numpy()
+            valid = (h >= 0) & (h < 24) & (m >= 0) & (m < 60)
+            idx = np.flatnonzero(cand)[valid]
+            out[idx] = h[valid] * 60 + m[valid]
+            pending[idx] = False
+
+    # HH.MM
+    has_dot = pending & (s.str.count(r"\.") == 1).to_numpy(dtype=bool)
+    if has_dot.any():
+        parts = s.str.extract(r"^([^.]*)\.([^.]*)$")
+        cand = (
+            has_dot
+            & parts[0].str.match(_RE_INT).fillna(False).to_numpy(dtype=bool)
+            & parts[1].str.match(_RE_INT).fillna(False).to_numpy(dtype=bool)
+        )
+        if cand.any():
+            h = parts.loc[cand, 0].str.strip().astype(float).to_numpy()
+            m = parts.loc[cand, 1].str.strip().astype(float).to_numpy()
+            valid = (h >= 0) & (h < 24) & (m >= 0) & (m < 60)
+            idx = np.flatnonzero(cand)[valid]
+            out[idx] = h[valid] * 60 + m[valid]
+
+    return out
+
+
+def _object_minutes(values: np.ndarray) -> np.ndarray:
+    """Minutes for an object array of distinct cell values, batched by type."""
+    out = np.full(len(values), np.nan)
+    kinds = np.array(
+        [
+            "str" if isinstance(v, str)
+            else "time" if isinstance(v, time_type)
+            else "num" if isinstance(v, (int, float, np.integer, np.floating))
+            else "other"
+            for v in values
+        ],
+        dtype=object,
+    )
+
+    is_str = kinds == "str"
+    if is_str.any():
+        out[is_str] = _string_minutes(values[is_str])
+
+    is_time = kinds == "time"
+    if is_time.any():
+        out[is_time] = [v.hour * 60 + v.minute for v in values[is_time]]
+
+    is_num = kinds == "num"
+    if is_num.any():
+        try:
+            out[is_num] = _numeric_minutes(np.array([float(v) for v in values[is_num]], dtype="float64"))
+        except (OverflowError, ValueError):
+            out[is_num] = [_scalar_minutes(v) for v in values[is_num]]
+
+    is_other = kinds == "other"
+    if is_other.any():
+        out[is_other] = [_scalar_minutes(v) for v in values[is_other]]
+    return out
+
+
+def parse_time_series(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Parse a whole In Time / Out Time column in one batched pass.
+
+    Returns (minutes, labels): minutes since midnight as nullable Int64 and the
+    matching "HH:MM" strings ("N/A" where the cell can't be parsed), both
+    aligned to the input index. Numeric columns are converted with numpy
+    directly; object columns are first reduced to their distinct values (a day
+    rarely has more than a few dozen) and each value type is parsed in bulk.
+    No overnight adjustment is applied here.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        minutes = _numeric_minutes(series.to_numpy(dtype="float64", na_value=np.nan))
+    else:
+        try:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        except TypeError:
+            # Unhashable cells (e.g. lists): nothing to deduplicate
+            minutes = np.array([_scalar_minutes(v) for v in series], dtype="float64")
+        else:
+            uniq_minutes = _object_minutes(np.asarray(uniques, dtype=object))
+            minutes = np.full(len(codes), np.nan)
+            known = codes >= 0
+            if known.any():
+                minutes[known] = uniq_minutes[codes[known]]
+
+    valid = ~np.isnan(minutes)
+    minute_idx = np.where(valid, minutes, 0).astype(np.int64)
+    labels = np.where(valid, _HHMM_LABELS[minute_idx], "N/A")
+    minutes_int = pd.array(np.where(valid, minutes, 0).astype(np.int64), dtype="Int64")
+    minutes_int[~valid] = pd.NA
+    return (
+        pd.Series(minutes_int, index=series.index, name=series.name),
+        pd.Series(labels, index=series.index, name=series.name, dtype=object),
+    )
+
+
+def minutes_to_time_objs(minutes: pd.Series) -> pd.Series:
+    """Map minutes-of-day (Int64, may hold NA) to datetime.time objects (None for NA)."""
+    arr = pd.to_numeric(minutes, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~np.isnan(arr)
+    idx = np.where(valid, arr, 0).astype(np.int64) % 1440
+    objs = np.where(valid, _TIME_OBJS[idx], None)
+    return pd.Series(objs, index=minutes.index, dtype=object)
+
+
+def day_minutes(df_schedule: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """In/Out minutes of a schedule as float arrays (NaN when unknown), overnight-adjusted.
+
+    Uses the precomputed `In_min`/`Out_min` columns when present, otherwise
+    parses `In Time`/`Out Time`.
+    """
+    if "In_min" in df_schedule.columns and "Out_min" in df_schedule.columns:
+        in_arr = pd.to_numeric(df_schedule["In_min"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        out_arr = pd.to_numeric(df_schedule["Out_min"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        in_arr = parse_time_series(df_schedule["In Time"])[0].to_numpy(dtype="float64", na_value=np.nan)
+        out_arr = parse_time_series(df_schedule["Out Time"])[0].to_numpy(dtype="float64", na_value=np.nan)
+    out_arr = np.where(out_arr < in_arr, out_arr + 1440, out_arr)
+    return in_arr, out_arr